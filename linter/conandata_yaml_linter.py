@@ -10,65 +10,72 @@ from strictyaml import (
     Enum,
     Any,
 )
-from yaml_linting import file_path
+from yaml_linting import add_batch_arguments, collect_files, linter_version, run_linter, ResultCache
 
 
 CONANDATA_YAML_URL = "https://github.com/conan-io/conan-center-index/blob/master/docs/adding_packages/conandata_yml_format.md"
 
 
+PATCH_FIELDS = MapCombined(
+    {
+        "patch_file": Str(),
+        Optional("patch_description"): Str(),
+        Optional("patch_type"): Enum(
+            ["official", "conan", "portability", "bugfix", "vulnerability"]
+        ),
+        Optional("patch_source"): Str(),
+        # No longer required for v2 recipes with layouts
+        Optional("base_path"): Str(),
+    },
+    Str(),
+    Any()
+)
+SCHEMA = MapCombined(
+    {
+        "sources": MapPattern(Str(), Any(), minimum_keys=1),
+        Optional("patches"): MapPattern(Str(), Seq(Any()), minimum_keys=1),
+    },
+    Str(),
+    Any(),
+)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Validate Conan's 'conandata.yaml' file to ConanCenterIndex's requirements."
     )
-    parser.add_argument(
-        "path",
-        nargs="?",
-        type=file_path,
-        help="file to validate.",
-    )
+    add_batch_arguments(parser, "conandata.yml")
     args = parser.parse_args()
 
-    patch_fields = MapCombined(
-        {
-            "patch_file": Str(),
-            Optional("patch_description"): Str(),
-            Optional("patch_type"): Enum(
-                ["official", "conan", "portability", "bugfix", "vulnerability"]
-            ),
-            Optional("patch_source"): Str(),
-            # No longer required for v2 recipes with layouts
-            Optional("base_path"): Str(),
-        },
-        Str(),
-        Any()
-    )
-    schema = MapCombined(
-        {
-            "sources": MapPattern(Str(), Any(), minimum_keys=1),
-            Optional("patches"): MapPattern(Str(), Seq(Any()), minimum_keys=1),
-        },
-        Str(),
-        Any(),
-    )
+    files = collect_files(args.paths, "conandata.yml")
+    cache = ResultCache(args.cache_dir, "conandata_yaml_linter", linter_version(__file__)) if args.cache_dir else None
+    for annotations in run_linter(lint_file, files, args.jobs, cache):
+        for annotation in annotations:
+            print(annotation)
+
 
-    with open(args.path, encoding="utf-8") as f:
+def lint_file(path):
+    """Validate a single conandata.yml, returning the annotations to be printed"""
+    annotations = []
+
+    with open(path, encoding="utf-8") as f:
         content = f.read()
 
     try:
-        parsed = dirty_load(content, schema, allow_flow_style=True)
+        parsed = dirty_load(content, SCHEMA, allow_flow_style=True)
     except YAMLValidationError as error:
-        pretty_print_yaml_validate_error(args, error) # Error when "source" is missing or when "patches" has no versions
-        return
+        annotations.append(pretty_print_yaml_validate_error(path, error)) # Error when "source" is missing or when "patches" has no versions
+        return annotations
     except BaseException as error:
-        pretty_print_yaml_validate_error(args, error) # YAML could not be parsed
-        return
+        annotations.append(pretty_print_yaml_validate_error(path, error)) # YAML could not be parsed
+        return annotations
 
     if "patches" in parsed:
         for version in parsed["patches"]:
             patches = parsed["patches"][version]
             if version not in parsed["sources"]:
-                print(
-                    f"::warning file={args.path},line={patches.start_line},endline={patches.end_line},"
+                annotations.append(
+                    f"::warning file={path},line={patches.start_line},endline={patches.end_line},"
                     f"title=conandata.yml inconsistency"
                     f"::Patch(es) are listed for version `{version}`, but there is source for this version."
                     f" You should either remove `{version}` from the `patches` section, or add it to the"
@@ -77,25 +84,25 @@ def main():
             for i, patch in enumerate(patches):
                 # Individual report errors for each patch object
                 try:
-                    parsed["patches"][version][i].revalidate(patch_fields)
+                    parsed["patches"][version][i].revalidate(PATCH_FIELDS)
                 except YAMLValidationError as error:
-                    pretty_print_yaml_validate_warning(args, error) # Warning when patch fields are not followed
+                    annotations.append(pretty_print_yaml_validate_warning(path, error)) # Warning when patch fields are not followed
                     continue
+    return annotations
 
 
-
-def pretty_print_yaml_validate_error(args, error):
+def pretty_print_yaml_validate_error(path, error):
     snippet = error.context_mark.get_snippet().replace("\n", "%0A")
-    print(
-        f"::error file={args.path},line={error.context_mark.line},endline={error.problem_mark.line+1},"
+    return (
+        f"::error file={path},line={error.context_mark.line},endline={error.problem_mark.line+1},"
         f"title=conandata.yml schema error"
         f"::Schema outlined in {CONANDATA_YAML_URL}#patches-fields is not followed.%0A%0A{error.problem} in %0A{snippet}%0A"
     )
     
-def pretty_print_yaml_validate_warning(args, error):
+def pretty_print_yaml_validate_warning(path, error):
     snippet = error.context_mark.get_snippet().replace("\n", "%0A")
-    print(
-        f"::warning file={args.path},line={error.context_mark.line},endline={error.problem_mark.line+1},"
+    return (
+        f"::warning file={path},line={error.context_mark.line},endline={error.problem_mark.line+1},"
         f"title=conandata.yml schema warning"
         f"::Schema outlined in {CONANDATA_YAML_URL}#patches-fields is not followed.%0A%0A{error.problem} in %0A{snippet}%0A"
     )
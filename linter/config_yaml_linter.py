@@ -1,36 +1,42 @@
 import argparse
 from strictyaml import load, Map, Str, YAMLValidationError, MapPattern
-from yaml_linting import file_path
+from yaml_linting import add_batch_arguments, collect_files, linter_version, run_linter, ResultCache
+
+
+SCHEMA = Map(
+    {"versions": MapPattern(Str(), Map({"folder": Str()}), minimum_keys=1)}
+)
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Validate ConanCenterIndex's 'config.yaml' file."
     )
-    parser.add_argument(
-        "path",
-        nargs="?",
-        type=file_path,
-        help="file to validate.",
-    )
+    add_batch_arguments(parser, "config.yml")
     args = parser.parse_args()
 
-    schema = Map(
-        {"versions": MapPattern(Str(), Map({"folder": Str()}), minimum_keys=1)}
-    )
+    files = collect_files(args.paths, "config.yml")
+    cache = ResultCache(args.cache_dir, "config_yaml_linter", linter_version(__file__)) if args.cache_dir else None
+    for annotations in run_linter(lint_file, files, args.jobs, cache):
+        for annotation in annotations:
+            print(annotation)
+
 
-    with open(args.path) as f:
+def lint_file(path):
+    """Validate a single config.yml, returning the annotations to be printed"""
+    with open(path) as f:
         content = f.read()
 
     try:
-        load(content, schema)
+        load(content, SCHEMA)
     except YAMLValidationError as error:
         e = error.__str__().replace("\n", "%0A")
-        print(
-            f"::error file={args.path},line={error.context_mark.line},endline={error.problem_mark.line},"
+        return [
+            f"::error file={path},line={error.context_mark.line},endline={error.problem_mark.line},"
             f"title=config.yml schema error"
             f"::{e}\n"
-        )
+        ]
+    return []
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+"""
+
+Lint only the recipes touched by a change
+
+Changed paths are taken from `git diff` against the merge-base of a base revision and HEAD, as in the
+diff of a pull request (or given explicitly), mapped to the recipe folders containing them, and only
+the linters relevant to those recipes are executed:
+
+ * `pylintrc_recipe` over the recipe `conanfile.py`
+ * `pylintrc_testpackage` over the `test_package/conanfile.py`
+ * the schema linters over `conandata.yml` and `config.yml`
+
+The linters run in parallel, their outputs are printed in that order.
+
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+LINTER_DIR = Path(__file__).resolve().parent
+ROOT_DIR = LINTER_DIR.parent
+
+
+def changed_files(base):
+    """Return the files changed since the merge-base of `base` and HEAD, relative to the repository root"""
+    # Changes made on `base` since the fork point are not part of the change
+    fork_point = subprocess.run(
+        ["git", "merge-base", base, "HEAD"],
+        cwd=ROOT_DIR, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    output = subprocess.run(
+        ["git", "diff", "--name-only", "--diff-filter=d", fork_point],
+        cwd=ROOT_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    untracked = subprocess.run(
+        ["git", "ls-files", "--others", "--exclude-standard", "recipes"],
+        cwd=ROOT_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    return sorted(set(output.splitlines()) | set(untracked.splitlines()))
+
+
+def affected_recipes(paths):
+    """Map changed paths to the recipe folders (`recipes/<name>/<folder>`) and `config.yml` files touched"""
+    recipe_folders = set()
+    config_files = set()
+    for path in paths:
+        path = Path(path)
+        if path.is_absolute():
+            try:
+                path = path.relative_to(ROOT_DIR)
+            except ValueError:
+                continue
+        parts = PurePosixPath(path.as_posix()).parts
+        if len(parts) < 3 or parts[0] != "recipes":
+            continue
+        if len(parts) == 3:
+            if parts[2] == "config.yml":
+                config_files.add("/".join(parts))
+            continue
+        recipe_folders.add("/".join(parts[:3]))
+    return sorted(recipe_folders), sorted(config_files)
+
+
+def lint_commands(recipe_folders, config_files):
+    """Return the linter command lines to execute, skipping the ones with nothing to lint"""
+    def existing(*candidates):
+        return [c for c in candidates if (ROOT_DIR / c).is_file()]
+
+    recipes, test_packages, conandatas = [], [], []
+    for folder in recipe_folders:
+        recipes += existing(f"{folder}/conanfile.py")
+        # test_v1_package recipes are excluded from linting, as in CI
+        test_packages += existing(f"{folder}/test_package/conanfile.py")
+        conandatas += existing(f"{folder}/conandata.yml")
+    config_files = existing(*config_files)
+
+    commands = []
+    if recipes:
+        commands.append([sys.executable, "-m", "pylint", f"--rcfile={LINTER_DIR / 'pylintrc_recipe'}",
+                         "--output-format=parseable"] + recipes)
+    if test_packages:
+        commands.append([sys.executable, "-m", "pylint", f"--rcfile={LINTER_DIR / 'pylintrc_testpackage'}",
+                         "--output-format=parseable"] + test_packages)
+    if conandatas:
+        commands.append([sys.executable, str(LINTER_DIR / "conandata_yaml_linter.py")] + conandatas)
+    if config_files:
+        commands.append([sys.executable, str(LINTER_DIR / "config_yaml_linter.py")] + config_files)
+    return commands
+
+
+def _run(command):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(ROOT_DIR), env.get("PYTHONPATH")) if p)
+    return subprocess.run(command, cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Lint the recipes changed since a git revision."
+    )
+    parser.add_argument("--base", default="origin/master",
+                        help="git revision the change is based on, the working tree is compared to its merge-base "
+                             "with HEAD (default: origin/master).")
+    parser.add_argument("paths", nargs="*",
+                        help="changed files, relative to the repository root (default: taken from git diff).")
+    args = parser.parse_args()
+
+    paths = args.paths or changed_files(args.base)
+    commands = lint_commands(*affected_recipes(paths))
+    if not commands:
+        print("No recipe changes to lint")
+        return
+
+    exit_code = 0
+    with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+        for result in executor.map(_run, commands):
+            sys.stdout.write(result.stdout)
+            sys.stderr.write(result.stderr)
+            exit_code |= result.returncode
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+
+Long-running pylint server for conanfiles in Conan Center Index
+
+Linting a recipe with pylint spends most of its time building the astroid trees of Conan itself
+(`conans.model.conan_file` and the modules `transform_conanfile.py` looks up). This server keeps a
+single process alive, so the astroid `MANAGER` cache stays warm and only the requested conanfiles
+are parsed again.
+
+Requests are JSON objects, one per line, read from stdin (default) or from a local socket:
+
+    {"files": ["recipes/fmt/all/conanfile.py"], "rcfile": null, "output_format": "parseable"}
+
+`rcfile` is optional: recipes are linted with `pylintrc_recipe` and test packages with
+`pylintrc_testpackage`. Each request is answered with one JSON line:
+
+    {"output": "...", "exit_code": 0}
+
+A running server can be queried with `--connect`, which prints the pylint output and exits with its
+status code, so it can be used as a drop-in replacement for `pylint` in hooks and editors.
+
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+from pathlib import Path
+
+LINTER_DIR = Path(__file__).resolve().parent
+ROOT_DIR = LINTER_DIR.parent
+
+
+def rcfile_for(path):
+    """Return the pylint rcfile used to lint the given conanfile"""
+    if Path(path).match("test_*/*.py"):
+        return str(LINTER_DIR / "pylintrc_testpackage")
+    return str(LINTER_DIR / "pylintrc_recipe")
+
+
+def _evict(files):
+    """Drop the given files from the astroid cache, so changes on disk are picked up"""
+    import astroid
+
+    paths = {os.path.realpath(f) for f in files}
+    cache = astroid.MANAGER.astroid_cache
+    for modname in [name for name, module in cache.items()
+                    if module.file and os.path.realpath(module.file) in paths]:
+        del cache[modname]
+
+
+def lint(files, rcfile=None, output_format="parseable"):
+    """Lint conanfiles in-process, returning pylint output and status code"""
+    from pylint.lint import Run
+
+    groups = {}
+    for f in files:
+        groups.setdefault(rcfile or rcfile_for(f), []).append(f)
+
+    _evict(files)
+    output = io.StringIO()
+    exit_code = 0
+    for rc, group in groups.items():
+        args = [f"--rcfile={rc}", f"--output-format={output_format}"] + group
+        with contextlib.redirect_stdout(output):
+            run = Run(args, exit=False)
+        exit_code |= run.linter.msg_status
+    return output.getvalue(), exit_code
+
+
+def _handle(line):
+    try:
+        request = json.loads(line)
+        output, exit_code = lint(request["files"], request.get("rcfile"),
+                                 request.get("output_format", "parseable"))
+    except Exception as error:  # Keep serving, report the error to the client
+        output, exit_code = f"lint_server: {type(error).__name__}: {error}\n", 32
+    return json.dumps({"output": output, "exit_code": exit_code}) + "\n"
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(_handle(line.decode("utf-8")).encode("utf-8"))
+                self.wfile.flush()
+
+
+def serve_stdin():
+    for line in sys.stdin:
+        if line.strip():
+            sys.stdout.write(_handle(line))
+            sys.stdout.flush()
+
+
+def serve_socket(path):
+    if os.path.exists(path):
+        os.unlink(path)
+    # Requests are served one at a time: the astroid cache is not thread-safe
+    with socketserver.UnixStreamServer(path, _RequestHandler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+def connect(path, files, rcfile=None, output_format="parseable"):
+    # The server may run from another directory
+    files = [os.path.abspath(f) for f in files]
+    request = {"files": files, "rcfile": rcfile, "output_format": output_format}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        with sock.makefile("rwb") as stream:
+            stream.write((json.dumps(request) + "\n").encode("utf-8"))
+            stream.flush()
+            response = json.loads(stream.readline())
+    sys.stdout.write(response["output"])
+    return response["exit_code"]
+
+
+def warm_up():
+    """Lint the recipe template once, so Conan's astroid trees are built before the first request"""
+    lint([str(ROOT_DIR / "docs" / "package_templates" / "cmake_package" / "all" / "conanfile.py")])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep pylint and its astroid cache warm to lint conanfiles on demand."
+    )
+    parser.add_argument("--socket", help="serve requests on this unix socket instead of stdin.")
+    parser.add_argument("--connect", metavar="SOCKET", help="lint files using the server listening on SOCKET.")
+    parser.add_argument("--rcfile", help="pylint rcfile to use (defaults to the recipe or test package one).")
+    parser.add_argument("--output-format", default="parseable", help="pylint output format.")
+    parser.add_argument("files", nargs="*", help="conanfiles to lint (with --connect).")
+    args = parser.parse_args()
+
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+
+    if args.connect:
+        sys.exit(connect(args.connect, args.files, args.rcfile, args.output_format))
+    warm_up()
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stdin()
+
+
+if __name__ == "__main__":
+    main()
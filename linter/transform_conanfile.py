@@ -2,12 +2,14 @@
 # Class ConanFile doesn't declare all the valid members and functions,
 #   some are injected by Conan dynamically to the class.
 
+import functools
 import textwrap
 import astroid
 from astroid.builder import AstroidBuilder
 from astroid.manager import AstroidManager
 
 
+@functools.lru_cache(maxsize=None)
 def _settings_transform():
     module = AstroidBuilder(AstroidManager()).string_build(
         textwrap.dedent("""
@@ -20,6 +22,7 @@ def _settings_transform():
     )
     return module['Settings']
 
+@functools.lru_cache(maxsize=None)
 def _user_info_build_transform():
     module = AstroidBuilder(AstroidManager()).string_build(
         textwrap.dedent("""
@@ -33,41 +36,58 @@ def _user_info_build_transform():
 def register(_):
     pass
 
+
+@functools.lru_cache(maxsize=None)
+def _builtin_lookup(name):
+    return astroid.builtin_lookup(name)
+
+
+@functools.lru_cache(maxsize=None)
+def _module_lookup(modname, name):
+    """Lookup `name` in a Conan module, or None if it does not exist (e.g. on Conan 2)"""
+    try:
+        return astroid.MANAGER.ast_from_module_name(modname).lookup(name)
+    except astroid.AstroidError:
+        return None
+
+
+def _module_class(modname, name):
+    return list(_module_lookup(modname, name) or [])
+
+
+# Resolved only when the ConanFile class is transformed, and then memoized
+_DYNAMIC_FIELDS = {
+    "conan_data": lambda: list(_builtin_lookup("str")),
+    "build_requires": lambda: _module_class("conans.client.graph.graph_manager", "_RecipeBuildRequires"),
+    "test_requires": lambda: _module_class("conans.client.graph.graph_manager", "_RecipeBuildRequires"),
+    "tool_requires": lambda: _module_class("conans.client.graph.graph_manager", "_RecipeBuildRequires"),
+    "info_build": lambda: _module_class("conans.model.info", "ConanInfo"),
+    "user_info_build": lambda: [_user_info_build_transform()],
+    "info": lambda: _module_class("conans.model.info", "ConanInfo"),
+    "copy": lambda: _module_class("conans.client.file_copier", "FileCopier"),
+    "copy_deps": lambda: _module_class("conans.client.importer", "_FileImporter"),
+    "python_requires": lambda: [t for t in (_builtin_lookup("str"),
+                                            _module_lookup("conans.client.graph.python_requires", "PyRequires"))
+                                if t is not None],
+    "recipe_folder": lambda: list(_builtin_lookup("str")),
+    "settings_build": lambda: [_settings_transform()],
+    "settings_target": lambda: [_settings_transform()],
+    "conf": lambda: list(_builtin_lookup("dict")),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _dynamic_field(name):
+    return _DYNAMIC_FIELDS[name]()
+
+
 def transform_conanfile(node):
     """Transform definition of ConanFile class so dynamic fields are visible to pylint"""
 
-    str_class = astroid.builtin_lookup("str")
-    dict_class = astroid.builtin_lookup("dict")
-    info_class = astroid.MANAGER.ast_from_module_name("conans.model.info").lookup(
-        "ConanInfo")
-    build_requires_class = astroid.MANAGER.ast_from_module_name(
-        "conans.client.graph.graph_manager").lookup("_RecipeBuildRequires")
-    file_copier_class = astroid.MANAGER.ast_from_module_name(
-        "conans.client.file_copier").lookup("FileCopier")
-    file_importer_class = astroid.MANAGER.ast_from_module_name(
-        "conans.client.importer").lookup("_FileImporter")
-    python_requires_class = astroid.MANAGER.ast_from_module_name(
-        "conans.client.graph.python_requires").lookup("PyRequires")
-
-    dynamic_fields = {
-        "conan_data": str_class,
-        "build_requires": build_requires_class,
-        "test_requires" : build_requires_class,
-        "tool_requires": build_requires_class,
-        "info_build": info_class,
-        "user_info_build": [_user_info_build_transform()],
-        "info": info_class,
-        "copy": file_copier_class,
-        "copy_deps": file_importer_class,
-        "python_requires": [str_class, python_requires_class],
-        "recipe_folder": str_class,
-        "settings_build": [_settings_transform()],
-        "settings_target": [_settings_transform()],
-        "conf": dict_class,
-    }
-    
-    for f, t in dynamic_fields.items():
-        node.locals[f] = [i for i in t]
+    for f in _DYNAMIC_FIELDS:
+        values = _dynamic_field(f)
+        if values:
+            node.locals[f] = list(values)
 
 
 astroid.MANAGER.register_transform(
@@ -1,4 +1,10 @@
 import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 
 def file_path(a_string):
@@ -7,3 +13,141 @@ def file_path(a_string):
     if not isfile(a_string):
         raise argparse.ArgumentTypeError(f"{a_string} does not point to a file")
     return a_string
+
+
+def file_or_directory_path(a_string):
+    from os.path import isdir, isfile
+
+    if not isfile(a_string) and not isdir(a_string):
+        raise argparse.ArgumentTypeError(f"{a_string} does not point to a file or directory")
+    return a_string
+
+
+def collect_files(paths, filename):
+    """Expand directories in `paths` to every `filename` found below them, sorted for stable output"""
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                if filename in names:
+                    files.add(os.path.join(root, filename))
+        else:
+            files.add(path)
+    return sorted(files)
+
+
+class ResultCache:
+    """On-disk cache of the annotations produced for each file
+
+    Entries are keyed by the file path and a hash of its content, and the whole cache is discarded when
+    `version` changes, so editing a linter or its schema invalidates every stored result. Entries not
+    used for `max_age` seconds are evicted, and only the `max_entries` most recently used are kept.
+    """
+
+    def __init__(self, cache_dir, linter, version, max_entries=20000, max_age=30 * 24 * 3600):
+        self._path = os.path.join(cache_dir, f"{linter}.json")
+        self._version = version
+        self._max_entries = max_entries
+        self._max_age = max_age
+        self._entries = {}
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == version:
+                self._entries = data["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    @staticmethod
+    def key(path):
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        return f"{path}:{digest}"
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry["used"] = time.time()
+        return entry["annotations"]
+
+    def put(self, key, annotations):
+        self._entries[key] = {"annotations": annotations, "used": time.time()}
+
+    def save(self):
+        oldest = time.time() - self._max_age
+        entries = sorted(((k, v) for k, v in self._entries.items() if v["used"] >= oldest),
+                         key=lambda item: item[1]["used"], reverse=True)
+        data = {"version": self._version, "entries": dict(entries[:self._max_entries])}
+
+        cache_dir = os.path.dirname(self._path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._path)
+
+
+def linter_version(*module_files):
+    """Hash the sources of the linter modules and strictyaml's version, to be used as cache version"""
+    import strictyaml
+
+    h = hashlib.sha256(strictyaml.__version__.encode())
+    for module_file in module_files + (__file__,):
+        with open(module_file, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def run_linter(lint_file, files, jobs=None, cache=None):
+    """Yield the annotations of `lint_file` for each file, in the order of `files`
+
+    Files are spread across a process pool, so `lint_file` has to be a module level function
+    returning a list of annotation strings. When a `ResultCache` is given, only files whose content
+    changed are linted and the annotations of the others are replayed.
+    """
+    if cache is None:
+        yield from _lint_files(lint_file, files, jobs)
+        return
+
+    keys = [cache.key(path) for path in files]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    for i, annotations in zip(missing, _lint_files(lint_file, [files[i] for i in missing], jobs)):
+        cache.put(keys[i], annotations)
+        results[i] = annotations
+    cache.save()
+    yield from results
+
+
+def _lint_files(lint_file, files, jobs):
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(files) <= 1:
+        for path in files:
+            yield lint_file(path)
+        return
+
+    chunksize = max(1, len(files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(lint_file, files, chunksize=chunksize)
+
+
+def add_batch_arguments(parser, filename):
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        type=file_or_directory_path,
+        help=f"files to validate. Directories are searched recursively for '{filename}' files.",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes (defaults to the number of CPUs).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="directory where results are cached, so unchanged files are not validated again.",
+    )
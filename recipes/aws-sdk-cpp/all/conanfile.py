@@ -1,10 +1,11 @@
 import os
+import tarfile
 
 from conan import ConanFile
-from conan.errors import ConanInvalidConfiguration
+from conan.errors import ConanException, ConanInvalidConfiguration
 from conan.tools.build import cross_building, stdcpp_library
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
-from conan.tools.files import apply_conandata_patches, copy, export_conandata_patches, get, rename, replace_in_file, rm, rmdir
+from conan.tools.files import apply_conandata_patches, copy, download, export_conandata_patches, get, rename, replace_in_file, rm, rmdir
 from conan.tools.microsoft import is_msvc, is_msvc_static_runtime
 from conan.tools.scm import Version
 
@@ -309,6 +310,8 @@ class AwsSdkCppConan(ConanFile):
 
     short_paths = True
 
+    _cached_enabled_sdks = None
+
     @property
     def _internal_requirements(self):
         return {
@@ -320,6 +323,29 @@ class AwsSdkCppConan(ConanFile):
             "transfer": ["s3"],
         }
 
+    @property
+    def _enabled_sdks(self):
+        # Enabled SDKs and, transitively, their internal requirements, computed once options are final
+        if self._cached_enabled_sdks is None:
+            enabled_sdks = set(sdk for sdk in self._sdks if self.options.get_safe(sdk))
+            pending = list(enabled_sdks)
+            while pending:
+                for internal_requirement in self._internal_requirements.get(pending.pop(), []):
+                    if internal_requirement not in enabled_sdks:
+                        enabled_sdks.add(internal_requirement)
+                        pending.append(internal_requirement)
+            self._cached_enabled_sdks = frozenset(enabled_sdks)
+        return self._cached_enabled_sdks
+
+    @property
+    def _selective_sources(self):
+        # Opt-in: only the sources of the SDKs built by each configuration are extracted, in build()
+        return self.conf.get("user.aws-sdk-cpp:selective_sources", default=False, check_type=bool)
+
+    @property
+    def _sources_archive(self):
+        return os.path.join(self.source_folder, "aws-sdk-cpp-sources.tar.gz")
+
     def export_sources(self):
         export_conandata_patches(self)
 
@@ -330,6 +356,7 @@ class AwsSdkCppConan(ConanFile):
     def configure(self):
         if self.options.shared:
             self.options.rm_safe("fPIC")
+        self._cached_enabled_sdks = None
 
     def layout(self):
         cmake_layout(self, src_folder="src")
@@ -380,23 +407,23 @@ class AwsSdkCppConan(ConanFile):
                 )
 
     def package_id(self):
-        for hl_comp in self._internal_requirements.keys():
-            if getattr(self.info.options, hl_comp):
-                for internal_requirement in self._internal_requirements[hl_comp]:
-                    setattr(self.info.options, internal_requirement, True)
+        for sdk in self._enabled_sdks:
+            setattr(self.info.options, sdk, True)
 
     def source(self):
-        get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        if self._selective_sources:
+            # The source folder is shared by every configuration, so the archive is extracted in build()
+            data = self.conan_data["sources"][self.version]
+            download(self, data["url"], self._sources_archive, sha256=data["sha256"])
+        else:
+            get(self, **self.conan_data["sources"][self.version], strip_root=True)
 
     def generate(self):
         tc = CMakeToolchain(self)
         # All option() are defined before project() in upstream CMakeLists,
         # therefore we must use cache_variables
 
-        build_only = ["core"]
-        for sdk in self._sdks:
-            if self.options.get_safe(sdk):
-                build_only.append(sdk)
+        build_only = ["core"] + sorted(self._enabled_sdks)
         tc.cache_variables["BUILD_ONLY"] = ";".join(build_only)
 
         tc.cache_variables["ENABLE_UNITY_BUILD"] = True
@@ -423,6 +450,41 @@ class AwsSdkCppConan(ConanFile):
         deps = CMakeDeps(self)
         deps.generate()
 
+    def _extract_sources(self):
+        # Skip the folders of the SDKs which are not built, and the files used to regenerate them
+        sdk_folders = set(f"aws-cpp-sdk-{sdk}" for sdk in self._enabled_sdks | {"core"})
+        # The folders modified by patches are needed for them to apply
+        for it in self.conan_data.get("patches", {}).get(self.version, []):
+            with open(os.path.join(self.export_sources_folder, it["patch_file"]), encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith(("--- ", "+++ ")):
+                        sdk_folders.update(part for part in line[4:].split()[0].split("/") if part.startswith("aws-cpp-sdk-"))
+
+        def is_unsafe(path):
+            return os.path.isabs(path) or ".." in path.replace("\\", "/").split("/")
+
+        def members(tar):
+            for member in tar:
+                if is_unsafe(member.name) or (member.islnk() and is_unsafe(member.linkname)):
+                    raise ConanException(f"{self._sources_archive}: unsafe member '{member.name}'")
+                parts = member.name.split("/")[1:]  # strip_root
+                if not parts or parts[0] == "code-generation":
+                    continue
+                folders = parts if member.isdir() else parts[:-1]
+                if any(it.startswith("aws-cpp-sdk-") and it not in sdk_folders for it in folders):
+                    continue
+                member.name = "/".join(parts)
+                if member.islnk():
+                    member.linkname = "/".join(member.linkname.split("/")[1:])
+                yield member
+
+        self.output.info(f"Extracting the sources of {', '.join(sorted(sdk_folders))}")
+        # The data filter also rejects symlinks pointing outside of the source folder (Python >= 3.8.17)
+        extract_args = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+        with tarfile.open(self._sources_archive) as tar:
+            tar.extractall(self.source_folder, members=members(tar), **extract_args)
+        os.remove(self._sources_archive)
+
     def _patch_sources(self):
         apply_conandata_patches(self)
         # Disable warnings as errors
@@ -433,6 +495,8 @@ class AwsSdkCppConan(ConanFile):
             )
 
     def build(self):
+        if os.path.isfile(self._sources_archive):
+            self._extract_sources()
         self._patch_sources()
         cmake = CMake(self)
         cmake.configure()
@@ -504,14 +568,7 @@ class AwsSdkCppConan(ConanFile):
         ])
 
         # other components
-        enabled_sdks = [sdk for sdk in self._sdks if self.options.get_safe(sdk)]
-        for hl_comp in self._internal_requirements.keys():
-            if getattr(self.options, hl_comp):
-                for internal_requirement in self._internal_requirements[hl_comp]:
-                    if internal_requirement not in enabled_sdks:
-                        enabled_sdks.append(internal_requirement)
-
-        for sdk in enabled_sdks:
+        for sdk in sorted(self._enabled_sdks):
             # TODO: there is no way to properly emulate COMPONENTS names for
             #       find_package(AWSSDK COMPONENTS <sdk>) in set_property()
             #       right now: see https://github.com/conan-io/conan/issues/10258
@@ -5,7 +5,7 @@ from conan.tools.build import build_jobs, cross_building, valid_min_cppstd, supp
 from conan.tools.env import VirtualBuildEnv
 from conan.tools.files import (
     apply_conandata_patches, chdir, collect_libs, copy, export_conandata_patches,
-    get, mkdir, rename, replace_in_file, rm, rmdir, save
+    get, mkdir, rename, rm, rmdir, save
 )
 from conan.tools.gnu import AutotoolsToolchain
 from conan.tools.layout import basic_layout
@@ -14,6 +14,7 @@ from conan.tools.scm import Version
 
 import glob
 from io import StringIO
+import json
 import os
 import re
 import shlex
@@ -21,6 +22,8 @@ import shutil
 import sys
 import yaml
 
+from file_edits import FileEdits
+
 required_conan_version = ">=1.53.0"
 
 # When adding (or removing) an option, also add this option to the list in
@@ -151,12 +154,15 @@ class BoostConan(ConanFile):
     default_options.update({f"without_{_name}": False for _name in CONFIGURE_OPTIONS})
     default_options.update({f"without_{_name}": True for _name in ("graph_parallel", "mpi", "python")})
 
+    exports = "file_edits.py"
     short_paths = True
     no_copy_source = True
     _cached_dependencies = None
+    _cached_module_closures = None
 
     def export(self):
         copy(self, f"dependencies/{self._dependency_filename}", src=self.recipe_folder, dst=self.export_folder)
+        copy(self, f"dependencies/{self._precompiled_dependency_filename}", src=self.recipe_folder, dst=self.export_folder)
 
     def export_sources(self):
         export_conandata_patches(self)
@@ -331,41 +337,61 @@ class BoostConan(ConanFile):
     def _dependency_filename(self):
         return f"dependencies-{self.version}.yml"
 
+    @property
+    def _precompiled_dependency_filename(self):
+        # Generated by rebuild-dependencies.py next to the yml file, much faster to load
+        return f"dependencies-{self.version}.json"
+
     @property
     def _dependencies(self):
         if self._cached_dependencies is None:
+            precompiled_filepath = os.path.join(self.recipe_folder, "dependencies", self._precompiled_dependency_filename)
             dependencies_filepath = os.path.join(self.recipe_folder, "dependencies", self._dependency_filename)
-            if not os.path.isfile(dependencies_filepath):
+            if os.path.isfile(precompiled_filepath):
+                with open(precompiled_filepath, encoding='utf-8') as f:
+                    self._cached_dependencies = json.load(f)
+            elif os.path.isfile(dependencies_filepath):
+                with open(dependencies_filepath, encoding='utf-8') as f:
+                    self._cached_dependencies = yaml.safe_load(f)
+            else:
                 raise ConanException(f"Cannot find {dependencies_filepath}")
-            with open(dependencies_filepath, encoding='utf-8') as f:
-                self._cached_dependencies = yaml.safe_load(f)
         return self._cached_dependencies
 
+    @property
+    def _module_closures(self):
+        """Transitive closures of the module dependency graph: dependencies and dependents of each module"""
+        if self._cached_module_closures is None and "closures" in self._dependencies:
+            self._cached_module_closures = {
+                kind: {module: frozenset(closure) for module, closure in closures.items()}
+                for kind, closures in self._dependencies["closures"].items()
+            }
+        if self._cached_module_closures is None:
+            dependencies = self._dependencies["dependencies"]
+            dependents = {}
+            for module in dependencies:
+                closure = {module}
+                stack = [module]
+                while stack:
+                    for dependency in dependencies.get(stack.pop(), []):
+                        if dependency not in closure:
+                            closure.add(dependency)
+                            stack.append(dependency)
+                dependents[module] = frozenset(closure)
+            supers = {}
+            for module, closure in dependents.items():
+                for dependency in closure:
+                    supers.setdefault(dependency, {dependency}).add(module)
+            self._cached_module_closures = {
+                "dependent": dependents,
+                "super": {module: frozenset(closure) for module, closure in supers.items()},
+            }
+        return self._cached_module_closures
+
     def _all_dependent_modules(self, name):
-        dependencies = {name}
-        while True:
-            new_dependencies = set()
-            for dependency in dependencies:
-                new_dependencies.update(set(self._dependencies["dependencies"][dependency]))
-                new_dependencies.update(dependencies)
-            if len(new_dependencies) > len(dependencies):
-                dependencies = new_dependencies
-            else:
-                break
-        return dependencies
+        return self._module_closures["dependent"][name]
 
     def _all_super_modules(self, name):
-        dependencies = {name}
-        while True:
-            new_dependencies = set(dependencies)
-            for module in self._dependencies["dependencies"]:
-                if dependencies.intersection(set(self._dependencies["dependencies"][module])):
-                    new_dependencies.add(module)
-            if len(new_dependencies) > len(dependencies):
-                dependencies = new_dependencies
-            else:
-                break
-        return dependencies
+        return self._module_closures["super"].get(name, frozenset((name,)))
 
     @property
     def _bcp_dir(self):
@@ -1082,48 +1108,48 @@ class BoostConan(ConanFile):
             self.run(command)
 
     def build(self):
+        edits = FileEdits(self)
         stacktrace_jamfile = os.path.join(self.source_folder, "libs", "stacktrace", "build", "Jamfile.v2")
         if cross_building(self, skip_x64_x86=True):
             # When cross building, do not attempt to run the test-executable (assume they work)
-            replace_in_file(self, stacktrace_jamfile, "$(>) > $(<)", "echo \"\" > $(<)", strict=False)
+            edits.replace(stacktrace_jamfile, "$(>) > $(<)", "echo \"\" > $(<)", strict=False)
         if self._with_stacktrace_backtrace and self.settings.os != "Windows" and not cross_building(self):
             # When libbacktrace is shared, give extra help to the test-executable
             linker_var = "DYLD_LIBRARY_PATH" if self.settings.os == "Macos" else "LD_LIBRARY_PATH"
             libbacktrace_libdir = self.dependencies["libbacktrace"].cpp_info.aggregated_components().libdirs[0]
             patched_run_rule = f"{linker_var}={libbacktrace_libdir} $(>) > $(<)"
-            replace_in_file(self, stacktrace_jamfile, "$(>) > $(<)", patched_run_rule, strict=False)
+            edits.replace(stacktrace_jamfile, "$(>) > $(<)", patched_run_rule, strict=False)
             if self.dependencies["libbacktrace"].options.shared:
-                replace_in_file(self, stacktrace_jamfile, "<link>static", "<link>shared", strict=False)
+                edits.replace(stacktrace_jamfile, "<link>static", "<link>shared", strict=False)
 
         # Older clang releases require a thread_local variable to be initialized by a constant value
-        replace_in_file(self, os.path.join(self.source_folder, "boost", "stacktrace", "detail", "libbacktrace_impls.hpp"),
-                              "/* thread_local */", "thread_local", strict=False)
-        replace_in_file(self, os.path.join(self.source_folder, "boost", "stacktrace", "detail", "libbacktrace_impls.hpp"),
-                              "/* static __thread */", "static __thread", strict=False)
+        libbacktrace_impls = os.path.join(self.source_folder, "boost", "stacktrace", "detail", "libbacktrace_impls.hpp")
+        edits.replace(libbacktrace_impls, "/* thread_local */", "thread_local", strict=False)
+        edits.replace(libbacktrace_impls, "/* static __thread */", "static __thread", strict=False)
         if self.settings.compiler == "apple-clang" or (self.settings.compiler == "clang" and Version(self.settings.compiler.version) < 6):
-            replace_in_file(self, os.path.join(self.source_folder, "boost", "stacktrace", "detail", "libbacktrace_impls.hpp"),
-                                  "thread_local", "/* thread_local */")
-            replace_in_file(self, os.path.join(self.source_folder, "boost", "stacktrace", "detail", "libbacktrace_impls.hpp"),
-                                  "static __thread", "/* static __thread */")
-        replace_in_file(self, os.path.join(self.source_folder, "tools", "build", "src", "tools", "gcc.jam"),
-                              "local generic-os = [ set.difference $(all-os) : aix darwin vxworks solaris osf hpux ] ;",
-                              "local generic-os = [ set.difference $(all-os) : aix darwin vxworks solaris osf hpux iphone appletv ] ;",
-                              strict=False)
-        replace_in_file(self, os.path.join(self.source_folder, "tools", "build", "src", "tools", "gcc.jam"),
-                              "local no-threading = android beos haiku sgi darwin vxworks ;",
-                              "local no-threading = android beos haiku sgi darwin vxworks iphone appletv ;",
-                              strict=False)
-        replace_in_file(self, os.path.join(self.source_folder, "libs", "fiber", "build", "Jamfile.v2"),
-                              "    <conditional>@numa",
-                              "    <link>shared:<library>.//boost_fiber : <conditional>@numa",
-                              strict=False)
+            edits.replace(libbacktrace_impls, "thread_local", "/* thread_local */")
+            edits.replace(libbacktrace_impls, "static __thread", "/* static __thread */")
+        gcc_jam = os.path.join(self.source_folder, "tools", "build", "src", "tools", "gcc.jam")
+        edits.replace(gcc_jam,
+                      "local generic-os = [ set.difference $(all-os) : aix darwin vxworks solaris osf hpux ] ;",
+                      "local generic-os = [ set.difference $(all-os) : aix darwin vxworks solaris osf hpux iphone appletv ] ;",
+                      strict=False)
+        edits.replace(gcc_jam,
+                      "local no-threading = android beos haiku sgi darwin vxworks ;",
+                      "local no-threading = android beos haiku sgi darwin vxworks iphone appletv ;",
+                      strict=False)
+        edits.replace(os.path.join(self.source_folder, "libs", "fiber", "build", "Jamfile.v2"),
+                      "    <conditional>@numa",
+                      "    <link>shared:<library>.//boost_fiber : <conditional>@numa",
+                      strict=False)
         if self.settings.os == "Android":
             # force versionless soname from boostorg/boost#206
             # this can be applied to all versions and it's easier with a replace
-            replace_in_file(self, os.path.join(self.source_folder, "boostcpp.jam"),
-                            "! [ $(property-set).get <target-os> ] in windows cygwin darwin aix &&",
-                            "! [ $(property-set).get <target-os> ] in windows cygwin darwin aix android &&",
-                            strict=False)
+            edits.replace(os.path.join(self.source_folder, "boostcpp.jam"),
+                          "! [ $(property-set).get <target-os> ] in windows cygwin darwin aix &&",
+                          "! [ $(property-set).get <target-os> ] in windows cygwin darwin aix android &&",
+                          strict=False)
+        edits.apply()
 
         if self.options.header_only:
             self.output.warning("Header only package, skipping build")
@@ -6,13 +6,15 @@ import json
 import logging
 import pprint
 import re
+import os
 import subprocess
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import yaml
-from conan.tools.files import chdir
 
 log = logging.Logger("boost-dependency-builder")
 log.parent = logging.root
@@ -104,65 +106,150 @@ class BoostDependencies(object):
     export: BoostDependenciesExport
 
 
+class CacheMiss(Exception):
+    pass
+
+
+class BoostDependencyCache(object):
+    """Outputs of boostdep and contents of the Jamfiles, per boost version, persisted as JSON
+
+    Boost releases are immutable, so a version whose inputs are all cached can be regenerated
+    without checking it out.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        if path and path.is_file():
+            self._data = json.loads(path.read_text())
+
+    def get(self, boost_version: str, key: str):
+        with self._lock:
+            try:
+                return self._data[boost_version][key]
+            except KeyError:
+                raise CacheMiss(f"{boost_version}: {key}")
+
+    def set(self, boost_version: str, key: str, value) -> None:
+        with self._lock:
+            self._data.setdefault(boost_version, {})[key] = value
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._data, sort_keys=True))
+            os.replace(tmp_path, self.path)
+
+
 class BoostDependencyBuilder(object):
-    def __init__(self, boost_version: str, boostdep_version: str, tmppath: Path, git_url: str, outputdir: Path, unsafe: bool):
+    _boostdep_lock = threading.Lock()
+    _boostdep_paths = {}
+    _worktree_lock = threading.Lock()
+
+    def __init__(self, boost_version: str, boostdep_version: str, tmppath: Path, git_url: str, outputdir: Path, unsafe: bool,
+                 cache: Optional[BoostDependencyCache] = None, worktree: bool = False):
         self.boost_version = boost_version
         self.boostdep_version = boostdep_version
         self.git_url = git_url
         self.tmppath = tmppath
         self.outputdir = outputdir
         self.unsafe = unsafe
+        self.cache = cache or BoostDependencyCache(None)
+        self.worktree = worktree
+        self.offline = False
         self._boostdep = None
 
     @property
-    def boost_path(self) -> Path:
+    def main_boost_path(self) -> Path:
         return self.tmppath / "boost"
 
+    @property
+    def boost_path(self) -> Path:
+        if self.worktree:
+            # Each version gets its own worktree, so versions can be checked out concurrently
+            return self.tmppath / "boost-worktrees" / self.boost_version
+        return self.main_boost_path
+
     def do_git_update(self) -> None:
-        if not self.boost_path.exists():
-            with chdir(self, self.tmppath):
-                print("Cloning boost git")
-                subprocess.check_call(["git", "clone", "--", self.git_url, "boost"])
-            with chdir(self, self.boost_path):
-                print("Checking out current master")
-                subprocess.check_call(["git", "checkout", "origin/master"])
-                print("Removing master branch")
-                subprocess.check_call(["git", "branch", "-D", "master"])
+        if not self.main_boost_path.exists():
+            print("Cloning boost git")
+            subprocess.check_call(["git", "clone", "--", self.git_url, "boost"], cwd=self.tmppath)
+            print("Checking out current master")
+            subprocess.check_call(["git", "checkout", "origin/master"], cwd=self.main_boost_path)
+            print("Removing master branch")
+            subprocess.check_call(["git", "branch", "-D", "master"], cwd=self.main_boost_path)
         else:
-            with chdir(self, self.boost_path):
-                print("Updating git repo")
-                subprocess.check_call(["git", "fetch", "origin"])
-                print("Removing all local changes to git repo")
-                subprocess.check_call(["git", "reset", "--hard", "HEAD"])
-                print("Checking out current master")
-                subprocess.check_call(["git", "checkout", "origin/master"])
+            print("Updating git repo")
+            subprocess.check_call(["git", "fetch", "origin"], cwd=self.main_boost_path)
+            print("Removing all local changes to git repo")
+            subprocess.check_call(["git", "reset", "--hard", "HEAD"], cwd=self.main_boost_path)
+            print("Checking out current master")
+            subprocess.check_call(["git", "checkout", "origin/master"], cwd=self.main_boost_path)
 
     def do_git_submodule_update(self):
-        with chdir(self, self.boost_path):
-            if not self.unsafe:
-                # De-init + init to make sure that boostdep won't detect a new or removed boost library
-                print("De-init git submodules")
-                subprocess.check_call(["git", "submodule", "deinit", "--all", "-f"])
+        if self.worktree and not self.boost_path.exists():
+            with self._worktree_lock:
+                print(f"Creating worktree for version {self.boost_version}")
+                subprocess.check_call(["git", "worktree", "add", "--force", "--detach", str(self.boost_path.resolve()),
+                                       f"boost-{self.boost_version}"], cwd=self.main_boost_path)
 
-            try:
-                print(f"Checking out version {self.boost_version}")
-                subprocess.check_call(["git", "checkout", f"boost-{self.boost_version}"])
-            except subprocess.CalledProcessError:
-                print(f"version {self.boost_version} does not exist")
-                raise
+        if not self.unsafe:
+            # De-init + init to make sure that boostdep won't detect a new or removed boost library
+            print("De-init git submodules")
+            subprocess.check_call(["git", "submodule", "deinit", "--all", "-f"], cwd=self.boost_path)
 
-            print("Re-init git submodules")
-            subprocess.check_call(["git", "submodule", "update", "--init"])
+        try:
+            print(f"Checking out version {self.boost_version}")
+            subprocess.check_call(["git", "checkout", f"boost-{self.boost_version}"], cwd=self.boost_path)
+        except subprocess.CalledProcessError:
+            print(f"version {self.boost_version} does not exist")
+            raise
 
-            print("Removing unknown files/directories")
-            subprocess.check_call(["git", "clean", "-d", "-f"])
+        print("Re-init git submodules")
+        subprocess.check_call(["git", "submodule", "update", "--init"], cwd=self.boost_path)
+
+        print("Removing unknown files/directories")
+        subprocess.check_call(["git", "clean", "-d", "-f"], cwd=self.boost_path)
 
     def do_install_boostdep(self):
-        with chdir(self, self.boost_path):
-            print(f"Installing boostdep/{self.boostdep_version}")
-            cmd = ["conan", "install", "--tool-requires", f"boostdep/{self.boostdep_version}", "--format", "json", "-vquiet"]
-            info = json.loads(subprocess.check_output(cmd))
-            self._boostdep = Path(info["graph"]["nodes"]["1"]["package_folder"]) / "bin" / "boostdep"
+        # boostdep is installed once per process, and shared by all versions
+        with self._boostdep_lock:
+            if self.boostdep_version not in self._boostdep_paths:
+                print(f"Installing boostdep/{self.boostdep_version}")
+                cmd = ["conan", "install", "--tool-requires", f"boostdep/{self.boostdep_version}", "--format", "json", "-vquiet"]
+                info = json.loads(subprocess.check_output(cmd, cwd=self.main_boost_path))
+                self._boostdep_paths[self.boostdep_version] = Path(info["graph"]["nodes"]["1"]["package_folder"]) / "bin" / "boostdep"
+            self._boostdep = self._boostdep_paths[self.boostdep_version]
+
+    def _boostdep_output(self, argument: str) -> str:
+        key = f"boostdep-{self.boostdep_version} {argument}"
+        try:
+            return self.cache.get(self.boost_version, key)
+        except CacheMiss:
+            if self.offline:
+                raise
+        output = subprocess.check_output([self._boostdep, argument], text=True, cwd=self.boost_path)
+        self.cache.set(self.boost_version, key, output)
+        return output
+
+    def _read_jam(self, component: str, jam_names: Tuple[str, ...]) -> Optional[str]:
+        """Return the contents of the first Jamfile of `component` that exists"""
+        for jam_name in jam_names:
+            key = f"libs/{component}/build/{jam_name}"
+            try:
+                contents = self.cache.get(self.boost_version, key)
+            except CacheMiss:
+                if self.offline:
+                    raise
+                jam = self.boost_path / key
+                contents = jam.read_text() if jam.is_file() else None
+                self.cache.set(self.boost_version, key, contents)
+            if contents is not None:
+                return contents
+        return None
 
     _GREP_IGNORE_PREFIX = ("#", "\"")
     _GREP_IGNORE_PARTS = ("boost", "<", ">")
@@ -189,13 +276,10 @@ class BoostDependencyBuilder(object):
         return list(res)
 
     def _grep_requirements(self, component: str) -> List[str]:
-        jam = self.boost_path / "libs" / component / "build" / "Jamfile.v2"
-        if not jam.is_file():
-            jam = self.boost_path / "libs" / component / "build" / "Jamfile"
-        if not jam.is_file():
+        contents = self._read_jam(component, ("Jamfile.v2", "Jamfile"))
+        if contents is None:
             log.warning("Can't find Jamfile for %s. Unable to determine dependencies.", component)
             return []
-        contents = jam.open().read()
 
         using = self._grep_libs("\n(.*)using\\s+([^ ;:]+)\\s*", contents)
         libs = self._grep_libs("\n(.*)\\s(?:searched-)?lib\\s+([^ \t\n;:]+)", contents)
@@ -226,29 +310,28 @@ class BoostDependencyBuilder(object):
         return list(conan_requirements), system_libs, list(unknown_libs)
 
     def do_boostdep_collect(self) -> BoostDependencies:
-        with chdir(self, self.boost_path):
-            buildables = subprocess.check_output([self._boostdep, "--list-buildable"], text=True)
-            buildables = buildables.splitlines()
-            log.debug("`boostdep --list--buildable` returned these buildables: %s", buildables)
-
-            # modules = subprocess.check_output([self._boostdep_path, "--list-modules"])
-            # modules = modules.decode().splitlines()
-
-            dependency_tree = {}
-            buildable_dependencies = subprocess.check_output([self._boostdep, "--list-buildable-dependencies"], text=True)
-            log.debug("boostdep --list-buildable-dependencies returns: %s", buildable_dependencies)
-            for line in buildable_dependencies.splitlines():
-                if re.match(r"^[\s]*#.*", line):
-                    continue
-                match = re.match(r"([\S]+)\s*=\s*([^;]+)\s*;\s*", line)
-                if not match:
-                    continue
-                master = match.group(1)
-                dependencies = re.split(r"\s+", match.group(2).strip())
-                dependency_tree[master] = dependencies
-
-            log.debug("Using `boostdep --track-sources`, the following dependency tree was calculated:")
-            log.debug(pprint.pformat(dependency_tree))
+        buildables = self._boostdep_output("--list-buildable")
+        buildables = buildables.splitlines()
+        log.debug("`boostdep --list--buildable` returned these buildables: %s", buildables)
+
+        # modules = subprocess.check_output([self._boostdep_path, "--list-modules"])
+        # modules = modules.decode().splitlines()
+
+        dependency_tree = {}
+        buildable_dependencies = self._boostdep_output("--list-buildable-dependencies")
+        log.debug("boostdep --list-buildable-dependencies returns: %s", buildable_dependencies)
+        for line in buildable_dependencies.splitlines():
+            if re.match(r"^[\s]*#.*", line):
+                continue
+            match = re.match(r"([\S]+)\s*=\s*([^;]+)\s*;\s*", line)
+            if not match:
+                continue
+            master = match.group(1)
+            dependencies = re.split(r"\s+", match.group(2).strip())
+            dependency_tree[master] = dependencies
+
+        log.debug("Using `boostdep --track-sources`, the following dependency tree was calculated:")
+        log.debug(pprint.pformat(dependency_tree))
 
         filtered_dependency_tree = {k: [d for d in v if d in buildables] for k, v in dependency_tree.items() if k in buildables}
 
@@ -338,12 +421,9 @@ class BoostDependencyBuilder(object):
 
         #  Look for the names of libraries in Jam build files
         for buildable in boost_dependencies.buildables:
-            construct_jam = lambda jam_ext : self.boost_path / "libs" / buildable / "build" / f"Jamfile{jam_ext}"
-            try:
-                buildable_jam = next(construct_jam(jam_ext) for jam_ext in ("", ".v2") if construct_jam(jam_ext).is_file())
-            except StopIteration:
+            jam_text = self._read_jam(buildable, ("Jamfile", "Jamfile.v2"))
+            if jam_text is None:
                 raise Exception(f"Cannot find jam build file for {buildable}")
-            jam_text = buildable_jam.read_text()
             buildable_libs = re.findall("[ \n](boost-)?lib ([a-zA-Z0-9_]+)[ \n]", jam_text)
             buildable_libs = set(f"boost_{lib}" if lib_prefix else lib for lib_prefix, lib in buildable_libs)
             buildable_libs = set(l[len("boost_"):] for l in buildable_libs if l.startswith("boost_"))  # list(filter(lambda l: l.startswith("boost"), buildable_libs))
@@ -391,6 +471,10 @@ class BoostDependencyBuilder(object):
     def _outputpath(self) -> Path:
         return self.outputdir / f"dependencies-{self.boost_version}.yml"
 
+    @property
+    def _outputpath_json(self) -> Path:
+        return self.outputdir / f"dependencies-{self.boost_version}.json"
+
     @classmethod
     def _sort_item(cls, item):
         if isinstance(item, dict):
@@ -421,17 +505,59 @@ class BoostDependencyBuilder(object):
         print(f"Creating {self.outputdir}")
         with self._outputpath.open("w") as fout:
             yaml.dump(data, fout)
+        create_precompiled_dependency_file(data, self._outputpath_json)
+
+    def do_create_precompiled_dependency_file(self) -> None:
+        with self._outputpath.open() as fin:
+            data = yaml.safe_load(fin)
+        create_precompiled_dependency_file(data, self._outputpath_json)
+
+
+def module_closures(dependencies: Dict[str, List[str]]) -> Dict[str, Dict[str, List[str]]]:
+    """Transitive dependencies ("dependent") and dependents ("super") of each module, itself included"""
+    dependents = {}
+    for module in dependencies:
+        closure = {module}
+        stack = [module]
+        while stack:
+            for dependency in dependencies.get(stack.pop(), []):
+                if dependency not in closure:
+                    closure.add(dependency)
+                    stack.append(dependency)
+        dependents[module] = closure
+    supers = {}
+    for module, closure in dependents.items():
+        for dependency in closure:
+            supers.setdefault(dependency, {dependency}).add(module)
+    return {
+        "dependent": {k: sorted(v) for k, v in sorted(dependents.items())},
+        "super": {k: sorted(v) for k, v in sorted(supers.items())},
+    }
+
+
+def create_precompiled_dependency_file(data: dict, path: Path) -> None:
+    """Write the dependency data as JSON, with module closures expanded, which the recipe loads faster than YAML"""
+    data = dict(data)
+    data["closures"] = module_closures(data["dependencies"])
+    print(f"Creating {path}")
+    with path.open("w") as fout:
+        json.dump(data, fout, separators=(",", ":"), sort_keys=True)
+        fout.write("\n")
 
 
 def main(args=None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--verbose", dest="verbose", action="store_true", help="verbose output")
-    parser.add_argument("-t", dest="tmppath", help="temporary folder where to clone boost (default is system temporary folder)")
+    parser.add_argument("-t", dest="tmppath", type=Path, help="temporary folder where to clone boost (default is system temporary folder)")
     parser.add_argument("-d", dest="boostdep_version", default="1.82.0", type=str, help="boostdep version")
     parser.add_argument("-u", dest="git_url", default=BOOST_GIT_URL, help="boost git url")
     parser.add_argument("-U", dest="git_update", action="store_true", help="update the git repo")
     parser.add_argument("-o", dest="outputdir", default=None, type=Path, help="output dependency dir")
     parser.add_argument("-x", dest="unsafe", action="store_true", help="unsafe fast(er) operation")
+    parser.add_argument("-J", dest="json_only", action="store_true", help="only regenerate the JSON files from the existing YAML files")
+    parser.add_argument("-j", dest="jobs", default=1, type=int, help="number of boost versions regenerated concurrently, each in its own git worktree (the boostdep queries of one version still run one after the other)")
+    parser.add_argument("-c", dest="cache", default=None, type=Path, help="boostdep results cache file (default is boost-dependencies-cache.json in the temporary folder)")
+    parser.add_argument("-C", dest="no_cache", action="store_true", help="do not use the boostdep results cache")
 
     version_group = parser.add_mutually_exclusive_group(required=True)
     version_group.add_argument("-v", dest="boost_version", help="boost version")
@@ -451,40 +577,65 @@ def main(args=None) -> int:
 
     ns.outputdir.mkdir(exist_ok=True)
 
-    git_update_done = False
-
     if ns.boost_version is None:
         conan_data = yaml.safe_load(Path("conandata.yml").open())
         boost_versions = list(conan_data["sources"].keys())
     else:
         boost_versions = [ns.boost_version]
 
-    for boost_version in boost_versions:
-        print(f"Starting {boost_version}")
-        boost_collector = BoostDependencyBuilder(
+    cache = BoostDependencyCache(None if ns.no_cache else (ns.cache or ns.tmppath / "boost-dependencies-cache.json"))
+
+    def create_builder(boost_version):
+        return BoostDependencyBuilder(
             boost_version=boost_version,
             boostdep_version=ns.boostdep_version,
             git_url=ns.git_url,
             outputdir=ns.outputdir,
             tmppath=ns.tmppath,
             unsafe=ns.unsafe,
+            cache=cache,
+            worktree=ns.jobs > 1,
         )
 
-        if not ns.git_update and not boost_collector.boost_path.exists():
-            log.error("Boost directory does not exist. Re-execute this script with -U to run 'git update'.")
-            return 1
+    if ns.json_only:
+        for boost_version in boost_versions:
+            print(f"Starting {boost_version}")
+            create_builder(boost_version).do_create_precompiled_dependency_file()
+        return 0
 
-        if ns.git_update and not git_update_done:
-            boost_collector.do_git_update()
-            git_update_done = True
+    if ns.git_update:
+        create_builder(boost_versions[0]).do_git_update()
+
+    def regenerate(boost_version) -> bool:
+        print(f"Starting {boost_version}")
+        boost_collector = create_builder(boost_version)
+
+        # Try without touching git first: everything may already be cached
+        boost_collector.offline = True
+        try:
+            boost_collector.do_create_dependency_file()
+            return True
+        except CacheMiss:
+            boost_collector.offline = False
+
+        if not boost_collector.main_boost_path.exists():
+            log.error("Boost directory does not exist. Re-execute this script with -U to run 'git update'.")
+            return False
 
         boost_collector.do_git_submodule_update()
 
         boost_collector.do_install_boostdep()
 
         boost_collector.do_create_dependency_file()
-    return 0
+        cache.save()
+        return True
 
+    if ns.jobs > 1:
+        with ThreadPoolExecutor(max_workers=ns.jobs) as executor:
+            results = list(executor.map(regenerate, boost_versions))
+    else:
+        results = [regenerate(boost_version) for boost_version in boost_versions]
+    return 0 if all(results) else 1
 
 if __name__ == "__main__":
     import sys
@@ -6,12 +6,14 @@ from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.apple import is_apple_os, fix_apple_shared_install_name
 from conan.tools.env import VirtualRunEnv
-from conan.tools.files import apply_conandata_patches, copy, export_conandata_patches, get, load, mkdir, replace_in_file, rm, rmdir, save, unzip
+from conan.tools.files import apply_conandata_patches, copy, export_conandata_patches, get, mkdir, rm, rmdir, save, unzip
 from conan.tools.gnu import Autotools, AutotoolsToolchain, AutotoolsDeps, PkgConfigDeps
 from conan.tools.layout import basic_layout
 from conan.tools.microsoft import MSBuildDeps, MSBuildToolchain, MSBuild, is_msvc, is_msvc_static_runtime, msvc_runtime_flag, msvs_toolset
 from conan.tools.scm import Version
 
+from file_edits import FileEdits
+
 required_conan_version = ">=1.58.0"
 
 
@@ -61,6 +63,7 @@ class CPythonConan(ConanFile):
         # options that don't change package id
         "env_vars": True,
     }
+    exports = "file_edits.py"
     short_paths = True
 
     @property
@@ -256,29 +259,23 @@ class CPythonConan(ConanFile):
     def _msvc_project_path(self, name):
         return os.path.join(self.source_folder, "PCBuild", f"{name}.vcxproj")
 
-    def _regex_replace_in_file(self, filename, pattern, replacement):
-        content = load(self, filename)
-        content = re.sub(pattern, replacement, content)
-        save(self, filename, content)
-
-    def _inject_conan_props_file(self, project_basename, dep_name, condition=True):
+    def _inject_conan_props_file(self, edits, project_basename, dep_name, condition=True):
         if condition:
             search = '<Import Project="python.props" />'
-            replace_in_file(self,
-                            self._msvc_project_path(project_basename),
-                            search,
-                            search + f'<Import Project="{self.generators_folder}/conan_{dep_name}.props" />')
+            edits.replace(self._msvc_project_path(project_basename),
+                          search,
+                          search + f'<Import Project="{self.generators_folder}/conan_{dep_name}.props" />')
 
-    def _patch_setup_py(self):
+    def _patch_setup_py(self, edits):
         setup_py = os.path.join(self.source_folder, "setup.py")
         if Version(self.version) < "3.10":
-            replace_in_file(self, setup_py, ":libmpdec.so.2", "mpdec")
+            edits.replace(setup_py, ":libmpdec.so.2", "mpdec")
 
         if self.options.get_safe("with_curses", False):
             libcurses = self.dependencies["ncurses"].cpp_info.components["libcurses"]
             tinfo = self.dependencies["ncurses"].cpp_info.components["tinfo"]
             libs = libcurses.libs + libcurses.system_libs + tinfo.libs + tinfo.system_libs
-            replace_in_file(self, setup_py,
+            edits.replace(setup_py,
                 "curses_libs = ",
                 "curses_libs = {} #".format(repr(libs)))
 
@@ -286,133 +283,134 @@ class CPythonConan(ConanFile):
             openssl = self.dependencies["openssl"].cpp_info.aggregated_components()
             zlib = self.dependencies["zlib"].cpp_info.aggregated_components()
             if Version(self.version) < "3.11":
-                replace_in_file(self, setup_py,
-                                "openssl_includes = ",
-                                f"openssl_includes = {openssl.includedirs + zlib.includedirs} #")
-                replace_in_file(self, setup_py,
-                                "openssl_libdirs = ",
-                                f"openssl_libdirs = {openssl.libdirs + zlib.libdirs} #")
-                replace_in_file(self, setup_py,
-                                "openssl_libs = ",
-                                f"openssl_libs = {openssl.libs + zlib.libs} #")
+                edits.replace(setup_py,
+                              "openssl_includes = ",
+                              f"openssl_includes = {openssl.includedirs + zlib.includedirs} #")
+                edits.replace(setup_py,
+                              "openssl_libdirs = ",
+                              f"openssl_libdirs = {openssl.libdirs + zlib.libdirs} #")
+                edits.replace(setup_py,
+                              "openssl_libs = ",
+                              f"openssl_libs = {openssl.libs + zlib.libs} #")
 
             if Version(self.version) < "3.11":
-                replace_in_file(self, setup_py, "if (MACOS and self.detect_tkinter_darwin())", "if (False)")
+                edits.replace(setup_py, "if (MACOS and self.detect_tkinter_darwin())", "if (False)")
 
-    def _patch_msvc_projects(self):
+    def _patch_msvc_projects(self, edits):
         # Don't build vendored bz2
-        self._regex_replace_in_file(self._msvc_project_path("_bz2"), r'.*Include=\"\$\(bz2Dir\).*', "")
+        edits.regex_replace(self._msvc_project_path("_bz2"), r'.*Include=\"\$\(bz2Dir\).*', "")
 
         if self._supports_modules:
             # Don't import vendored libffi
-            replace_in_file(self, self._msvc_project_path("_ctypes"), '<Import Project="libffi.props" />', "")
+            edits.replace(self._msvc_project_path("_ctypes"), '<Import Project="libffi.props" />', "")
             if Version(self.version) < "3.11":
                 # Don't add this define, it should be added conditionally by the libffi package
-                replace_in_file(self, self._msvc_project_path("_ctypes"), "FFI_BUILDING;", "")
+                edits.replace(self._msvc_project_path("_ctypes"), "FFI_BUILDING;", "")
 
         # Don't import vendored openssl
-        replace_in_file(self, self._msvc_project_path("_hashlib"), '<Import Project="openssl.props" />', "")
-        replace_in_file(self, self._msvc_project_path("_ssl"), '<Import Project="openssl.props" />', "")
+        edits.replace(self._msvc_project_path("_hashlib"), '<Import Project="openssl.props" />', "")
+        edits.replace(self._msvc_project_path("_ssl"), '<Import Project="openssl.props" />', "")
 
         # For mpdecimal, we need to remove all headers and all c files *except* the main module file, _decimal.c
-        self._regex_replace_in_file(self._msvc_project_path("_decimal"), r'.*Include=\"\.\.\\Modules\\_decimal\\.*\.h.*', "")
-        self._regex_replace_in_file(self._msvc_project_path("_decimal"), r'.*Include=\"\.\.\\Modules\\_decimal\\libmpdec\\.*\.c.*', "")
+        edits.regex_replace(self._msvc_project_path("_decimal"), r'.*Include=\"\.\.\\Modules\\_decimal\\.*\.h.*', "")
+        edits.regex_replace(self._msvc_project_path("_decimal"), r'.*Include=\"\.\.\\Modules\\_decimal\\libmpdec\\.*\.c.*', "")
         # There is also an assembly file with a complicated build step as part of the mpdecimal build
-        replace_in_file(self, self._msvc_project_path("_decimal"), "<CustomBuild", "<!--<CustomBuild")
-        replace_in_file(self, self._msvc_project_path("_decimal"), "</CustomBuild>", "</CustomBuild>-->")
+        edits.replace(self._msvc_project_path("_decimal"), "<CustomBuild", "<!--<CustomBuild")
+        edits.replace(self._msvc_project_path("_decimal"), "</CustomBuild>", "</CustomBuild>-->")
         # Remove extra include directory
-        replace_in_file(self, self._msvc_project_path("_decimal"), r"..\Modules\_decimal\libmpdec;", "")
+        edits.replace(self._msvc_project_path("_decimal"), r"..\Modules\_decimal\libmpdec;", "")
 
         # Don't include vendored sqlite3
-        replace_in_file(self, self._msvc_project_path("_sqlite3"),
-                        '<ProjectReference Include="sqlite3.vcxproj">',
-                        '<ProjectReference Include="sqlite3.vcxproj" Condition="False">')
+        edits.replace(self._msvc_project_path("_sqlite3"),
+                      '<ProjectReference Include="sqlite3.vcxproj">',
+                      '<ProjectReference Include="sqlite3.vcxproj" Condition="False">')
 
         # Remove hardcoded reference to lzma library
-        replace_in_file(self, self._msvc_project_path("_lzma"), "<AdditionalDependencies>$(OutDir)liblzma$(PyDebugExt).lib;", "<AdditionalDependencies>")
+        edits.replace(self._msvc_project_path("_lzma"), "<AdditionalDependencies>$(OutDir)liblzma$(PyDebugExt).lib;", "<AdditionalDependencies>")
         # Don't include vendored lzma
-        replace_in_file(self, self._msvc_project_path("_lzma"),
-                        '<ProjectReference Include="liblzma.vcxproj">',
-                        '<ProjectReference Include="liblzma.vcxproj" Condition="False">')
+        edits.replace(self._msvc_project_path("_lzma"),
+                      '<ProjectReference Include="liblzma.vcxproj">',
+                      '<ProjectReference Include="liblzma.vcxproj" Condition="False">')
 
         # Don't include vendored expat project
-        replace_in_file(self, self._msvc_project_path("pyexpat"),
-                        r"<AdditionalIncludeDirectories>$(PySourcePath)Modules\expat;",
-                        "<AdditionalIncludeDirectories>")
+        edits.replace(self._msvc_project_path("pyexpat"),
+                      r"<AdditionalIncludeDirectories>$(PySourcePath)Modules\expat;",
+                      "<AdditionalIncludeDirectories>")
         # Remove XML_STATIC, this should conditionally be set by the expat library.
         # TODO: Why HAVE_EXPAT_H? (It is at least removed in later versions)
-        replace_in_file(self, self._msvc_project_path("pyexpat"), ("HAVE_EXPAT_H;" if Version(self.version) < "3.11" else "") + "XML_STATIC;", "")
-        self._regex_replace_in_file(self._msvc_project_path("pyexpat"), r'.*Include=\"\.\.\\Modules\\expat\\.*" />', "")
+        edits.replace(self._msvc_project_path("pyexpat"), ("HAVE_EXPAT_H;" if Version(self.version) < "3.11" else "") + "XML_STATIC;", "")
+        edits.regex_replace(self._msvc_project_path("pyexpat"), r'.*Include=\"\.\.\\Modules\\expat\\.*" />', "")
 
         # Don't include vendored expat headers
-        replace_in_file(self, self._msvc_project_path("_elementtree"),
-                        r"<AdditionalIncludeDirectories>..\Modules\expat;",
-                        "<AdditionalIncludeDirectories>")
+        edits.replace(self._msvc_project_path("_elementtree"),
+                      r"<AdditionalIncludeDirectories>..\Modules\expat;",
+                      "<AdditionalIncludeDirectories>")
         # Remove XML_STATIC, this should conditionally be set by the expat library.
-        replace_in_file(self, self._msvc_project_path("_elementtree"), "XML_STATIC;", "")
+        edits.replace(self._msvc_project_path("_elementtree"), "XML_STATIC;", "")
         # Remove vendored expat
-        self._regex_replace_in_file(self._msvc_project_path("_elementtree"), r'.*Include=\"\.\.\\Modules\\expat\\.*" />', "")
+        edits.regex_replace(self._msvc_project_path("_elementtree"), r'.*Include=\"\.\.\\Modules\\expat\\.*" />', "")
 
         if Version(self.version) >= "3.9":
             # deflate.c has warning 4244 disabled, need special patching else it breaks the regex below
             # Add an extra space to avoid being picked up by the regex
-            replace_in_file(self, self._msvc_project_path("pythoncore"),
-                            r'<ClCompile Include="$(zlibDir)\deflate.c">',
-                            r'<ClCompile Include= "$(zlibDir)\deflate.c" Condition="False">')
+            edits.replace(self._msvc_project_path("pythoncore"),
+                          r'<ClCompile Include="$(zlibDir)\deflate.c">',
+                          r'<ClCompile Include= "$(zlibDir)\deflate.c" Condition="False">')
         # Don't use vendored zlib
-        self._regex_replace_in_file(self._msvc_project_path("pythoncore"), r'.*Include=\"\$\(zlibDir\).*', "")
+        edits.regex_replace(self._msvc_project_path("pythoncore"), r'.*Include=\"\$\(zlibDir\).*', "")
 
         # Don't use vendored tcl/tk include dir
-        replace_in_file(self, self._msvc_project_path("_tkinter"), "<AdditionalIncludeDirectories>$(tcltkDir)include;", "<AdditionalIncludeDirectories>")
+        edits.replace(self._msvc_project_path("_tkinter"), "<AdditionalIncludeDirectories>$(tcltkDir)include;", "<AdditionalIncludeDirectories>")
         # Don't use hardcoded tcl/tk library
-        replace_in_file(self, self._msvc_project_path("_tkinter"), "<AdditionalDependencies>$(tcltkLib);", "<AdditionalDependencies>")
+        edits.replace(self._msvc_project_path("_tkinter"), "<AdditionalDependencies>$(tcltkLib);", "<AdditionalDependencies>")
         # TODO: Why?
-        replace_in_file(self, self._msvc_project_path("_tkinter"),
-                        "<PreprocessorDefinitions Condition=\"'$(BuildForRelease)' != 'true'\">",
-                        "<PreprocessorDefinitions Condition='False'>")
+        edits.replace(self._msvc_project_path("_tkinter"),
+                      "<PreprocessorDefinitions Condition=\"'$(BuildForRelease)' != 'true'\">",
+                      "<PreprocessorDefinitions Condition='False'>")
         # Don't use vendored tcl/tk
-        self._regex_replace_in_file(self._msvc_project_path("_tkinter"), r'.*Include=\"\$\(tcltkdir\).*', "")
+        edits.regex_replace(self._msvc_project_path("_tkinter"), r'.*Include=\"\$\(tcltkdir\).*', "")
 
         # Disable "ValidateUcrtbase" target (TODO: Why?)
-        replace_in_file(self, self._msvc_project_path("python"), "$(Configuration) != 'PGInstrument'", "False")
+        edits.replace(self._msvc_project_path("python"), "$(Configuration) != 'PGInstrument'", "False")
 
         if Version(self.version) < "3.11":
             # TODO: Why?
-            replace_in_file(self, self._msvc_project_path("_freeze_importlib"),
-                            "<Target Name=\"RebuildImportLib\" AfterTargets=\"AfterBuild\" Condition=\"$(Configuration) == 'Debug' or $(Configuration) == 'Release'\"",
-                            "<Target Name=\"RebuildImportLib\" AfterTargets=\"AfterBuild\" Condition=\"False\"")
+            edits.replace(self._msvc_project_path("_freeze_importlib"),
+                          "<Target Name=\"RebuildImportLib\" AfterTargets=\"AfterBuild\" Condition=\"$(Configuration) == 'Debug' or $(Configuration) == 'Release'\"",
+                          "<Target Name=\"RebuildImportLib\" AfterTargets=\"AfterBuild\" Condition=\"False\"")
 
         # Remove vendored openssl file
-        replace_in_file(self, self._msvc_project_path("_ssl"),
-                        r'<ClCompile Include="$(opensslIncludeDir)\applink.c">',
-                        r'<ClCompile Include="$(opensslIncludeDir)\applink.c" Condition="False">')
-
-        self._inject_conan_props_file("_bz2", "bzip2", self.options.get_safe("with_bz2"))
-        self._inject_conan_props_file("_elementtree", "expat", self._supports_modules)
-        self._inject_conan_props_file("pyexpat", "expat", self._supports_modules)
-        self._inject_conan_props_file("_hashlib", "openssl", self._supports_modules)
-        self._inject_conan_props_file("_ssl", "openssl", self._supports_modules)
-        self._inject_conan_props_file("_sqlite3", "sqlite3", self.options.get_safe("with_sqlite3"))
-        self._inject_conan_props_file("_tkinter", "tk", self.options.get_safe("with_tkinter"))
-        self._inject_conan_props_file("pythoncore", "zlib")
-        self._inject_conan_props_file("python", "zlib")
-        self._inject_conan_props_file("pythonw", "zlib")
-        self._inject_conan_props_file("_ctypes", "libffi", self._supports_modules)
-        self._inject_conan_props_file("_decimal", "mpdecimal", self._supports_modules)
-        self._inject_conan_props_file("_lzma", "xz_utils", self.options.get_safe("with_lzma"))
-        self._inject_conan_props_file("_bsddb", "libdb", self.options.get_safe("with_bsddb"))
+        edits.replace(self._msvc_project_path("_ssl"),
+                      r'<ClCompile Include="$(opensslIncludeDir)\applink.c">',
+                      r'<ClCompile Include="$(opensslIncludeDir)\applink.c" Condition="False">')
+
+        self._inject_conan_props_file(edits, "_bz2", "bzip2", self.options.get_safe("with_bz2"))
+        self._inject_conan_props_file(edits, "_elementtree", "expat", self._supports_modules)
+        self._inject_conan_props_file(edits, "pyexpat", "expat", self._supports_modules)
+        self._inject_conan_props_file(edits, "_hashlib", "openssl", self._supports_modules)
+        self._inject_conan_props_file(edits, "_ssl", "openssl", self._supports_modules)
+        self._inject_conan_props_file(edits, "_sqlite3", "sqlite3", self.options.get_safe("with_sqlite3"))
+        self._inject_conan_props_file(edits, "_tkinter", "tk", self.options.get_safe("with_tkinter"))
+        self._inject_conan_props_file(edits, "pythoncore", "zlib")
+        self._inject_conan_props_file(edits, "python", "zlib")
+        self._inject_conan_props_file(edits, "pythonw", "zlib")
+        self._inject_conan_props_file(edits, "_ctypes", "libffi", self._supports_modules)
+        self._inject_conan_props_file(edits, "_decimal", "mpdecimal", self._supports_modules)
+        self._inject_conan_props_file(edits, "_lzma", "xz_utils", self.options.get_safe("with_lzma"))
+        self._inject_conan_props_file(edits, "_bsddb", "libdb", self.options.get_safe("with_bsddb"))
 
     def _patch_sources(self):
         apply_conandata_patches(self)
+        edits = FileEdits(self)
         # <=3.10 requires a lot of manual injection of dependencies through setup.py
         # 3.12 removes setup.py completely, and uses pkgconfig dependencies
         # 3.11 is an in awkward transition state where some dependencies use pkgconfig, and others use setup.py
         if Version(self.version) < "3.12":
-            self._patch_setup_py()
+            self._patch_setup_py(edits)
         if Version(self.version) >= "3.11":
-            replace_in_file(self, os.path.join(self.source_folder, "configure"),
-                            'OPENSSL_LIBS="-lssl -lcrypto"',
-                            'OPENSSL_LIBS="-lssl -lcrypto -lz"')
+            edits.replace(os.path.join(self.source_folder, "configure"),
+                          'OPENSSL_LIBS="-lssl -lcrypto"',
+                          'OPENSSL_LIBS="-lssl -lcrypto -lz"')
         if is_msvc(self):
             runtime_library = {
                 "MT": "MultiThreaded",
@@ -421,55 +419,56 @@ class CPythonConan(ConanFile):
                 "MDd": "MultiThreadedDebugDLL",
             }[msvc_runtime_flag(self)]
             self.output.info("Patching runtime")
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "pyproject.props"),
-                            "MultiThreadedDLL", runtime_library)
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "pyproject.props"),
-                            "MultiThreadedDebugDLL", runtime_library)
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "pyproject.props"),
+                          "MultiThreadedDLL", runtime_library)
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "pyproject.props"),
+                          "MultiThreadedDebugDLL", runtime_library)
 
         # Remove vendored packages
         rmdir(self, os.path.join(self.source_folder, "Modules", "_decimal", "libmpdec"))
         rmdir(self, os.path.join(self.source_folder, "Modules", "expat"))
 
         if Version(self.version) < "3.12":
-            replace_in_file(self, os.path.join(self.source_folder, "Makefile.pre.in"),
-                            "$(RUNSHARED) CC='$(CC)' LDSHARED='$(BLDSHARED)' OPT='$(OPT)'",
-                            "$(RUNSHARED) CC='$(CC) $(CONFIGURE_CFLAGS) $(CONFIGURE_CPPFLAGS)' LDSHARED='$(BLDSHARED)' OPT='$(OPT)'")
+            edits.replace(os.path.join(self.source_folder, "Makefile.pre.in"),
+                          "$(RUNSHARED) CC='$(CC)' LDSHARED='$(BLDSHARED)' OPT='$(OPT)'",
+                          "$(RUNSHARED) CC='$(CC) $(CONFIGURE_CFLAGS) $(CONFIGURE_CPPFLAGS)' LDSHARED='$(BLDSHARED)' OPT='$(OPT)'")
 
         # Enable static MSVC cpython
         if not self.options.shared:
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "pythoncore.vcxproj"),
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "pythoncore.vcxproj"),
                 "<PreprocessorDefinitions>",
                 "<PreprocessorDefinitions>Py_NO_BUILD_SHARED;")
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "pythoncore.vcxproj"),
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "pythoncore.vcxproj"),
                 "Py_ENABLE_SHARED",
                 "Py_NO_ENABLE_SHARED")
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "pythoncore.vcxproj"),
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "pythoncore.vcxproj"),
                 "DynamicLibrary",
                 "StaticLibrary")
 
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "python.vcxproj"),
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "python.vcxproj"),
                 "<Link>",
                 "<Link><AdditionalDependencies>shlwapi.lib;ws2_32.lib;pathcch.lib;version.lib;%(AdditionalDependencies)</AdditionalDependencies>")
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "python.vcxproj"),
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "python.vcxproj"),
                 "<PreprocessorDefinitions>",
                 "<PreprocessorDefinitions>Py_NO_ENABLE_SHARED;")
 
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "pythonw.vcxproj"),
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "pythonw.vcxproj"),
                 "<Link>",
                 "<Link><AdditionalDependencies>shlwapi.lib;ws2_32.lib;pathcch.lib;version.lib;%(AdditionalDependencies)</AdditionalDependencies>")
-            replace_in_file(self, os.path.join(self.source_folder, "PCbuild", "pythonw.vcxproj"),
+            edits.replace(os.path.join(self.source_folder, "PCbuild", "pythonw.vcxproj"),
                 "<ItemDefinitionGroup>",
                 "<ItemDefinitionGroup><ClCompile><PreprocessorDefinitions>Py_NO_ENABLE_SHARED;%(PreprocessorDefinitions)</PreprocessorDefinitions></ClCompile>")
 
         conantoolchain_props = os.path.join(self.generators_folder, MSBuildToolchain.filename)
-        replace_in_file(
-            self, os.path.join(self.source_folder, "PCbuild", "pythoncore.vcxproj"),
+        edits.replace(
+            os.path.join(self.source_folder, "PCbuild", "pythoncore.vcxproj"),
             '<Import Project="python.props" />',
             f'<Import Project="{conantoolchain_props}" /><Import Project="python.props" />',
         )
 
         if is_msvc(self):
-            self._patch_msvc_projects()
+            self._patch_msvc_projects(edits)
+        edits.apply()
 
     @property
     def _solution_projects(self):
@@ -0,0 +1,59 @@
+import os
+import re
+
+from conan.errors import ConanException
+from conan.tools.files import load, save
+
+
+class FileEdits:
+    """Literal and regex replacements in text files, applied with a single load and save of each file
+
+    Edits are queued with replace() and regex_replace(), then applied by apply(), in the order they
+    were queued. Literal edits behave like replace_in_file(): every occurrence is replaced, and an
+    edit which does not match is an error, or a warning with strict=False. Regex edits behave like
+    re.sub(): they are not strict by default, as they remove entries which only some versions have.
+
+    All the strict edits which did not match are reported in a single ConanException, raised once
+    every file has been edited.
+    """
+
+    def __init__(self, conanfile):
+        self._conanfile = conanfile
+        self._edits = {}
+
+    def _queue(self, path, edit):
+        # The same file may be reached through differently cased paths on Windows
+        self._edits.setdefault(os.path.normcase(os.path.abspath(path)), (path, []))[1].append(edit)
+
+    def replace(self, path, search, replace, strict=True):
+        self._queue(path, (False, search, replace, strict))
+
+    def regex_replace(self, path, pattern, replace, strict=False):
+        self._queue(path, (True, pattern, replace, strict))
+
+    def apply(self):
+        """Apply the queued edits, returning the (path, pattern) of the ones which did not match"""
+        unmatched = []
+        errors = []
+        for path, edits in self._edits.values():
+            content = original = load(self._conanfile, path)
+            for is_regex, pattern, replace, strict in edits:
+                if is_regex:
+                    content, count = re.subn(pattern, replace, content)
+                else:
+                    count = content.count(pattern)
+                    content = content.replace(pattern, replace)
+                if count:
+                    continue
+                unmatched.append((path, pattern))
+                message = f"didn't find pattern '{pattern}' in '{path}' file."
+                if strict:
+                    errors.append(message)
+                elif not is_regex:
+                    self._conanfile.output.warning(message)
+            if content != original:
+                save(self._conanfile, path, content)
+        self._edits = {}
+        if errors:
+            raise ConanException("\n".join(errors))
+        return unmatched
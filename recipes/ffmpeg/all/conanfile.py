@@ -13,6 +13,7 @@ from conan.tools.microsoft import check_min_vs, is_msvc, unix_path
 from conan.tools.scm import Version
 import os
 import glob
+import json
 import shutil
 import re
 
@@ -748,26 +749,40 @@ class FFMpegConan(ConanFile):
                     for lib in glob.glob("*.a"):
                         rename(self, lib, lib[3:-2] + ".lib")
 
+        # Read once here, so that package_info() does not have to parse headers
+        component_versions = {}
+        for component_folder in glob.glob(os.path.join(self.package_folder, "include", "lib*")):
+            component_name = os.path.basename(component_folder)[3:]
+            version = self._read_component_version(component_name)
+            if version is not None:
+                component_versions[component_name] = version
+        save(self, os.path.join(self.package_folder, self._component_versions_file), json.dumps(component_versions, indent=2, sort_keys=True))
+
+    @property
+    def _component_versions_file(self):
+        return os.path.join("res", "conan-ffmpeg-component-versions.json")
+
     def _read_component_version(self, component_name):
         # since 5.1, major version may be defined in version_major.h instead of version.h
         component_folder = os.path.join(self.package_folder, "include", f"lib{component_name}")
         version_file_name = os.path.join(component_folder, "version.h")
         version_major_file_name = os.path.join(component_folder, "version_major.h")
-        pattern = f"define LIB{component_name.upper()}_VERSION_(MAJOR|MINOR|MICRO)[ \t]+(\\d+)"
+        pattern = re.compile(f"define LIB{component_name.upper()}_VERSION_(MAJOR|MINOR|MICRO)[ \t]+(\\d+)")
         version = dict()
         for file in (version_file_name, version_major_file_name):
             if os.path.isfile(file):
-                with open(file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        match = re.search(pattern, line)
-                        if match:
-                            version[match[1]] = match[2]
+                for match in pattern.finditer(load(self, file)):
+                    version[match[1]] = match[2]
         if "MAJOR" in version and "MINOR" in version and "MICRO" in version:
             return f"{version['MAJOR']}.{version['MINOR']}.{version['MICRO']}"
         return None
 
-    def _set_component_version(self, component_name):
-        version = self._read_component_version(component_name)
+    def _set_component_version(self, component_name, component_versions):
+        if component_versions is not None:
+            version = component_versions.get(component_name)
+        else:
+            # package created before the versions were recorded
+            version = self._read_component_version(component_name)
         if version is not None:
             self.cpp_info.components[component_name].set_property("component_version", version)
             # TODO: to remove once support of conan v1 dropped
@@ -776,6 +791,11 @@ class FFMpegConan(ConanFile):
             self.output.warning(f"cannot determine version of lib{component_name} packaged with ffmpeg!")
 
     def package_info(self):
+        component_versions = None
+        component_versions_file = os.path.join(self.package_folder, self._component_versions_file)
+        if os.path.isfile(component_versions_file):
+            component_versions = json.loads(load(self, component_versions_file))
+
         if self.options.with_programs:
             if self.options.with_sdl:
                 self.cpp_info.components["programs"].requires = ["sdl::libsdl2"]
@@ -783,7 +803,7 @@ class FFMpegConan(ConanFile):
         def _add_component(name, dependencies):
             component = self.cpp_info.components[name]
             component.set_property("pkg_config_name", f"lib{name}")
-            self._set_component_version(name)
+            self._set_component_version(name, component_versions)
             component.libs = [name]
             if name != "avutil":
                 component.requires = ["avutil"]
@@ -1,3 +1,4 @@
+import importlib.util
 import os
 
 from conan import ConanFile
@@ -9,7 +10,7 @@ from conan.tools.microsoft import check_min_vs, is_msvc
 from conan.tools.scm import Version
 from conan.errors import ConanInvalidConfiguration
 
-# Load the generated component dependency information.
+# The generated component dependency information.
 #
 # `google-cloud-cpp` has well over 200 components. Conan cannot use the CMake
 # files generated by `google-cloud-cpp`. Manually maintaining this dependency
@@ -19,9 +20,13 @@ from conan.errors import ConanInvalidConfiguration
 # script will be used to generate a new file with the component dependency
 # information. The expectation is that maintaining this script will be easier
 # than writing long lists of dependencies by hand.
-import components_2_15_1
-import components_2_19_0
-import components_2_28_0
+#
+# Only the file for the version in use is loaded, when first needed.
+_COMPONENT_FILES = {
+    "2.15.1": "components_2_15_1.py",
+    "2.19.0": "components_2_19_0.py",
+    "2.28.0": "components_2_28_0.py",
+}
 
 required_conan_version = ">=1.56.0"
 
@@ -45,28 +50,12 @@ class GoogleCloudCppConan(ConanFile):
     settings = "os", "arch", "compiler", "build_type"
     options = {"shared": [True, False], "fPIC": [True, False]}
     default_options = {"shared": False, "fPIC": True}
-    exports = ["components_2_15_1.py",
-               "components_2_19_0.py",
-               "components_2_28_0.py",
-               ]
+    exports = list(_COMPONENT_FILES.values())
 
     short_paths = True
 
-    _GA_COMPONENTS = {
-        '2.15.1': components_2_15_1.COMPONENTS,
-        '2.19.0': components_2_19_0.COMPONENTS,
-        '2.28.0': components_2_28_0.COMPONENTS,
-    }
-    _PROTO_COMPONENTS = {
-        '2.15.1': components_2_15_1.PROTO_COMPONENTS,
-        '2.19.0': components_2_19_0.PROTO_COMPONENTS,
-        '2.28.0': components_2_28_0.PROTO_COMPONENTS,
-    }
-    _PROTO_COMPONENT_DEPENDENCIES = {
-        "2.15.1": components_2_15_1.DEPENDENCIES,
-        "2.19.0": components_2_19_0.DEPENDENCIES,
-        "2.28.0": components_2_28_0.DEPENDENCIES,
-    }
+    # Component tables loaded so far, by version
+    _component_tables = {}
     # Some components require custom dependency definitions.
     _REQUIRES_CUSTOM_DEPENDENCIES = {
         "bigquery", "bigtable", "iam", "oauth2", "pubsub", "spanner", "storage",
@@ -103,20 +92,9 @@ class GoogleCloudCppConan(ConanFile):
                 "Recipe not prepared for cross-building (yet)"
             )
 
-        if str(self.version) not in self._GA_COMPONENTS:
-            print(f"{type(self.version)} {self.version}")
-            raise ConanInvalidConfiguration(
-                f"The components are unknown for version {self.version}. Expected one of {self._GA_COMPONENTS.keys()}"
-            )
-
-        if str(self.version) not in self._PROTO_COMPONENTS:
-            raise ConanInvalidConfiguration(
-                f"The proto components are unknown for version {self.version}. Expected one of {self._PROTO_COMPONENTS.keys()}"
-            )
-
-        if str(self.version) not in self._PROTO_COMPONENT_DEPENDENCIES:
+        if str(self.version) not in _COMPONENT_FILES:
             raise ConanInvalidConfiguration(
-                f"The inter-component components are unknown for version {self.version}. Expected one of {self._PROTO_COMPONENT_DEPENDENCIES.keys()}"
+                f"The components are unknown for version {self.version}. Expected one of {_COMPONENT_FILES.keys()}"
             )
 
         if (
@@ -197,9 +175,32 @@ class GoogleCloudCppConan(ConanFile):
         cmake.configure()
         cmake.build()
 
+    @property
+    def _component_table(self):
+        version = str(self.version)
+        table = self._component_tables.get(version)
+        if table is None:
+            filename = os.path.join(self.recipe_folder, _COMPONENT_FILES[version])
+            spec = importlib.util.spec_from_file_location(f"google_cloud_cpp_components_{version.replace('.', '_')}", filename)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            # Most proto libraries share the same dependency list, keep a
+            # single tuple for each distinct list.
+            unique = {}
+            dependencies = {}
+            for component, deps in module.DEPENDENCIES.items():
+                deps = tuple(deps)
+                dependencies[component] = unique.setdefault(deps, deps)
+            table = {
+                "components": frozenset(module.COMPONENTS),
+                "proto_components": frozenset(module.PROTO_COMPONENTS),
+                "dependencies": dependencies,
+            }
+            self._component_tables[version] = table
+        return table
+
     def _generate_proto_requires(self, component):
-        deps = self._PROTO_COMPONENT_DEPENDENCIES.get(self.version, dict())
-        return deps.get(component, [])
+        return list(self._component_table["dependencies"].get(component, ()))
 
     _SKIPPED_COMPONENTS = {
         # Some protos do not compile due to inconvenient system macros clashing
@@ -213,7 +214,7 @@ class GoogleCloudCppConan(ConanFile):
     }
 
     def _components(self):
-        result = self._GA_COMPONENTS.get(str(self.version), []).copy()
+        result = set(self._component_table["components"])
         for c in self._SKIPPED_COMPONENTS:
             result.remove(c)
         # TODO - these do not build on Android due to conflicts between OS
@@ -226,7 +227,7 @@ class GoogleCloudCppConan(ConanFile):
         return result
 
     def _proto_components(self):
-        result = self._PROTO_COMPONENTS.get(self.version, []).copy()
+        result = set(self._component_table["proto_components"])
         for c in self._SKIPPED_COMPONENTS:
             result.remove(c + '_protos')
         # TODO - these do not build on Android due to conflicts between OS
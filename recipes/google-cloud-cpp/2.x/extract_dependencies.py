@@ -2,7 +2,11 @@
 
 import argparse
 import glob
+import hashlib
+import json
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
 """Extract google-cloud-cpp's component dependency info for use in Conan.
 
@@ -17,6 +21,10 @@ and convert them to CMake dependencies.
 
 The *.deps files themselves are generated (and committed to GitHub) from
 Bazel rules.
+
+The *.deps files can be parsed by a pool of processes (`--jobs`), and the
+parsed dependencies cached by content hash (`--cache`), so regenerating the
+table for a new release only parses the files which changed.
 """
 
 # Used in _generate_proto_requires(): common requirements
@@ -211,22 +219,81 @@ def _experimental_components(source_folder):
     return g["GOOGLE_CLOUD_CPP_EXPERIMENTAL_LIBRARIES"]
 
 
-def _generate_proto_requires(depfile):
-    """Load the dependencies for a single google-cloud-cpp::*-protos library."""
+def _generate_proto_requires(content):
+    """Parse the dependencies for a single google-cloud-cpp::*-protos library from its *.deps file content."""
     requires = []
-    with open(depfile, "r", encoding="utf-8") as f:
-        for line in f.readlines():
-            line = line.strip()
-            line = line.replace(":", "_")
-            line = line.replace("_proto", "_protos")
-            line = line.replace("@com_google_googleapis//", "")
-            line = line.replace("google/", "")
-            line = line.replace("/", "_")
-            if line in _PROTO_DEPS_REMOVED_TARGETS:
-                continue
-            line = _PROTO_DEPS_REPLACED_TARGETS.get(line, line)
-            requires.append(line)
-    return list(_PROTO_DEPS_COMMON_REQUIRES) + requires
+    for line in content.splitlines():
+        line = line.strip()
+        line = line.replace(":", "_")
+        line = line.replace("_proto", "_protos")
+        line = line.replace("@com_google_googleapis//", "")
+        line = line.replace("google/", "")
+        line = line.replace("/", "_")
+        if line in _PROTO_DEPS_REMOVED_TARGETS:
+            continue
+        line = _PROTO_DEPS_REPLACED_TARGETS.get(line, line)
+        requires.append(line)
+    return sorted(list(_PROTO_DEPS_COMMON_REQUIRES) + requires)
+
+
+class _DepsCache:
+    """Parsed *.deps files, keyed by the hash of their content
+
+    The cache is discarded when this script changes, as the parsing rules live here.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        with open(__file__, "rb") as f:
+            self._version = hashlib.sha256(f.read()).hexdigest()
+        self._entries = {}
+        if path and os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self._version:
+                self._entries = data["entries"]
+
+    def get(self, digest):
+        return self._entries.get(digest)
+
+    def set(self, digest, requires):
+        self._entries[digest] = requires
+
+    def save(self, used):
+        if not self._path:
+            return
+        # Only keep the entries of the last run, the cache does not grow with each release
+        entries = {digest: self._entries[digest] for digest in sorted(used)}
+        with open(self._path, "w", encoding="utf-8") as f:
+            json.dump({"version": self._version, "entries": entries}, f, indent=1, sort_keys=True)
+            f.write("\n")
+
+
+def _parse_proto_requires(contents, jobs):
+    if jobs == 1 or len(contents) <= 1:
+        return [_generate_proto_requires(content) for content in contents]
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_generate_proto_requires, contents, chunksize=max(1, len(contents) // (jobs * 4))))
+
+
+def _load_proto_requires(files, jobs, cache):
+    """Return the dependencies of each *.deps file, parsing only the files missing from the cache."""
+    contents = {}
+    digests = {}
+    for filename in files:
+        with open(filename, "r", encoding="utf-8") as f:
+            contents[filename] = f.read()
+        digests[filename] = hashlib.sha256(contents[filename].encode("utf-8")).hexdigest()
+    missing = {}
+    for filename in files:
+        if cache.get(digests[filename]) is None:
+            missing.setdefault(digests[filename], contents[filename])
+    for digest, requires in zip(missing, _parse_proto_requires(list(missing.values()), jobs)):
+        cache.set(digest, requires)
+    print(f"Parsed {len(missing)} of {len(files)} *.deps files", file=sys.stderr)
+    cache.save(digests.values())
+    return {filename: cache.get(digests[filename]) for filename in files}
 
 
 def main():
@@ -237,15 +304,26 @@ def main():
         "--source-folder",
         help="a directory where `google-cloud-cpp` source has been extracted",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes parsing the *.deps files (0 for the number of CPUs)",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache",
+        help="a JSON file caching the parsed *.deps files between runs",
+    )
     args = parser.parse_args()
     source_folder = vars(args)["source_folder"]
     deps_folder = os.path.join(source_folder, "external", "googleapis", "protodeps")
-    print("# Automatically generated by %s DO NOT EDIT" % __file__)
-    print("DEPENDENCIES = {")
     proto_components = _PROTO_BASE_COMPONENTS.copy()
     files = sorted(glob.glob(os.path.join(deps_folder, "*.deps")))
     experimental = set(_experimental_components(source_folder))
     components = set(_components(source_folder))
+    used_files = {}
     for filename in files:
         component = os.path.basename(filename).replace(".deps", "")
         component = _PROTO_DEPS_REPLACED_NAMES.get(component, component)
@@ -257,20 +335,24 @@ def main():
         if component == "compute":
             # `compute` does not use gRPC or the `*.deps` files.
             continue
-        component = component + "_protos"
-        deps = _generate_proto_requires(filename)
-        proto_components.add(component)
-        proto_components.update(deps)
-        print(f'    "{component}": {sorted(deps)},')
-    for component in sorted(_HARD_CODED_DEPENDENCIES.keys()):
-        deps = _HARD_CODED_DEPENDENCIES[component]
+        used_files[filename] = component + "_protos"
+    requires = _load_proto_requires(list(used_files), args.jobs or None, _DepsCache(args.cache))
+    dependencies = {}
+    for filename, component in used_files.items():
+        dependencies[component] = requires[filename]
+    for component, deps in _HARD_CODED_DEPENDENCIES.items():
+        dependencies[component] = sorted(deps)
+    dependencies["cloud_extended_operations_protos"] = ["protobuf::libprotobuf"]
+    dependencies["compute_protos"] = ["cloud_extended_operations_protos", "protobuf::libprotobuf"]
+    for component, deps in dependencies.items():
         proto_components.add(component)
         proto_components.update(deps)
-        print(f'    "{component}": {sorted(deps)},')
-    print(f'    "cloud_extended_operations_protos": ["protobuf::libprotobuf"],')
-    print(f'    "compute_protos": ["cloud_extended_operations_protos", "protobuf::libprotobuf"],')
-    proto_components.add("cloud_extended_operations_protos")
-    proto_components.add("compute_protos")
+
+    # Sorted, one entry per line, so the tables of two versions can be diffed
+    print("# Automatically generated by %s DO NOT EDIT" % os.path.basename(__file__))
+    print("DEPENDENCIES = {")
+    for component in sorted(dependencies):
+        print(f'    "{component}": {dependencies[component]},')
     print("}")
     proto_components = proto_components - _PROTO_DEPS_COMMON_REQUIRES
     names = ['"%s"' % c for c in proto_components]
@@ -1,9 +1,11 @@
 import functools
 import glob
+import hashlib
+import json
 import os
 
 from conan import ConanFile
-from conan.errors import ConanInvalidConfiguration
+from conan.errors import ConanException, ConanInvalidConfiguration
 from conan.tools.build import check_min_cppstd
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
 from conan.tools.env import VirtualBuildEnv, VirtualRunEnv
@@ -11,7 +13,11 @@ from conan.tools.files import apply_conandata_patches, copy, export_conandata_pa
 from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
 
-from helpers import parse_proto_libraries
+from helpers import (
+    PROTOBUF_TARGET, activate_libraries, cmake_dependencies, cmake_target_name, load_proto_libraries,
+    parse_proto_libraries, save_proto_libraries, write_cmake_targets
+)
+from package_files import copy_routes
 
 required_conan_version = ">=1.60.0 <2 || >=2.0.5"
 
@@ -33,7 +39,7 @@ class GoogleAPIS(ConanFile):
         "shared": False,
         "fPIC": True,
     }
-    exports = "helpers.py"
+    exports = "helpers.py", "package_files.py"
     short_paths = True
 
     @property
@@ -90,34 +96,50 @@ class GoogleAPIS(ConanFile):
         deps = CMakeDeps(self)
         deps.generate()
 
-    @functools.lru_cache(1)
-    def _parse_proto_libraries(self):
-        # Generate the libraries to build dynamically
+    @property
+    def _proto_libraries_index(self):
+        return os.path.join(self.build_folder, "proto_libraries.json")
+
+    @property
+    def _proto_libraries_key(self):
+        # Identifies the (patched) sources and the parser, without scanning the source tree
+        h = hashlib.sha256()
+        h.update(json.dumps(self.conan_data["sources"][str(self.version)], sort_keys=True).encode())
+        h.update(json.dumps(self.conan_data.get("patches", {}).get(str(self.version), []), sort_keys=True).encode())
+        with open(os.path.join(self.recipe_folder, "helpers.py"), "rb") as f:
+            h.update(f.read())
+        return h.hexdigest()
+
+    def _scan_proto_libraries(self):
+        key = self._proto_libraries_key
+        proto_libraries = load_proto_libraries(self._proto_libraries_index, key)
+        if proto_libraries is not None:
+            return proto_libraries
+
+        repositories = {"@com_google_protobuf": PROTOBUF_TARGET, "@com_google_googleapis": None}
         proto_libraries = []
         for filename in glob.iglob(os.path.join(self.source_folder, 'google', '**', 'BUILD.bazel'), recursive=True):
-            proto_libraries += parse_proto_libraries(filename, self.source_folder, self.output.error)
+            proto_libraries += parse_proto_libraries(filename, self.source_folder, repositories, self.output.error)
 
         for filename in glob.iglob(os.path.join(self.source_folder, 'grafeas', '**', 'BUILD.bazel'), recursive=True):
-            proto_libraries += parse_proto_libraries(filename, self.source_folder, self.output.error)
+            proto_libraries += parse_proto_libraries(filename, self.source_folder, repositories, self.output.error)
 
         # Validate that all files exist and all dependencies are found
-        all_deps = [f"{it.qname}:{it.name}" for it in proto_libraries]
-        all_deps += ["protobuf::libprotobuf"]
+        all_deps = set(it.label for it in proto_libraries)
+        all_deps.add(PROTOBUF_TARGET)
         for it in proto_libraries:
             it.validate(self.source_folder, all_deps)
 
-        # Mark the libraries we need recursively (C++ context)
-        all_dict = {f"{it.qname}:{it.name}": it for it in proto_libraries}
+        save_proto_libraries(self._proto_libraries_index, key, proto_libraries)
+        return proto_libraries
 
-        def activate_library(proto_library):
-            proto_library.is_used = True
-            for it_dep in proto_library.deps:
-                if it_dep == "protobuf::libprotobuf":
-                    continue
-                activate_library(all_dict[it_dep])
+    @functools.lru_cache(1)
+    def _parse_proto_libraries(self):
+        # Generate the libraries to build dynamically
+        proto_libraries = self._scan_proto_libraries()
 
-        for it in filter(lambda u: u.is_used, proto_libraries):
-            activate_library(it)
+        # Mark the libraries we need recursively (C++ context)
+        all_dict = activate_libraries(proto_libraries)
 
         # Tweaks
         def deactivate_library(key):
@@ -172,29 +194,54 @@ class GoogleAPIS(ConanFile):
         with open(os.path.join(self.source_folder, "generated_targets.cmake"), "w", encoding="utf-8") as f:
             f.write("# Generated C++ library targets for googleapis\n")
             f.write("# DO NOT EDIT - change the generation code in conanfile.py instead\n")
-            for it in filter(lambda u: u.is_used, proto_libraries):
-                f.write(it.cmake_content)
+            write_cmake_targets(f, proto_libraries, short_name=self._short_cmake_target)
         cmake = CMake(self)
         cmake.configure()
         cmake.build()
 
+    @staticmethod
+    def _short_cmake_target(cmake_target):
+        # Shorter target names give shorter paths for the generated projects
+        short_name = cmake_target
+        prefix = "google_"
+        suffix = "_proto"
+        if cmake_target.startswith(prefix):
+            short_name = short_name[len(prefix):]
+        if short_name.endswith(suffix):
+            short_name = short_name[:-len(suffix)]
+        return short_name
+
     _DEPS_FILE = "res/generated_targets.deps"
 
-    def package(self):
-        copy(self, pattern="LICENSE", src=self.source_folder, dst=os.path.join(self.package_folder, "licenses"))
-        copy(self, pattern="*.proto", src=self.source_folder, dst=os.path.join(self.package_folder, "res"))
-        copy(self, pattern="*.pb.h", src=self.build_folder, dst=os.path.join(self.package_folder, "include"))
+    @property
+    def _package_links(self):
+        # Opt-in: "hardlink" or "reflink" share the packaged files with the source and build folders
+        link = self.conf.get("user.googleapis:package_links", check_type=str)
+        if link not in (None, "hardlink", "reflink"):
+            raise ConanException(f"user.googleapis:package_links must be 'hardlink' or 'reflink', not '{link}'")
+        return link
 
-        copy(self, pattern="*.lib", src=self.build_folder, dst=os.path.join(self.package_folder, "lib"), keep_path=False)
-        copy(self, pattern="*.dll", src=self.build_folder, dst=os.path.join(self.package_folder, "bin"), keep_path=False)
-        copy(self, pattern="*.so*", src=self.build_folder, dst=os.path.join(self.package_folder, "lib"), keep_path=False)
-        copy(self, pattern="*.dylib", src=self.build_folder, dst=os.path.join(self.package_folder, "lib"), keep_path=False)
-        copy(self, pattern="*.a", src=self.build_folder, dst=os.path.join(self.package_folder, "lib"), keep_path=False)
+    def package(self):
+        # Tens of thousands of files are generated, each tree is walked once for all the patterns
+        link = self._package_links
+        copy_routes(self.source_folder, [
+            ("LICENSE", os.path.join(self.package_folder, "licenses"), True),
+            ("*.proto", os.path.join(self.package_folder, "res"), True),
+        ], link=link)
+        lib_folder = os.path.join(self.package_folder, "lib")
+        copy_routes(self.build_folder, [
+            ("*.pb.h", os.path.join(self.package_folder, "include"), True),
+            ("*.lib", lib_folder, False),
+            ("*.dll", os.path.join(self.package_folder, "bin"), False),
+            ("*.so*", lib_folder, False),
+            ("*.dylib", lib_folder, False),
+            ("*.a", lib_folder, False),
+        ], link=link)
 
         with open(os.path.join(self.package_folder, self._DEPS_FILE), "w", encoding="utf-8") as f:
             for lib in filter(lambda u: u.is_used, self._parse_proto_libraries()):
                 interface = 'LIB' if lib.srcs else 'INTERFACE'
-                f.write(f"{lib.cmake_target} {interface} {','.join(lib.cmake_deps)}\n")
+                f.write(f"{cmake_target_name(lib.label)} {interface} {','.join(cmake_dependencies(lib))}\n")
 
     def package_info(self):
         with open(os.path.join(self.package_folder, self._DEPS_FILE), "r", encoding="utf-8") as f:
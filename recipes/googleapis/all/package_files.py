@@ -0,0 +1,74 @@
+# Packaging of the files generated by googleapis: a single walk of a tree copies the files of every pattern
+
+import fnmatch
+import os
+import shutil
+import sys
+
+
+def copy_routes(src, routes, link=None):
+    """Copy the files of `src` to the destination of every route they match, walking the tree once
+
+    `routes` is a list of (pattern, dst, keep_path), with the semantics of conan's copy(): patterns are
+    matched against the path relative to `src`, ignoring case, and symlinks are copied as symlinks.
+    `link` shares the contents of the files instead of duplicating them, with "hardlink" or "reflink"
+    (Linux only); files are copied when the file system can't link them. Returns the number of files placed.
+    """
+    src = os.path.abspath(src)
+    routes = [(pattern.lower(), os.path.abspath(dst), keep_path) for pattern, dst, keep_path in routes]
+    destinations = {dst for _, dst, _ in routes}
+    created = set()
+    placed = 0
+    for root, dirs, files in os.walk(src, followlinks=True):
+        dirs[:] = [it for it in dirs if os.path.join(root, it) not in destinations]
+        relative_root = os.path.relpath(root, src)
+        for filename in files:
+            relative_path = filename if relative_root == "." else os.path.join(relative_root, filename)
+            key = relative_path.replace("\\", "/").lower()
+            for pattern, dst, keep_path in routes:
+                if not fnmatch.fnmatchcase(key, pattern):
+                    continue
+                dst_file = os.path.join(dst, relative_path if keep_path else filename)
+                dst_folder = os.path.dirname(dst_file)
+                if dst_folder not in created:
+                    os.makedirs(dst_folder, exist_ok=True)
+                    created.add(dst_folder)
+                _place_file(os.path.join(root, filename), dst_file, link)
+                placed += 1
+    return placed
+
+
+_FICLONE = 0x40049409  # Linux ioctl sharing the extents of a file (btrfs, XFS...)
+
+
+def _reflink(src, dst):
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def _place_file(src, dst, link):
+    # Never write through an existing file, it may be linked to the source
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), dst)
+        return
+    if link == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:  # Another file system, or no support for hardlinks
+            pass
+    elif link == "reflink" and _reflink(src, dst):
+        return
+    shutil.copy2(src, dst)
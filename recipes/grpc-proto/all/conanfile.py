@@ -9,7 +9,7 @@ from conan.tools.env import VirtualBuildEnv, VirtualRunEnv
 from conan.tools.files import get, collect_libs, copy
 from conan.tools.scm import Version
 
-from helpers import parse_proto_libraries
+from helpers import PROTOBUF_TARGET, activate_libraries, parse_proto_libraries, write_cmake_targets
 
 required_conan_version = ">=1.60.0 <2.0 || >=2.0.5"
 
@@ -97,34 +97,32 @@ class GRPCProto(ConanFile):
     @functools.lru_cache(1)
     def _parse_proto_libraries(self):
         # Generate the libraries to build dynamically
-        proto_libraries = parse_proto_libraries(os.path.join(self.source_folder, 'BUILD.bazel'), self.source_folder, self.output.error)
+        repositories = {"@com_google_protobuf": PROTOBUF_TARGET, "@com_google_googleapis": "googleapis::googleapis"}
+        proto_libraries = parse_proto_libraries(os.path.join(self.source_folder, 'BUILD.bazel'), self.source_folder,
+                                                repositories, self.output.error)
 
         # Validate that all files exist and all dependencies are found
-        all_deps = [it.cmake_target for it in proto_libraries]
-        all_deps += ["googleapis::googleapis", "protobuf::libprotobuf"]
+        all_deps = set(it.label for it in proto_libraries)
+        all_deps.update(repositories.values())
         for it in proto_libraries:
             it.validate(self.source_folder, all_deps)
 
-        # Mark the libraries we need recursively (C++ context)
-        all_dict = {it.cmake_target: it for it in proto_libraries}
-        def activate_library(proto_library):
-            proto_library.is_used = True
-            for it_dep in proto_library.deps:
-                if it_dep in ["googleapis::googleapis", "protobuf::libprotobuf"]:
-                    continue
-                activate_library(all_dict[it_dep])
-
-        for it in filter(lambda u: u.is_used, proto_libraries):
-            activate_library(it)
+        # Every proto library is built, cc_proto_library rules are not needed
+        for it in proto_libraries:
+            it.is_used = not it.is_cc
+        activate_libraries(proto_libraries)
 
         return proto_libraries
 
+    @staticmethod
+    def _cmake_target_name(label):
+        return f"grpc_{label.split(':')[-1]}"
+
     def build(self):
         copy(self, "CMakeLists.txt", src=os.path.join(self.source_folder, os.pardir), dst=self.source_folder)
         proto_libraries = self._parse_proto_libraries()
         with open(os.path.join(self.source_folder, "CMakeLists.txt"), "a", encoding="utf-8") as f:
-            for it in filter(lambda u: u.is_used, proto_libraries):
-                f.write(it.cmake_content)
+            write_cmake_targets(f, proto_libraries, target_name=self._cmake_target_name, import_dirs="${IMPORT_DIRS}")
         cmake = CMake(self)
         cmake.configure()
         cmake.build()
@@ -1,91 +1,71 @@
+# Graph of the proto_library rules of BUILD.bazel files, and the CMake targets building them
+# This file is shared by the googleapis and grpc-proto recipes, keep both copies identical
+
 import os
 import re
-import textwrap
-
 
-def grpc_target_name(internal_name):
-    return f"grpc_{internal_name}"
+PROTOBUF_TARGET = "protobuf::libprotobuf"
 
 
-class _ProtoLibrary:
-    name: str = None
-    srcs: list = None
-    deps: list = None
-    is_used: bool = False
+class ProtoLibrary:
+    __slots__ = ("package", "name", "srcs", "deps", "is_cc", "is_used")
 
-    def __init__(self) -> None:
+    def __init__(self, package, is_cc) -> None:
+        self.package = package  # Bazel package, as in "//google/api"
+        self.name = None
         self.srcs = []
-        self.deps = set(["protobuf::libprotobuf"])  # Add to all libraries even if not explicitly set
-        self.is_used = True
+        self.deps = {PROTOBUF_TARGET}  # Add to all libraries even if not explicitly set
+        self.is_cc = is_cc
+        self.is_used = is_cc
+
+    @property
+    def label(self):
+        return f"{self.package}:{self.name}"
 
     def validate(self, source_folder, all_deps):
         # Check all files exists
         for it in self.srcs:
-            assert os.path.exists(os.path.join(source_folder, it)), f"{self.name} - file '{it}' doesn't exist"
+            assert os.path.exists(os.path.join(source_folder, it)), f"{self.label} - file '{it}' doesn't exist"
         # Check all deps exists
         for it in self.deps:
-            assert it in all_deps, f"{self.name} - dep '{it}' not found"
+            assert it in all_deps, f"{self.label} - dep '{it}' not found"
 
-    def dumps(self):
-        import json
-        return json.dumps({
+    def to_dict(self):
+        return {
+            "package": self.package,
             "name": self.name,
             "srcs": self.srcs,
-            "deps": list(self.deps),
-        }, indent=4)
+            "deps": sorted(self.deps),
+            "is_cc": self.is_cc,
+        }
 
-    @property
-    def cmake_target(self):
-        return grpc_target_name(self.name)
+    @classmethod
+    def from_dict(cls, data):
+        proto_library = cls(data["package"], is_cc=data["is_cc"])
+        proto_library.name = data["name"]
+        proto_library.srcs = list(data["srcs"])
+        proto_library.deps = set(data["deps"])
+        return proto_library
 
-    @property
-    def cmake_deps(self):
-        def to_cmake_target(item):
-            if item.startswith("//"):
-                return item[2:].replace("/", "_").replace(":", "_")
-            return item
-        return [to_cmake_target(it) for it in self.deps]
 
-    @property
-    def cmake_content(self):
-        content = f"\n\n# {self.cmake_target}\n"
-        content += "\n".join([f"#{it}" for it in self.dumps().split('\n')])
-        content += "\n"        
-        if not self.srcs:
-            content += textwrap.dedent(f"""\
-                add_library({self.cmake_target} INTERFACE)
-            """)
-        else:
-            content += textwrap.dedent(f"""\
-                set({self.cmake_target}_PROTOS {" ".join(["${CMAKE_SOURCE_DIR}/"+it for it in self.srcs])})
-                add_library({self.cmake_target} ${{{self.cmake_target}_PROTOS}})
-                target_include_directories({self.cmake_target} PUBLIC ${{CMAKE_BINARY_DIR}})
-                target_compile_features({self.cmake_target} PUBLIC cxx_std_11)
-                protobuf_generate(LANGUAGE cpp 
-                                TARGET {self.cmake_target} 
-                                PROTOS ${{{self.cmake_target}_PROTOS}}
-                                IMPORT_DIRS ${{IMPORT_DIRS}}
-                                )
-            """)
-
-        if self.deps:
-            content += textwrap.dedent(f"""\
-                target_link_libraries({self.cmake_target} {"PUBLIC" if self.srcs else "INTERFACE"} {" ".join(self.cmake_deps)})
-            """)
-
-        return content
-
-
-def parse_proto_libraries(filename, source_folder, error):
-    # Generate the libraries to build dynamically
-    re_name = re.compile(r'name = "(.*)"')
-    re_srcs_oneline = re.compile(r'srcs = \["(.*)"\],')
-    re_deps_oneline = re.compile(r'deps = \["(.*)"\],')
-    re_add_varname = re.compile(r'] \+ (.*),')
+_RE_NAME = re.compile(r'name = "(.*)"')
+_RE_SRCS_ONELINE = re.compile(r'srcs = \["(.*)"\],')
+_RE_DEPS_ONELINE = re.compile(r'deps = \["(.*)"\],')
+_RE_ADD_VARNAME = re.compile(r'] \+ (.*),')
+
 
+def parse_proto_libraries(filename, source_folder, repositories, error):
+    """Return the proto_library and cc_proto_library rules of a BUILD.bazel file, in a single pass
+
+    Dependencies are stored as Bazel labels (`//package:name`) for the libraries of the repository being
+    parsed. `repositories` maps the external repositories (`@name`) to the CMake target providing them,
+    or to None for the repository being parsed.
+    """
     proto_libraries = []
 
     basedir = os.path.dirname(filename)
+    folder = os.path.relpath(basedir, source_folder).replace('\\', '/')  # We need forward slashes because of Windows
+    package = "//" if folder == "." else f"//{folder}"
     proto_library = None
 
     def parsing_sources(line):
@@ -93,42 +73,57 @@ def parse_proto_libraries(filename, source_folder, error):
         proto_library.srcs.append(proto_path)
 
     def parsing_deps(line):
+        # Remove any comments
+        line = line.split('#', 1)[0].strip()
         line = line.strip(",").strip("\"")
-        if line.startswith("@com_google_protobuf//:"):
-            proto_library.deps.add("protobuf::libprotobuf")
-        elif line.startswith("@com_google_googleapis//"):
-            proto_library.deps.add("googleapis::googleapis")
+        if line == '':
+            pass
+        elif line.startswith("@"):
+            repository, _, label = line.partition("//")
+            if repository not in repositories:
+                error(f"Unrecognized dep: {line} -- {os.path.relpath(filename, source_folder)}")
+            elif repositories[repository] is None:
+                proto_library.deps.add(f"//{label}")
+            else:
+                proto_library.deps.add(repositories[repository])
         elif line.startswith(":"):
-            proto_library.deps.add(grpc_target_name(line[1:]))
+            proto_library.deps.add(f"{package}{line}")
+        elif line.startswith("//"):
+            proto_library.deps.add(line)
         else:
             error(f"Unrecognized dep: {line} -- {os.path.relpath(filename, source_folder)}")
 
-    with open(filename, 'r') as f:
+    with open(filename, 'r', encoding='utf-8') as f:
         action = None
-        parsing_variable = None
+        variable = None
         variables = {}
-        for line in f.readlines():
+        for line in f:
             line = line.strip()
 
             if line == "proto_library(":
-                assert proto_library == None
-                proto_library = _ProtoLibrary()
-            elif parsing_variable != None:
+                assert proto_library is None
+                proto_library = ProtoLibrary(package, is_cc=False)
+            elif line == "cc_proto_library(":
+                assert proto_library is None
+                proto_library = ProtoLibrary(package, is_cc=True)
+            elif line == '_PROTO_SUBPACKAGE_DEPS = [':
+                variable = variables["_PROTO_SUBPACKAGE_DEPS"] = []
+            elif variable is not None:
                 if line == "]":
-                    parsing_variable = None
+                    variable = None
                 else:
-                    parsing_variable(line)
-            elif proto_library != None:
+                    variable.append(line.strip(",").strip("\""))
+            elif proto_library is not None:
                 if line.startswith("name ="):
-                    proto_library.name = re_name.search(line).group(1)
+                    proto_library.name = _RE_NAME.search(line).group(1)
                 elif line.startswith("srcs = "):
-                    m = re_srcs_oneline.search(line)
+                    m = _RE_SRCS_ONELINE.search(line)
                     if m:
                         parsing_sources(m.group(1))
                     else:
                         action = parsing_sources
                 elif line.startswith("deps = "):
-                    m = re_deps_oneline.search(line)
+                    m = _RE_DEPS_ONELINE.search(line)
                     if m:
                         parsing_deps(m.group(1))
                     else:
@@ -140,12 +135,122 @@ def parse_proto_libraries(filename, source_folder, error):
                     proto_library = None
                     action = None
                 elif line == "],":
-                    action = None 
+                    action = None
                 elif line.startswith("] + "):
-                    varname = re_add_varname.search(line).group(1)
+                    varname = _RE_ADD_VARNAME.search(line).group(1)
                     for it in variables[varname]:
-                        action(it) 
+                        action(it)
                 elif action:
                     action(line)
 
     return proto_libraries
+
+
+def activate_libraries(proto_libraries):
+    """Mark as used every library reachable from the ones already used, returns the libraries by label
+
+    The traversal is iterative and visits each library once, however many libraries depend on it.
+    """
+    all_dict = {it.label: it for it in proto_libraries}
+    visited = set()
+    pending = [it.label for it in proto_libraries if it.is_used]
+    while pending:
+        current = pending.pop()
+        if current in visited:
+            continue
+        visited.add(current)
+        proto_library = all_dict[current]
+        proto_library.is_used = True
+        # Other dependencies are the targets of external repositories
+        pending.extend(it for it in proto_library.deps if it in all_dict and it not in visited)
+    return all_dict
+
+
+def save_proto_libraries(filename, key, proto_libraries):
+    """Store parsed (not yet activated) libraries, so BUILD.bazel files are scanned once per source revision"""
+    import json
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "libraries": [it.to_dict() for it in proto_libraries]}, f)
+
+
+def load_proto_libraries(filename, key):
+    """Return the libraries stored by `save_proto_libraries` for `key`, or None"""
+    import json
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("key") != key:
+        return None
+    return [ProtoLibrary.from_dict(it) for it in index["libraries"]]
+
+
+def cmake_target_name(label):
+    """Default name of the CMake target of a library: "//google/api:http_proto" gives "google_api_http_proto" """
+    return label[2:].replace("/", "_").replace(":", "_")
+
+
+def cmake_dependencies(proto_library, target_name=cmake_target_name):
+    """Return the CMake targets a library links to, sorted"""
+    return sorted(target_name(it) if it.startswith("//") else it for it in proto_library.deps)
+
+
+_CMAKE_INTERFACE_LIBRARY = """\
+add_library({target} INTERFACE)
+"""
+
+_CMAKE_LIBRARY = """\
+set({target}_PROTOS {protos})
+add_library({target} ${{{target}_PROTOS}})
+target_include_directories({target} PUBLIC ${{CMAKE_BINARY_DIR}})
+target_compile_features({target} PUBLIC cxx_std_11)
+"""
+
+_CMAKE_OUTPUT_NAME = """\
+# set project_label to shorten the name of the vcxproj file and cause shorter paths
+set_property(TARGET {target} PROPERTY OUTPUT_NAME "{output_name}")
+"""
+
+_CMAKE_PROTOBUF_GENERATE = """\
+protobuf_generate(LANGUAGE cpp
+                TARGET {target}
+                PROTOS ${{{target}_PROTOS}}
+                IMPORT_DIRS {import_dirs}
+                )
+"""
+
+_CMAKE_LINK_LIBRARIES = """\
+target_link_libraries({target} {scope} {deps})
+"""
+
+
+def write_cmake_targets(f, proto_libraries, target_name=cmake_target_name, short_name=None,
+                        import_dirs="${CMAKE_SOURCE_DIR}"):
+    """Write the CMake targets of the used libraries to the file object `f`, one library at a time
+
+    `target_name` gives the name of the library built for a label. When `short_name` is given, the CMake
+    targets are named after it, and the libraries keep the full name as OUTPUT_NAME.
+    """
+    write = f.write
+    for proto_library in proto_libraries:
+        if not proto_library.is_used:
+            continue
+        output_name = target_name(proto_library.label)
+        target = short_name(output_name) if short_name else output_name
+        write(f"\n\n# {output_name} ({proto_library.label})\n")
+        if not proto_library.srcs:
+            write(_CMAKE_INTERFACE_LIBRARY.format(target=target))
+        else:
+            protos = " ".join(f"${{CMAKE_SOURCE_DIR}}/{it}" for it in proto_library.srcs)
+            write(_CMAKE_LIBRARY.format(target=target, protos=protos))
+            if target != output_name:
+                write(_CMAKE_OUTPUT_NAME.format(target=target, output_name=output_name))
+            write(_CMAKE_PROTOBUF_GENERATE.format(target=target, import_dirs=import_dirs))
+
+        if proto_library.deps:
+            deps = cmake_dependencies(proto_library, target_name)
+            if short_name:
+                deps = [short_name(it) for it in deps]
+            write(_CMAKE_LINK_LIBRARIES.format(target=target, scope="PUBLIC" if proto_library.srcs else "INTERFACE",
+                                               deps=" ".join(deps)))
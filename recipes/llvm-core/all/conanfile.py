@@ -1,7 +1,7 @@
-from conan.errors import ConanInvalidConfiguration
+from conan.errors import ConanException, ConanInvalidConfiguration
 from conan import ConanFile
 from conan.tools.build import cross_building
-from conan.tools.files import apply_conandata_patches, chdir, collect_libs, get, load, rename, replace_in_file, rm, rmdir, save
+from conan.tools.files import apply_conandata_patches, collect_libs, get, load, rename, replace_in_file, rm, rmdir, save
 from conan.tools.scm import Version
 from conans import CMake
 from collections import defaultdict
@@ -229,10 +229,24 @@ class LLVMCoreConan(ConanFile):
             destination=self._source_subfolder)
         self._patch_sources()
 
+    @property
+    def _graphviz_file(self):
+        return os.path.join('graph', 'llvm.dot')
+
+    _components_schema_version = 1
+
     def build(self):
         self._patch_build()
         cmake = self._configure_cmake()
-        cmake.configure()
+        if not self.options.shared:
+            # The target graph models the components, see package(). Only the global graph is needed
+            save(self, 'CMakeGraphVizOptions.cmake', textwrap.dedent("""\
+                set(GRAPHVIZ_GENERATE_PER_TARGET FALSE)
+                set(GRAPHVIZ_GENERATE_DEPENDERS FALSE)
+            """))
+            cmake.configure(args=['--graphviz={}'.format(self._graphviz_file)])
+        else:
+            cmake.configure()
         cmake.build()
 
     @property
@@ -272,17 +286,16 @@ class LLVMCoreConan(ConanFile):
                 lib = '*LLVMTableGenGlobalISel{}'.format(ext)
                 self.copy(lib, dst='lib', src='lib')
 
-            CMake(self).configure(args=['--graphviz=graph/llvm.dot'], source_dir='.', build_dir='.')
-            with chdir(self, 'graph'):
-                dot_text = load(self, 'llvm.dot').replace('\r\n', '\n')
+            dot_text = load(self, self._graphviz_file).replace('\r\n', '\n')
 
             dep_regex = re.compile(r'//\s(.+)\s->\s(.+)$', re.MULTILINE)
             deps = re.findall(dep_regex, dot_text)
 
-            dummy_targets = defaultdict(list)
+            # Dependencies are dicts, used as insertion ordered sets
+            dummy_targets = defaultdict(dict)
             for target, dep in deps:
                 if not target.startswith('LLVM'):
-                    dummy_targets[target].append(dep)
+                    dummy_targets[target][dep] = None
 
             cmake_targets = {
                 'libffi::libffi': 'ffi',
@@ -291,7 +304,7 @@ class LLVMCoreConan(ConanFile):
                 'LibXml2::LibXml2': 'xml2'
             }
 
-            components = defaultdict(list)
+            components = defaultdict(dict)
             for lib, dep in deps:
                 if not lib.startswith('LLVM'):
                     continue
@@ -306,11 +319,10 @@ class LLVMCoreConan(ConanFile):
                     dep = dep.replace('lib', '')
                 dep = dep.replace('-l', '')
 
-                if dep in dummy_targets.keys():
-                    components[lib].extend(dummy_targets[dep])
-                    components[lib] = list(set(components[lib]))
+                if dep in dummy_targets:
+                    components[lib].update(dummy_targets[dep])
                 else:
-                    components[lib].append(dep)
+                    components[lib][dep] = None
 
             alias_targets = {}
             old_alias_targets = {}
@@ -354,12 +366,14 @@ class LLVMCoreConan(ConanFile):
 
         if not self.options.shared:
             if self.options.get_safe('with_zlib', False):
-                if not 'z' in components['LLVMSupport']:
-                    components['LLVMSupport'].append('z')
+                components['LLVMSupport'].setdefault('z')
             components_path = \
                 os.path.join(self.package_folder, 'lib', 'components.json')
             with open(components_path, 'w') as components_file:
-                json.dump(components, components_file, indent=4)
+                json.dump({
+                    'schema_version': self._components_schema_version,
+                    'components': {component: list(deps) for component, deps in components.items()},
+                }, components_file, indent=4)
         else:
             suffixes = ['.dylib', '.so']
             for name in os.listdir(lib_path):
@@ -381,6 +395,12 @@ class LLVMCoreConan(ConanFile):
             os.path.join(self.package_folder, 'lib', 'components.json')
         with open(components_path, 'r') as components_file:
             components = json.load(components_file)
+        # Packages created before the schema was versioned only hold the components
+        if 'schema_version' in components:
+            if components['schema_version'] > self._components_schema_version:
+                raise ConanException('{} is not supported by this recipe, schema version {}'.format(
+                    components_path, components['schema_version']))
+            components = components['components']
 
         dependencies = ['ffi', 'z', 'iconv', 'xml2']
         targets = {
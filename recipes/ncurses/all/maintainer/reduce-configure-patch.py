@@ -3,47 +3,153 @@
 # Running autoreconf on a modified configure.ac script, will result in a huge diff because of all the line number differences
 # This script attempts to reduce the delta by removing the hunks where only line numbers are modified
 # This script is very crude in that it only checks whether a number is changed.
+#
+# Only the hunks of the target files (--target, `configure` by default) are reduced, the others are kept as is.
+# With --stream, the diff is filtered one hunk at a time instead of being loaded with patch_ng,
+# which keeps the memory use constant on the tens of MB diffs of a regenerated configure script.
 
 import argparse
-import patch_ng
+import fnmatch
+import re
 import string
+import sys
+from collections import deque
 
+DIGITS_REMOVE = bytes.maketrans(string.digits.encode(), ("X" * len(string.digits)).encode())
+HUNK_HEADER = re.compile(rb"^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@")
 
-def hunk_contains_only_line_diff(hunk: patch_ng.Hunk):
+
+def is_target(path, targets):
+    if isinstance(path, bytes):
+        path = path.decode("utf-8", errors="replace")
+    path = path.split("\t")[0].strip()
+    if path[:2] in ("a/", "b/"):
+        path = path[2:]
+    return any(fnmatch.fnmatchcase(path, target) for target in targets)
+
+
+def hunk_contains_only_line_diff(hunk):
     adds = []
     subs = []
-    digits_remove = bytes.maketrans(string.digits.encode(), ("X" * len(string.digits)).encode())
     for line in hunk.text:
         if line[0] == ord("+"):
-            adds.append(line[1:].translate(digits_remove))
+            adds.append(line[1:].translate(DIGITS_REMOVE))
         elif line[0] == ord("-"):
-            subs.append(line[1:].translate(digits_remove))
+            subs.append(line[1:].translate(DIGITS_REMOVE))
     return adds == subs
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("input", help="input file")
-    parser.add_argument("-o", dest="output", help="output file")
-    ns = parser.parse_args()
-    patchset: patch_ng.PatchSet = patch_ng.fromfile(ns.input)
+def reduce_patchset(input, output, targets):
+    import patch_ng
+
+    patchset: patch_ng.PatchSet = patch_ng.fromfile(input)
     if not patchset:
         return 1
 
     for item in patchset.items:
-        if item.source != "configure":
-            pass
+        if not is_target(item.source, targets):
+            continue
         item.hunks = [hunk for hunk in item.hunks if not hunk_contains_only_line_diff(hunk)]
 
     ostream = None
-    if ns.output:
-        ostream = open(ns.output, "wb")
+    if output:
+        ostream = open(output, "wb")
     patchset.dump(stream=ostream)
-    if ns.output:
+    if output:
         ostream.close()
     return 0
 
 
+def _hunk_lines(lines, src_count, tgt_count):
+    """Yield the lines of a hunk body, until the line counts of its header are consumed"""
+    while src_count > 0 or tgt_count > 0:
+        line = next(lines, None)
+        if line is None:
+            return
+        yield line
+        if line[:1] == b"-":
+            src_count -= 1
+        elif line[:1] == b"+":
+            tgt_count -= 1
+        elif line[:1] != b"\\":
+            src_count -= 1
+            tgt_count -= 1
+
+
+def filter_stream(istream, ostream, targets):
+    """Copy a unified diff, dropping the hunks of the target files where only numbers changed"""
+    lines = iter(istream)
+    path = None
+    dropped = False
+    for line in lines:
+        header = HUNK_HEADER.match(line)
+        if not header:
+            # A "\ No newline at end of file" marker belongs to the hunk before it
+            if not (dropped and line[:1] == b"\\"):
+                ostream.write(line)
+            dropped = False
+            if line.startswith(b"--- "):
+                path = line[4:]
+            elif line.startswith(b"+++ ") and path is not None and path.startswith(b"/dev/null"):
+                path = line[4:]
+            continue
+
+        dropped = False
+        src_count = int(header.group(1) or 1)
+        tgt_count = int(header.group(2) or 1)
+        body = _hunk_lines(lines, src_count, tgt_count)
+        # Line counts which differ always mean added or removed lines
+        if src_count != tgt_count or path is None or not is_target(path, targets):
+            ostream.write(line)
+            ostream.writelines(body)
+            continue
+
+        # Compare removed and added lines as they come, until a pair differs by more than numbers
+        buffered = [line]
+        subs, adds = deque(), deque()
+        for hunk_line in body:
+            buffered.append(hunk_line)
+            if hunk_line[:1] == b"-":
+                subs.append(hunk_line)
+            elif hunk_line[:1] == b"+":
+                adds.append(hunk_line)
+            else:
+                continue
+            while subs and adds:
+                if subs.popleft()[1:].translate(DIGITS_REMOVE) != adds.popleft()[1:].translate(DIGITS_REMOVE):
+                    break
+            else:
+                continue
+            ostream.writelines(buffered)
+            ostream.writelines(body)
+            break
+        else:
+            if subs or adds:
+                ostream.writelines(buffered)
+            else:
+                dropped = True
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="input file")
+    parser.add_argument("-o", dest="output", help="output file")
+    parser.add_argument("--target", dest="targets", action="append",
+                        help="file (fnmatch pattern) whose hunks are reduced, can be repeated (default: configure)")
+    parser.add_argument("--stream", action="store_true", help="filter the diff one hunk at a time, without patch_ng")
+    ns = parser.parse_args()
+    targets = ns.targets or ["configure"]
+
+    if not ns.stream:
+        return reduce_patchset(ns.input, ns.output, targets)
+
+    with open(ns.input, "rb") as istream:
+        if ns.output:
+            with open(ns.output, "wb") as ostream:
+                return filter_stream(istream, ostream, targets)
+        return filter_stream(istream, sys.stdout.buffer, targets)
+
+
 if __name__ == "__main__":
-    import sys
     sys.exit(main())
@@ -4,7 +4,7 @@ from conan.tools.apple import is_apple_os
 from conan.tools.build import check_min_cppstd, valid_min_cppstd
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
 from conan.tools.env import VirtualBuildEnv, VirtualRunEnv
-from conan.tools.files import apply_conandata_patches, collect_libs, copy, export_conandata_patches, get, rename, replace_in_file, rmdir, save
+from conan.tools.files import apply_conandata_patches, collect_libs, copy, export_conandata_patches, get, rename, rmdir, save
 from conan.tools.gnu import PkgConfigDeps
 from conan.tools.microsoft import msvc_runtime_flag
 from conan.tools.scm import Version
@@ -12,6 +12,8 @@ import os
 import re
 import textwrap
 
+from file_edits import FileEdits
+
 required_conan_version = ">=1.60.0 <2.0 || >=2.0.5"
 
 
@@ -90,6 +92,7 @@ OPENCV_EXTRA_MODULES_OPTIONS = (
     "xphoto",
 )
 
+
 class OpenCVConan(ConanFile):
     name = "opencv"
     license = "Apache-2.0"
@@ -218,8 +221,12 @@ class OpenCVConan(ConanFile):
     default_options.update({_name: True for _name in OPENCV_MAIN_MODULES_OPTIONS})
     default_options.update({_name: False for _name in OPENCV_EXTRA_MODULES_OPTIONS})
 
+    exports = "file_edits.py"
     short_paths = True
 
+    _cached_opencv_modules = None
+    _cached_mandatory_options_closure = None
+
     @property
     def _is_cl_like(self):
         return self.settings.compiler.get_safe("runtime") is not None
@@ -364,6 +371,12 @@ class OpenCVConan(ConanFile):
 
     @property
     def _opencv_modules(self):
+        # The graph depends on options: configure() drops it once it is done modifying them
+        if self._cached_opencv_modules is None:
+            self._cached_opencv_modules = self._get_opencv_modules()
+        return self._cached_opencv_modules
+
+    def _get_opencv_modules(self):
         def imageformats_deps():
             components = []
             if self.options.get_safe("with_avif"):
@@ -933,30 +946,40 @@ class OpenCVConan(ConanFile):
 
         return opencv_modules
 
+    def _get_mandatory_options_closure(self, opencv_modules):
+        # mandatory_options only depend on the version, so the closure is computed once
+        if self._cached_mandatory_options_closure is None:
+            closure = {}
+            for option in opencv_modules:
+                reached = []
+                pending = list(opencv_modules[option].get("mandatory_options", []))
+                while pending:
+                    mandatory_option = pending.pop(0)
+                    if mandatory_option == option or mandatory_option in reached:
+                        continue
+                    reached.append(mandatory_option)
+                    pending.extend(opencv_modules.get(mandatory_option, {}).get("mandatory_options", []))
+                closure[option] = reached
+            self._cached_mandatory_options_closure = closure
+        return self._cached_mandatory_options_closure
+
     def _get_mandatory_disabled_options(self, opencv_modules):
         direct_options_to_enable = {}
         transitive_options_to_enable = {}
+        closure = self._get_mandatory_options_closure(opencv_modules)
 
-        # Check which direct options have to be enabled
+        # Check which direct and transitive options have to be enabled
         base_options = [option for option, values in opencv_modules.items()
                         if not values.get("no_option") and self.options.get_safe(option)]
         for base_option in base_options:
-            for mandatory_option in opencv_modules.get(base_option, {}).get("mandatory_options", []):
-                if not self.options.get_safe(mandatory_option):
+            direct_options = opencv_modules[base_option].get("mandatory_options", [])
+            for mandatory_option in closure[base_option]:
+                if self.options.get_safe(mandatory_option):
+                    continue
+                if mandatory_option in direct_options:
                     direct_options_to_enable.setdefault(mandatory_option, set()).add(base_option)
-
-        # Now traverse the graph to check which transitive options have to be enabled
-        def collect_transitive_options(base_option, option):
-            for mandatory_option in opencv_modules.get(option, {}).get("mandatory_options", []):
-                if not self.options.get_safe(mandatory_option):
-                    if mandatory_option not in transitive_options_to_enable:
-                        transitive_options_to_enable[mandatory_option] = set()
-                        collect_transitive_options(base_option, mandatory_option)
-                    if base_option not in direct_options_to_enable.get(mandatory_option, set()):
-                        transitive_options_to_enable[mandatory_option].add(base_option)
-
-        for base_option in base_options:
-            collect_transitive_options(base_option, base_option)
+                else:
+                    transitive_options_to_enable.setdefault(mandatory_option, set()).add(base_option)
 
         return {
             "direct": direct_options_to_enable,
@@ -1087,6 +1110,9 @@ class OpenCVConan(ConanFile):
             if self.options.get_safe("with_tiff"):
                 self.options["libtiff"].jpeg = self.options.with_jpeg
 
+        # Options are final from now on, build the module graph again from them
+        self._cached_opencv_modules = None
+
     def layout(self):
         cmake_layout(self, src_folder="src")
 
@@ -1238,6 +1264,7 @@ class OpenCVConan(ConanFile):
 
     def _patch_sources(self):
         apply_conandata_patches(self)
+        edits = FileEdits(self)
 
         # Patches in opencv
         # -----------------
@@ -1249,22 +1276,22 @@ class OpenCVConan(ConanFile):
         ]:
             rmdir(self, os.path.join(self.source_folder, "3rdparty", directory))
 
-        replace_in_file(self, os.path.join(self.source_folder, "CMakeLists.txt"), "ANDROID OR NOT UNIX", "FALSE")
-        replace_in_file(self, os.path.join(self.source_folder, "CMakeLists.txt"), "elseif(EMSCRIPTEN)", "elseif(QNXNTO)\nelseif(EMSCRIPTEN)")
+        edits.replace(os.path.join(self.source_folder, "CMakeLists.txt"), "ANDROID OR NOT UNIX", "FALSE")
+        edits.replace(os.path.join(self.source_folder, "CMakeLists.txt"), "elseif(EMSCRIPTEN)", "elseif(QNXNTO)\nelseif(EMSCRIPTEN)")
 
         ## Upstream CMakeLists vendors quirc in CMakeLists of 3rdparty/quirc.
         ## Instead we rely on find-quirc.patch in order to link external quirc.
-        replace_in_file(self, os.path.join(self.source_folder, "CMakeLists.txt"), "add_subdirectory(3rdparty/quirc)", "")
+        edits.replace(os.path.join(self.source_folder, "CMakeLists.txt"), "add_subdirectory(3rdparty/quirc)", "")
 
         ## Fix link to several dependencies
-        replace_in_file(self, os.path.join(self.source_folder, "modules", "imgcodecs", "CMakeLists.txt"), "JASPER_", "Jasper_")
-        replace_in_file(self, os.path.join(self.source_folder, "modules", "imgcodecs", "CMakeLists.txt"), "${GDAL_LIBRARY}", "GDAL::GDAL")
+        edits.replace(os.path.join(self.source_folder, "modules", "imgcodecs", "CMakeLists.txt"), "JASPER_", "Jasper_")
+        edits.replace(os.path.join(self.source_folder, "modules", "imgcodecs", "CMakeLists.txt"), "${GDAL_LIBRARY}", "GDAL::GDAL")
         if Version(self.version) >= "4.8.0":
-            replace_in_file(self, os.path.join(self.source_folder, "modules", "imgcodecs", "CMakeLists.txt"), "${AVIF_LIBRARY}", "avif")
+            edits.replace(os.path.join(self.source_folder, "modules", "imgcodecs", "CMakeLists.txt"), "${AVIF_LIBRARY}", "avif")
 
         ## Fix detection of ffmpeg
-        replace_in_file(self, os.path.join(self.source_folder, "modules", "videoio", "cmake", "detect_ffmpeg.cmake"),
-                        "FFMPEG_FOUND", "ffmpeg_FOUND")
+        edits.replace(os.path.join(self.source_folder, "modules", "videoio", "cmake", "detect_ffmpeg.cmake"),
+                      "FFMPEG_FOUND", "ffmpeg_FOUND")
 
         ## Robust handling of wayland
         if self.options.get_safe("with_wayland"):
@@ -1272,20 +1299,17 @@ class OpenCVConan(ConanFile):
 
             # We have to override *_LINK_LIBRARIES variables linked to highui because they are just link fkags, not cflags
             # so include dirs are missing (OpenCV seems to assume system libs for wayland)
-            replace_in_file(
-                self,
+            edits.replace(
                 detect_wayland,
                 "ocv_check_modules(WAYLAND_CLIENT wayland-client)",
                 "ocv_check_modules(WAYLAND_CLIENT wayland-client)\nfind_package(wayland REQUIRED CONFIG)\nset(WAYLAND_CLIENT_LINK_LIBRARIES wayland::wayland-client)",
             )
-            replace_in_file(
-                self,
+            edits.replace(
                 detect_wayland,
                 "ocv_check_modules(WAYLAND_CURSOR wayland-cursor)",
                 "ocv_check_modules(WAYLAND_CURSOR wayland-cursor)\nset(WAYLAND_CURSOR_LINK_LIBRARIES wayland::wayland-cursor)",
             )
-            replace_in_file(
-                self,
+            edits.replace(
                 detect_wayland,
                 "ocv_check_modules(XKBCOMMON xkbcommon)",
                 "ocv_check_modules(XKBCOMMON xkbcommon)\nfind_package(xkbcommon REQUIRED CONFIG)\nset(XKBCOMMON_LINK_LIBRARIES xkbcommon::libxkbcommon)",
@@ -1293,23 +1317,23 @@ class OpenCVConan(ConanFile):
 
         ## Cleanup RPATH
         install_layout_file = os.path.join(self.source_folder, "cmake", "OpenCVInstallLayout.cmake")
-        replace_in_file(self, install_layout_file,
-                              "ocv_update(CMAKE_INSTALL_RPATH \"${CMAKE_INSTALL_PREFIX}/${OPENCV_LIB_INSTALL_PATH}\")",
-                              "")
-        replace_in_file(self, install_layout_file, "set(CMAKE_INSTALL_RPATH_USE_LINK_PATH TRUE)", "")
+        edits.replace(install_layout_file,
+                      "ocv_update(CMAKE_INSTALL_RPATH \"${CMAKE_INSTALL_PREFIX}/${OPENCV_LIB_INSTALL_PATH}\")",
+                      "")
+        edits.replace(install_layout_file, "set(CMAKE_INSTALL_RPATH_USE_LINK_PATH TRUE)", "")
 
         ## Fix discovery & link of protobuf
         if self.options.get_safe("with_protobuf"):
             find_protobuf = os.path.join(self.source_folder, "cmake", "OpenCVFindProtobuf.cmake")
             # OpenCV expects to find FindProtobuf.cmake, not the config file
-            replace_in_file(self, find_protobuf,
-                            "find_package(Protobuf QUIET)",
-                            "find_package(Protobuf REQUIRED MODULE)")
+            edits.replace(find_protobuf,
+                          "find_package(Protobuf QUIET)",
+                          "find_package(Protobuf REQUIRED MODULE)")
             # in 'if' block, get_target_property() produces an error
             if Version(self.version) >= "4.4.0":
-                replace_in_file(self, find_protobuf,
-                                      'if(TARGET "${Protobuf_LIBRARIES}")',
-                                      'if(FALSE)  # patch: disable if(TARGET "${Protobuf_LIBRARIES}")')
+                edits.replace(find_protobuf,
+                              'if(TARGET "${Protobuf_LIBRARIES}")',
+                              'if(FALSE)  # patch: disable if(TARGET "${Protobuf_LIBRARIES}")')
 
         # Patches in opencv_contrib
         # -------------------------
@@ -1326,11 +1350,12 @@ class OpenCVConan(ConanFile):
         ## Fix Freetype discovery logic in freetype extra module
         if self.options.freetype:
             freetype_cmake = os.path.join(self._extra_modules_folder, "freetype", "CMakeLists.txt")
-            replace_in_file(self, freetype_cmake, "ocv_check_modules(FREETYPE freetype2)", "find_package(Freetype REQUIRED MODULE)")
-            replace_in_file(self, freetype_cmake, "FREETYPE_", "Freetype_")
+            edits.replace(freetype_cmake, "ocv_check_modules(FREETYPE freetype2)", "find_package(Freetype REQUIRED MODULE)")
+            edits.replace(freetype_cmake, "FREETYPE_", "Freetype_")
 
-            replace_in_file(self, freetype_cmake, "ocv_check_modules(HARFBUZZ harfbuzz)", "find_package(harfbuzz REQUIRED CONFIG)")
-            replace_in_file(self, freetype_cmake, "HARFBUZZ_", "harfbuzz_")
+            edits.replace(freetype_cmake, "ocv_check_modules(HARFBUZZ harfbuzz)", "find_package(harfbuzz REQUIRED CONFIG)")
+            edits.replace(freetype_cmake, "HARFBUZZ_", "harfbuzz_")
+        edits.apply()
 
     def generate(self):
         VirtualBuildEnv(self).generate()
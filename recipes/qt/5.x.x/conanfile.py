@@ -8,10 +8,10 @@ from conan.tools.files import chdir, copy, get, load, replace_in_file, rm, rmdir
 from conan.tools.gnu import PkgConfigDeps
 from conan.tools.microsoft import is_msvc, msvc_runtime_flag, is_msvc_static_runtime, VCVars
 from conan.tools.scm import Version
-import configparser
 import glob
 from io import StringIO
 import itertools
+import json
 import os
 import textwrap
 import shutil
@@ -136,7 +136,7 @@ class QtConan(ConanFile):
         return getattr(self, "settings_build", self.settings)
 
     def export(self):
-        copy(self, f"qtmodules{self.version}.conf", self.recipe_folder, self.export_folder)
+        copy(self, f"qtmodules{self.version}.json", self.recipe_folder, self.export_folder)
 
     def export_sources(self):
         export_conandata_patches(self)
@@ -233,26 +233,12 @@ class QtConan(ConanFile):
         if self.options.multiconfiguration:
             del self.settings.build_type
 
-        config = configparser.ConfigParser()
-        config.read(os.path.join(self.recipe_folder, f"qtmodules{self.version}.conf"))
-        submodules_tree = {}
-        assert config.sections(), f"no qtmodules.conf file for version {self.version}"
-        for s in config.sections():
-            section = str(s)
-            assert section.startswith("submodule ")
-            assert section.count('"') == 2
-            modulename = section[section.find('"') + 1: section.rfind('"')]
-            status = str(config.get(section, "status"))
-            if status not in ("obsolete", "ignore"):
-                if status not in self._module_statuses:
-                    raise ConanException(f"module {modulename} has status {status} which is not in self._module_statuses {self._module_statuses}")
-                submodules_tree[modulename] = {"status": status,
-                                "path": str(config.get(section, "path")), "depends": []}
-                if config.has_option(section, "depends"):
-                    submodules_tree[modulename]["depends"] = [str(i) for i in config.get(section, "depends").split()]
-
-        for m in submodules_tree:
-            assert m in ["qtbase", "qtqa", "qtrepotools"] or m in self._submodules, "module %s is not present in recipe options : (%s)" % (m, ",".join(self._submodules))
+        # Generated and validated from upstream .gitmodules by generate-module-tree.py
+        module_tree_filepath = os.path.join(self.recipe_folder, f"qtmodules{self.version}.json")
+        if not os.path.isfile(module_tree_filepath):
+            raise ConanException(f"Cannot find {module_tree_filepath}")
+        with open(module_tree_filepath, encoding="utf-8") as f:
+            submodules_tree = json.load(f)
 
         for module in self._submodules:
             if module not in submodules_tree:
@@ -279,7 +265,8 @@ class QtConan(ConanFile):
 
         required_modules = {}
         for module in requested_modules:
-            deps = submodules_tree[module]["depends"]
+            # Transitive dependencies too, e.g. qtgraphicaleffects and its qtdeclarative for qtquickcontrols2
+            deps = submodules_tree[module]["depends_closure"]
             for dep in deps:
                 required_modules.setdefault(dep,[]).append(module)
 
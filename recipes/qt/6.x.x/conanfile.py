@@ -1,23 +1,56 @@
-import configparser
 import glob
+import json
 import os
 import platform
 import textwrap
+from collections import defaultdict
 
 from conan import ConanFile, conan_version
 from conan.tools.apple import is_apple_os
 from conan.tools.build import cross_building, check_min_cppstd, default_cppstd
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
 from conan.tools.env import VirtualBuildEnv, VirtualRunEnv, Environment
-from conan.tools.files import copy, get, replace_in_file, apply_conandata_patches, save, rm, rmdir, export_conandata_patches
+from conan.tools.files import copy, get, load, apply_conandata_patches, save, rm, rmdir, export_conandata_patches
 from conan.tools.gnu import PkgConfigDeps
 from conan.tools.microsoft import msvc_runtime_flag, is_msvc
 from conan.tools.scm import Version
 from conan.errors import ConanException, ConanInvalidConfiguration
 
+from file_edits import FileEdits
+
 required_conan_version = ">=1.55.0"
 
 
+class _QtComponent:
+    """Record of the cpp_info fields set on a component, so they can be saved with the package"""
+
+    _fields = ("libs", "libdirs", "includedirs", "defines", "requires", "system_libs", "frameworks",
+               "cxxflags", "exelinkflags", "sharedlinkflags", "builddirs", "objects")
+
+    def __init__(self):
+        for field in self._fields:
+            setattr(self, field, [])
+        # cpp_info defaults, only saved when modified
+        self.libdirs = ["lib"]
+        self.includedirs = ["include"]
+        self.names = {}
+        self.build_modules = {"cmake_find_package": [], "cmake_find_package_multi": []}
+        self.properties = {}
+
+    def set_property(self, name, value):
+        self.properties[name] = value
+
+    def to_dict(self):
+        default = _QtComponent()
+        data = {field: getattr(self, field) for field in self._fields if getattr(self, field) != getattr(default, field)}
+        for field in ("names", "properties"):
+            if getattr(self, field):
+                data[field] = getattr(self, field)
+        if any(self.build_modules.values()):
+            data["build_modules"] = self.build_modules
+        return data
+
+
 class QtConan(ConanFile):
     _submodules = ["qtsvg", "qtdeclarative", "qttools", "qttranslations", "qtdoc",
                    "qtwayland", "qtquickcontrols2", "qtquicktimeline", "qtquick3d", "qtshadertools", "qt5compat",
@@ -127,6 +160,7 @@ class QtConan(ConanFile):
     #    these are only provided for convenience, set to False by default
     default_options.update({f"{status}_modules": False for status in _module_statuses})
 
+    exports = "file_edits.py"
     short_paths = True
 
     _submodules_tree = None
@@ -139,34 +173,19 @@ class QtConan(ConanFile):
     def _get_module_tree(self):
         if self._submodules_tree:
             return self._submodules_tree
-        config = configparser.ConfigParser()
-        config.read(os.path.join(self.recipe_folder, f"qtmodules{self.version}.conf"))
-        self._submodules_tree = {}
-        assert config.sections(), f"no qtmodules.conf file for version {self.version}"
-        for s in config.sections():
-            section = str(s)
-            assert section.startswith("submodule ")
-            assert section.count('"') == 2
-            modulename = section[section.find('"') + 1: section.rfind('"')]
-            if modulename in ["qtbase", "qtqa", "qtrepotools"]:
-                continue
-            status = str(config.get(section, "status"))
-            if status not in ["obsolete", "ignore", "additionalLibrary"]:
-                if status not in self._module_statuses:
-                    raise ConanException(f"module {modulename} has status {status} which is not in self._module_statuses {self._module_statuses}")
-                assert modulename in self._submodules, f"module {modulename} not in self._submodules"
-                self._submodules_tree[modulename] = {"status": status,
-                                "path": str(config.get(section, "path")), "depends": []}
-                if config.has_option(section, "depends"):
-                    self._submodules_tree[modulename]["depends"] = [str(i) for i in config.get(section, "depends").split()]
-
+        # Generated and validated from upstream .gitmodules by generate-module-tree.py
+        module_tree_filepath = os.path.join(self.recipe_folder, f"qtmodules{self.version}.json")
+        if not os.path.isfile(module_tree_filepath):
+            raise ConanException(f"Cannot find {module_tree_filepath}")
+        with open(module_tree_filepath, encoding="utf-8") as f:
+            self._submodules_tree = json.load(f)
         return self._submodules_tree
 
     def export_sources(self):
         export_conandata_patches(self)
 
     def export(self):
-        copy(self, f"qtmodules{self.version}.conf", self.recipe_folder, self.export_folder)
+        copy(self, f"qtmodules{self.version}.json", self.recipe_folder, self.export_folder)
 
     def config_options(self):
         if self.settings.os not in ["Linux", "FreeBSD"]:
@@ -239,7 +258,8 @@ class QtConan(ConanFile):
 
         required_modules =  {}
         for module in requested_modules:
-            deps = self._get_module_tree[module]["depends"]
+            # Transitive dependencies too, e.g. qtquick3d and its qtshadertools for qtgraphs
+            deps = self._get_module_tree[module]["depends_closure"]
             for dep in deps:
                 required_modules.setdefault(dep,[]).append(module)
 
@@ -483,10 +503,10 @@ class QtConan(ConanFile):
 
         tc.generate()
 
+        edits = FileEdits(self)
         for f in glob.glob("*.cmake"):
-            replace_in_file(self, f,
-                " IMPORTED)\n",
-                " IMPORTED GLOBAL)\n", strict=False)
+            edits.replace(f, " IMPORTED)\n", " IMPORTED GLOBAL)\n", strict=False)
+        edits.apply()
 
         pc = PkgConfigDeps(self)
         pc.generate()
@@ -701,11 +721,12 @@ class QtConan(ConanFile):
 
         # patching in source method because of no_copy_source attribute
         apply_conandata_patches(self)
+        edits = FileEdits(self)
         for f in ["renderer", os.path.join("renderer", "core"), os.path.join("renderer", "platform")]:
-            replace_in_file(self, os.path.join(self.source_folder, "qtwebengine", "src", "3rdparty", "chromium", "third_party", "blink", f, "BUILD.gn"),
-                                  "  if (enable_precompiled_headers) {\n    if (is_win) {",
-                                  "  if (enable_precompiled_headers) {\n    if (false) {"
-                                  )
+            edits.replace(os.path.join(self.source_folder, "qtwebengine", "src", "3rdparty", "chromium", "third_party", "blink", f, "BUILD.gn"),
+                          "  if (enable_precompiled_headers) {\n    if (is_win) {",
+                          "  if (enable_precompiled_headers) {\n    if (false) {"
+                          )
 
         for f in ["FindPostgreSQL.cmake"]:
             file = os.path.join(self.source_folder, "qtbase", "cmake", f)
@@ -713,25 +734,25 @@ class QtConan(ConanFile):
                 os.remove(file)
 
         # workaround QTBUG-94356
-        replace_in_file(self, os.path.join(self.source_folder, "qtbase", "cmake", "FindWrapSystemZLIB.cmake"), '"-lz"', 'ZLIB::ZLIB')
-        replace_in_file(self, os.path.join(self.source_folder, "qtbase", "configure.cmake"),
+        edits.replace(os.path.join(self.source_folder, "qtbase", "cmake", "FindWrapSystemZLIB.cmake"), '"-lz"', 'ZLIB::ZLIB')
+        edits.replace(os.path.join(self.source_folder, "qtbase", "configure.cmake"),
             "set_property(TARGET ZLIB::ZLIB PROPERTY IMPORTED_GLOBAL TRUE)",
             "")
         if Version(self.version) <= "6.4.0":
             # use official variable name https://cmake.org/cmake/help/latest/module/FindFontconfig.html
-            replace_in_file(self, os.path.join(self.source_folder, "qtbase", "src", "gui", "configure.cmake"), "FONTCONFIG_FOUND", "Fontconfig_FOUND")
+            edits.replace(os.path.join(self.source_folder, "qtbase", "src", "gui", "configure.cmake"), "FONTCONFIG_FOUND", "Fontconfig_FOUND")
 
-        replace_in_file(self,
-                        os.path.join(self.source_folder, "qtbase", "cmake", "QtAutoDetect.cmake" if Version(self.version) < "6.6.2" else "QtAutoDetectHelpers.cmake"),
-                        "qt_auto_detect_vcpkg()",
-                        "# qt_auto_detect_vcpkg()")
+        edits.replace(os.path.join(self.source_folder, "qtbase", "cmake", "QtAutoDetect.cmake" if Version(self.version) < "6.6.2" else "QtAutoDetectHelpers.cmake"),
+                      "qt_auto_detect_vcpkg()",
+                      "# qt_auto_detect_vcpkg()")
 
         # Handle locating moltenvk headers when vulkan is enabled on macOS
-        replace_in_file(self, os.path.join(self.source_folder, "qtbase", "cmake", "FindWrapVulkanHeaders.cmake"),
+        edits.replace(os.path.join(self.source_folder, "qtbase", "cmake", "FindWrapVulkanHeaders.cmake"),
         "if(APPLE)", "if(APPLE)\n"
                     " find_package(moltenvk REQUIRED QUIET)\n"
                     " target_include_directories(WrapVulkanHeaders::WrapVulkanHeaders INTERFACE ${moltenvk_INCLUDE_DIR})"
         )
+        edits.apply()
 
     def _xplatform(self):
         if self.settings.os == "Linux":
@@ -992,26 +1013,25 @@ class QtConan(ConanFile):
                 )""")
             save(self, os.path.join(self.package_folder, self._cmake_entry_point_file), contents)
 
-    def package_info(self):
-        self.cpp_info.set_property("cmake_file_name", "Qt6")
-        self.cpp_info.set_property("pkg_config_name", "qt6")
-
-        self.cpp_info.names["cmake_find_package"] = "Qt6"
-        self.cpp_info.names["cmake_find_package_multi"] = "Qt6"
+        save(self, os.path.join(self.package_folder, self._components_file), json.dumps(self._components_table(), indent=2))
 
-        # consumers will need the QT_PLUGIN_PATH defined in runenv
-        self.runenv_info.define("QT_PLUGIN_PATH", os.path.join(self.package_folder, "plugins"))
-        self.buildenv_info.define("QT_PLUGIN_PATH", os.path.join(self.package_folder, "plugins"))
+    @property
+    def _components_file(self):
+        return os.path.join("lib", "cmake", "Qt6Core", "conan_qt_components.json")
 
-        self.buildenv_info.define("QT_HOST_PATH", self.package_folder)
+    def _components_table(self):
+        """Components of the package, computed once in package() and loaded by package_info()
 
+        Paths are relative to the package folder.
+        """
+        components = defaultdict(_QtComponent)
         build_modules = {}
         def _add_build_module(component, module):
             if component not in build_modules:
                 build_modules[component] = []
             build_modules[component].append(module)
-            self.cpp_info.components[component].build_modules["cmake_find_package"].append(module)
-            self.cpp_info.components[component].build_modules["cmake_find_package_multi"].append(module)
+            components[component].build_modules["cmake_find_package"].append(module)
+            components[component].build_modules["cmake_find_package_multi"].append(module)
 
         libsuffix = ""
         if self.settings.build_type == "Debug":
@@ -1027,42 +1047,42 @@ class QtConan(ConanFile):
                     corrected_req = r
                 else:
                     corrected_req = f"qt{r}"
-                    assert corrected_req in self.cpp_info.components, f"{corrected_req} required but not yet present in self.cpp_info.components"
+                    assert corrected_req in components, f"{corrected_req} required but not yet present in components"
                 reqs.append(corrected_req)
             return reqs
 
         def _create_module(module, requires, has_include_dir=True):
             componentname = f"qt{module}"
-            assert componentname not in self.cpp_info.components, f"Module {module} already present in self.cpp_info.components"
-            self.cpp_info.components[componentname].set_property("cmake_target_name", f"Qt6::{module}")
-            self.cpp_info.components[componentname].set_property("pkg_config_name", f"Qt6{module}")
-            self.cpp_info.components[componentname].names["cmake_find_package"] = module
-            self.cpp_info.components[componentname].names["cmake_find_package_multi"] = module
+            assert componentname not in components, f"Module {module} already present in components"
+            components[componentname].set_property("cmake_target_name", f"Qt6::{module}")
+            components[componentname].set_property("pkg_config_name", f"Qt6{module}")
+            components[componentname].names["cmake_find_package"] = module
+            components[componentname].names["cmake_find_package_multi"] = module
             if module.endswith("Private"):
                 libname = module[:-7]
             else:
                 libname = module
-            self.cpp_info.components[componentname].libs = [f"Qt6{libname}{libsuffix}"]
+            components[componentname].libs = [f"Qt6{libname}{libsuffix}"]
             if has_include_dir:
-                self.cpp_info.components[componentname].includedirs = ["include", os.path.join("include", f"Qt{module}")]
-            self.cpp_info.components[componentname].defines = [f"QT_{module.upper()}_LIB"]
+                components[componentname].includedirs = ["include", os.path.join("include", f"Qt{module}")]
+            components[componentname].defines = [f"QT_{module.upper()}_LIB"]
             if module != "Core" and "Core" not in requires:
                 requires.append("Core")
-            self.cpp_info.components[componentname].requires = _get_corrected_reqs(requires)
+            components[componentname].requires = _get_corrected_reqs(requires)
 
         def _create_plugin(pluginname, libname, plugintype, requires):
             componentname = f"qt{pluginname}"
-            assert componentname not in self.cpp_info.components, f"Plugin {pluginname} already present in self.cpp_info.components"
-            self.cpp_info.components[componentname].set_property("cmake_target_name", f"Qt6::{pluginname}")
-            self.cpp_info.components[componentname].names["cmake_find_package"] = pluginname
-            self.cpp_info.components[componentname].names["cmake_find_package_multi"] = pluginname
+            assert componentname not in components, f"Plugin {pluginname} already present in components"
+            components[componentname].set_property("cmake_target_name", f"Qt6::{pluginname}")
+            components[componentname].names["cmake_find_package"] = pluginname
+            components[componentname].names["cmake_find_package_multi"] = pluginname
             if not self.options.shared:
-                self.cpp_info.components[componentname].libs = [libname + libsuffix]
-            self.cpp_info.components[componentname].libdirs = [os.path.join("plugins", plugintype)]
-            self.cpp_info.components[componentname].includedirs = []
+                components[componentname].libs = [libname + libsuffix]
+            components[componentname].libdirs = [os.path.join("plugins", plugintype)]
+            components[componentname].includedirs = []
             if "Core" not in requires:
                 requires.append("Core")
-            self.cpp_info.components[componentname].requires = _get_corrected_reqs(requires)
+            components[componentname].requires = _get_corrected_reqs(requires)
 
         core_reqs = ["zlib::zlib"]
         if self.options.with_pcre2:
@@ -1084,29 +1104,29 @@ class QtConan(ConanFile):
             "libexecdir=${prefix}/libexec",
             "exec_prefix=${prefix}",
         ]
-        self.cpp_info.components["qtCore"].set_property("pkg_config_custom_content", "\n".join(pkg_config_vars))
+        components["qtCore"].set_property("pkg_config_custom_content", "\n".join(pkg_config_vars))
 
         if self.settings.build_type != "Debug":
-            self.cpp_info.components['qtCore'].defines.append('QT_NO_DEBUG')
+            components['qtCore'].defines.append('QT_NO_DEBUG')
         if self.settings.os == "Windows":
-            self.cpp_info.components["qtCore"].system_libs.append("authz")
+            components["qtCore"].system_libs.append("authz")
         if is_msvc(self):
-            self.cpp_info.components["qtCore"].cxxflags.append("-permissive-")
-            self.cpp_info.components["qtCore"].cxxflags.append("-Zc:__cplusplus")
-            self.cpp_info.components["qtCore"].system_libs.append("synchronization")
-            self.cpp_info.components["qtCore"].system_libs.append("runtimeobject")
-        self.cpp_info.components["qtPlatform"].set_property("cmake_target_name", "Qt6::Platform")
-        self.cpp_info.components["qtPlatform"].names["cmake_find_package"] = "Platform"
-        self.cpp_info.components["qtPlatform"].names["cmake_find_package_multi"] = "Platform"
-        self.cpp_info.components["qtPlatform"].includedirs = [os.path.join("mkspecs", self._xplatform())]
+            components["qtCore"].cxxflags.append("-permissive-")
+            components["qtCore"].cxxflags.append("-Zc:__cplusplus")
+            components["qtCore"].system_libs.append("synchronization")
+            components["qtCore"].system_libs.append("runtimeobject")
+        components["qtPlatform"].set_property("cmake_target_name", "Qt6::Platform")
+        components["qtPlatform"].names["cmake_find_package"] = "Platform"
+        components["qtPlatform"].names["cmake_find_package_multi"] = "Platform"
+        components["qtPlatform"].includedirs = [os.path.join("mkspecs", self._xplatform())]
         if self.options.with_dbus:
             _create_module("DBus", ["dbus::dbus"])
             if self.settings.os == "Windows":
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/dbus/CMakeLists.txt#L71-L77
-                self.cpp_info.components["qtDBus"].system_libs.append("advapi32")
-                self.cpp_info.components["qtDBus"].system_libs.append("netapi32")
-                self.cpp_info.components["qtDBus"].system_libs.append("user32")
-                self.cpp_info.components["qtDBus"].system_libs.append("ws2_32")
+                components["qtDBus"].system_libs.append("advapi32")
+                components["qtDBus"].system_libs.append("netapi32")
+                components["qtDBus"].system_libs.append("user32")
+                components["qtDBus"].system_libs.append("ws2_32")
         if self.options.gui:
             gui_reqs = []
             if self.options.with_dbus:
@@ -1143,26 +1163,26 @@ class QtConan(ConanFile):
 
             if self.settings.os == "Windows":
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/gui/CMakeLists.txt#L419-L429
-                self.cpp_info.components["qtGui"].system_libs += [
+                components["qtGui"].system_libs += [
                     "advapi32", "gdi32", "ole32", "shell32", "user32", "d3d11", "dxgi", "dxguid"
                 ]
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/gui/CMakeLists.txt#L729
-                self.cpp_info.components["qtGui"].system_libs.append("d2d1")
+                components["qtGui"].system_libs.append("d2d1")
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/gui/CMakeLists.txt#L732-L742
-                self.cpp_info.components["qtGui"].system_libs.append("dwrite")
+                components["qtGui"].system_libs.append("dwrite")
                 if self.settings.compiler == "gcc":
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/gui/CMakeLists.txt#L746
-                    self.cpp_info.components["qtGui"].system_libs.append("uuid")
+                    components["qtGui"].system_libs.append("uuid")
                 if Version(self.version) >= "6.6.0":
                     # https://github.com/qt/qtbase/blob/v6.6.0/src/gui/CMakeLists.txt#L428
-                    self.cpp_info.components["qtGui"].system_libs.append("d3d12")
+                    components["qtGui"].system_libs.append("d3d12")
                 if Version(self.version) >= "6.7.0":
                     # https://github.com/qt/qtbase/blob/v6.7.0-beta1/src/gui/CMakeLists.txt#L430
-                    self.cpp_info.components["qtGui"].system_libs.append("uxtheme")
+                    components["qtGui"].system_libs.append("uxtheme")
                 if self.settings.compiler == "gcc":
-                    self.cpp_info.components["qtGui"].system_libs.append("uuid")
+                    components["qtGui"].system_libs.append("uuid")
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/plugins/platforms/direct2d/CMakeLists.txt#L60-L82
-                self.cpp_info.components["qtGui"].system_libs += [
+                components["qtGui"].system_libs += [
                     "advapi32", "d2d1", "d3d11", "dwmapi", "dwrite", "dxgi", "dxguid", "gdi32", "imm32", "ole32",
                     "oleaut32", "setupapi", "shell32", "shlwapi", "user32", "version", "winmm", "winspool",
                     "wtsapi32", "shcore", "comdlg32", "d3d9", "runtimeobject"
@@ -1174,37 +1194,37 @@ class QtConan(ConanFile):
                 else:
                     _create_plugin("QWindowsVistaStylePlugin", "qwindowsvistastyle", "styles", ["Core", "Gui"])
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/plugins/platforms/windows/CMakeLists.txt#L53-L69
-                self.cpp_info.components["qtQWindowsIntegrationPlugin"].system_libs += [
+                components["qtQWindowsIntegrationPlugin"].system_libs += [
                     "advapi32", "dwmapi", "gdi32", "imm32", "ole32", "oleaut32", "setupapi", "shell32", "shlwapi",
                     "user32", "winmm", "winspool", "wtsapi32", "shcore", "comdlg32", "d3d9", "runtimeobject"
                 ]
             elif self.settings.os == "Android":
                 _create_plugin("QAndroidIntegrationPlugin", "qtforandroid", "platforms", ["Core", "Gui"])
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/plugins/platforms/android/CMakeLists.txt#L68-L70
-                self.cpp_info.components["qtQAndroidIntegrationPlugin"].system_libs = ["android", "jnigraphics"]
+                components["qtQAndroidIntegrationPlugin"].system_libs = ["android", "jnigraphics"]
             elif is_apple_os(self):
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/gui/CMakeLists.txt#L388-L394
-                self.cpp_info.components["qtGui"].frameworks = ["CoreFoundation", "CoreGraphics", "CoreText", "Foundation", "ImageIO"]
+                components["qtGui"].frameworks = ["CoreFoundation", "CoreGraphics", "CoreText", "Foundation", "ImageIO"]
                 if self.options.get_safe("opengl", "no") != "no":
                     # https://github.com/qt/qtbase/commit/2ed63e587eefb246dba9e69aa01fdb2abb2def13
-                    self.cpp_info.components["qtGui"].frameworks.append("AGL")
+                    components["qtGui"].frameworks.append("AGL")
                 if self.settings.os == "Macos":
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/gui/CMakeLists.txt#L362-L370
-                    self.cpp_info.components["qtGui"].frameworks += ["AppKit", "Carbon"]
+                    components["qtGui"].frameworks += ["AppKit", "Carbon"]
                     _create_plugin("QCocoaIntegrationPlugin", "qcocoa", "platforms", ["Core", "Gui"])
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/plugins/platforms/cocoa/CMakeLists.txt#L51-L58
-                    self.cpp_info.components["QCocoaIntegrationPlugin"].frameworks = [
+                    components["QCocoaIntegrationPlugin"].frameworks = [
                         "AppKit", "Carbon", "CoreServices", "CoreVideo", "IOKit", "IOSurface", "Metal", "QuartzCore"
                     ]
                 elif self.settings.os in ["iOS", "tvOS"]:
                     _create_plugin("QIOSIntegrationPlugin", "qios", "platforms", [])
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/plugins/platforms/ios/CMakeLists.txt#L32-L37
-                    self.cpp_info.components["QIOSIntegrationPlugin"].frameworks = [
+                    components["QIOSIntegrationPlugin"].frameworks = [
                         "AudioToolbox", "Foundation", "Metal", "QuartzCore", "UIKit", "CoreGraphics"
                     ]
                     if self.settings.os != "tvOS":
                         # https://github.com/qt/qtbase/blob/v6.6.1/src/plugins/platforms/ios/CMakeLists.txt#L66-L68
-                        self.cpp_info.components["QIOSIntegrationPlugin"].frameworks += [
+                        components["QIOSIntegrationPlugin"].frameworks += [
                             "AssetsLibrary", "UniformTypeIdentifiers", "Photos",
                         ]
                 elif self.settings.os == "watchOS":
@@ -1232,9 +1252,9 @@ class QtConan(ConanFile):
         if self.options.with_odbc:
             _create_plugin("QODBCDriverPlugin", "qsqlodbc", "sqldrivers", [])
             if self.settings.os != "Windows":
-                self.cpp_info.components["QODBCDriverPlugin"].requires.append("odbc::odbc")
+                components["QODBCDriverPlugin"].requires.append("odbc::odbc")
             else:
-                self.cpp_info.components["QODBCDriverPlugin"].system_libs.append("odbc32")
+                components["QODBCDriverPlugin"].system_libs.append("odbc32")
         networkReqs = []
         if self.options.openssl:
             networkReqs.append("openssl::openssl")
@@ -1250,7 +1270,7 @@ class QtConan(ConanFile):
             _add_build_module("qtWidgets", self._cmake_qt6_private_file("Widgets"))
             if self.settings.os == "Windows":
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/widgets/CMakeLists.txt#L316-L321
-                self.cpp_info.components["qtWidgets"].system_libs += [
+                components["qtWidgets"].system_libs += [
                     "dwmapi", "shell32", "uxtheme",
                 ]
         if self.options.gui and self.options.widgets:
@@ -1272,10 +1292,10 @@ class QtConan(ConanFile):
             _create_module("Qml", ["Network"])
             _add_build_module("qtQml", self._cmake_qt6_private_file("Qml"))
             _create_module("QmlModels", ["Qml"])
-            self.cpp_info.components["qtQmlImportScanner"].set_property("cmake_target_name", "Qt6::QmlImportScanner")
-            self.cpp_info.components["qtQmlImportScanner"].names["cmake_find_package"] = "QmlImportScanner" # this is an alias for Qml and there to integrate with existing consumers
-            self.cpp_info.components["qtQmlImportScanner"].names["cmake_find_package_multi"] = "QmlImportScanner"
-            self.cpp_info.components["qtQmlImportScanner"].requires = _get_corrected_reqs(["Qml"])
+            components["qtQmlImportScanner"].set_property("cmake_target_name", "Qt6::QmlImportScanner")
+            components["qtQmlImportScanner"].names["cmake_find_package"] = "QmlImportScanner" # this is an alias for Qml and there to integrate with existing consumers
+            components["qtQmlImportScanner"].names["cmake_find_package_multi"] = "QmlImportScanner"
+            components["qtQmlImportScanner"].requires = _get_corrected_reqs(["Qml"])
             if qt_quick_enabled:
                 _create_module("Quick", ["Gui", "Qml", "QmlModels"])
                 _add_build_module("qtQuick", self._cmake_qt6_private_file("Quick"))
@@ -1286,12 +1306,12 @@ class QtConan(ConanFile):
             _create_module("QmlWorkerScript", ["Qml"])
 
         if self.options.qttools and self.options.gui and self.options.widgets:
-            self.cpp_info.components["qtLinguistTools"].set_property("cmake_target_name", "Qt6::LinguistTools")
-            self.cpp_info.components["qtLinguistTools"].names["cmake_find_package"] = "LinguistTools"
-            self.cpp_info.components["qtLinguistTools"].names["cmake_find_package_multi"] = "LinguistTools"
+            components["qtLinguistTools"].set_property("cmake_target_name", "Qt6::LinguistTools")
+            components["qtLinguistTools"].names["cmake_find_package"] = "LinguistTools"
+            components["qtLinguistTools"].names["cmake_find_package_multi"] = "LinguistTools"
             _create_module("UiPlugin", ["Gui", "Widgets"])
-            self.cpp_info.components["qtUiPlugin"].libs = [] # this is a collection of abstract classes, so this is header-only
-            self.cpp_info.components["qtUiPlugin"].libdirs = []
+            components["qtUiPlugin"].libs = [] # this is a collection of abstract classes, so this is header-only
+            components["qtUiPlugin"].libdirs = []
             _create_module("UiTools", ["UiPlugin", "Gui", "Widgets"])
             _create_module("Designer", ["Gui", "UiPlugin", "Widgets", "Xml"])
             _create_module("Help", ["Gui", "Sql", "Widgets"])
@@ -1323,8 +1343,8 @@ class QtConan(ConanFile):
         if self.options.get_safe("qtactiveqt") and self.settings.os == "Windows":
             _create_module("AxBase", ["Gui", "Widgets"])
             _create_module("AxServer", ["AxBase"])
-            self.cpp_info.components["qtAxServer"].system_libs.append("shell32")
-            self.cpp_info.components["qtAxServer"].defines.append("QAXSERVER")
+            components["qtAxServer"].system_libs.append("shell32")
+            components["qtAxServer"].defines.append("QAXSERVER")
             _create_module("AxContainer", ["AxBase"])
         if self.options.get_safe("qtcharts"):
             _create_module("Charts", ["Gui", "Widgets"])
@@ -1465,155 +1485,192 @@ class QtConan(ConanFile):
 
         if self.settings.os in ["Windows", "iOS"]:
             if self.settings.os == "Windows":
-                self.cpp_info.components["qtEntryPointImplementation"].set_property("cmake_target_name", "Qt6::EntryPointImplementation")
-                self.cpp_info.components["qtEntryPointImplementation"].names["cmake_find_package"] = "EntryPointImplementation"
-                self.cpp_info.components["qtEntryPointImplementation"].names["cmake_find_package_multi"] = "EntryPointImplementation"
-                self.cpp_info.components["qtEntryPointImplementation"].libs = [f"Qt6EntryPoint{libsuffix}"]
-                self.cpp_info.components["qtEntryPointImplementation"].system_libs = ["shell32"]
+                components["qtEntryPointImplementation"].set_property("cmake_target_name", "Qt6::EntryPointImplementation")
+                components["qtEntryPointImplementation"].names["cmake_find_package"] = "EntryPointImplementation"
+                components["qtEntryPointImplementation"].names["cmake_find_package_multi"] = "EntryPointImplementation"
+                components["qtEntryPointImplementation"].libs = [f"Qt6EntryPoint{libsuffix}"]
+                components["qtEntryPointImplementation"].system_libs = ["shell32"]
 
                 if self.settings.compiler == "gcc":
-                    self.cpp_info.components["qtEntryPointMinGW32"].set_property("cmake_target_name", "Qt6::EntryPointMinGW32")
-                    self.cpp_info.components["qtEntryPointMinGW32"].names["cmake_find_package"] = "EntryPointMinGW32"
-                    self.cpp_info.components["qtEntryPointMinGW32"].names["cmake_find_package_multi"] = "EntryPointMinGW32"
-                    self.cpp_info.components["qtEntryPointMinGW32"].system_libs = ["mingw32"]
-                    self.cpp_info.components["qtEntryPointMinGW32"].requires = ["qtEntryPointImplementation"]
-
-            self.cpp_info.components["qtEntryPointPrivate"].set_property("cmake_target_name", "Qt6::EntryPointPrivate")
-            self.cpp_info.components["qtEntryPointPrivate"].names["cmake_find_package"] = "EntryPointPrivate"
-            self.cpp_info.components["qtEntryPointPrivate"].names["cmake_find_package_multi"] = "EntryPointPrivate"
+                    components["qtEntryPointMinGW32"].set_property("cmake_target_name", "Qt6::EntryPointMinGW32")
+                    components["qtEntryPointMinGW32"].names["cmake_find_package"] = "EntryPointMinGW32"
+                    components["qtEntryPointMinGW32"].names["cmake_find_package_multi"] = "EntryPointMinGW32"
+                    components["qtEntryPointMinGW32"].system_libs = ["mingw32"]
+                    components["qtEntryPointMinGW32"].requires = ["qtEntryPointImplementation"]
+
+            components["qtEntryPointPrivate"].set_property("cmake_target_name", "Qt6::EntryPointPrivate")
+            components["qtEntryPointPrivate"].names["cmake_find_package"] = "EntryPointPrivate"
+            components["qtEntryPointPrivate"].names["cmake_find_package_multi"] = "EntryPointPrivate"
             if self.settings.os == "Windows":
                 if self.settings.compiler == "gcc":
-                    self.cpp_info.components["qtEntryPointPrivate"].defines.append("QT_NEEDS_QMAIN")
-                    self.cpp_info.components["qtEntryPointPrivate"].requires.append("qtEntryPointMinGW32")
+                    components["qtEntryPointPrivate"].defines.append("QT_NEEDS_QMAIN")
+                    components["qtEntryPointPrivate"].requires.append("qtEntryPointMinGW32")
                 else:
-                    self.cpp_info.components["qtEntryPointPrivate"].requires.append("qtEntryPointImplementation")
+                    components["qtEntryPointPrivate"].requires.append("qtEntryPointImplementation")
             if self.settings.os == "iOS":
-                self.cpp_info.components["qtEntryPointPrivate"].exelinkflags.append("-Wl,-e,_qt_main_wrapper")
+                components["qtEntryPointPrivate"].exelinkflags.append("-Wl,-e,_qt_main_wrapper")
 
         if self.settings.os != "Windows":
-            self.cpp_info.components["qtCore"].cxxflags.append("-fPIC")
+            components["qtCore"].cxxflags.append("-fPIC")
 
         if not self.options.shared:
             if self.settings.os == "Windows":
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/corelib/CMakeLists.txt#L527-L541
-                self.cpp_info.components["qtCore"].system_libs.append("advapi32")
-                self.cpp_info.components["qtCore"].system_libs.append("authz")
-                self.cpp_info.components["qtCore"].system_libs.append("kernel32")
-                self.cpp_info.components["qtCore"].system_libs.append("netapi32")
-                self.cpp_info.components["qtCore"].system_libs.append("ole32")
-                self.cpp_info.components["qtCore"].system_libs.append("shell32")
-                self.cpp_info.components["qtCore"].system_libs.append("user32")
-                self.cpp_info.components["qtCore"].system_libs.append("uuid")
-                self.cpp_info.components["qtCore"].system_libs.append("version")
-                self.cpp_info.components["qtCore"].system_libs.append("winmm")
-                self.cpp_info.components["qtCore"].system_libs.append("ws2_32")
-                self.cpp_info.components["qtCore"].system_libs.append("mpr")
-                self.cpp_info.components["qtCore"].system_libs.append("userenv")
+                components["qtCore"].system_libs.append("advapi32")
+                components["qtCore"].system_libs.append("authz")
+                components["qtCore"].system_libs.append("kernel32")
+                components["qtCore"].system_libs.append("netapi32")
+                components["qtCore"].system_libs.append("ole32")
+                components["qtCore"].system_libs.append("shell32")
+                components["qtCore"].system_libs.append("user32")
+                components["qtCore"].system_libs.append("uuid")
+                components["qtCore"].system_libs.append("version")
+                components["qtCore"].system_libs.append("winmm")
+                components["qtCore"].system_libs.append("ws2_32")
+                components["qtCore"].system_libs.append("mpr")
+                components["qtCore"].system_libs.append("userenv")
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/network/CMakeLists.txt#L196-L200
-                self.cpp_info.components["qtNetwork"].system_libs.append("advapi32")
-                self.cpp_info.components["qtNetwork"].system_libs.append("dnsapi")
-                self.cpp_info.components["qtNetwork"].system_libs.append("iphlpapi")
-                self.cpp_info.components["qtNetwork"].system_libs.append("secur32")
-                self.cpp_info.components["qtNetwork"].system_libs.append("winhttp")
+                components["qtNetwork"].system_libs.append("advapi32")
+                components["qtNetwork"].system_libs.append("dnsapi")
+                components["qtNetwork"].system_libs.append("iphlpapi")
+                components["qtNetwork"].system_libs.append("secur32")
+                components["qtNetwork"].system_libs.append("winhttp")
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/printsupport/CMakeLists.txt#L70-L75
-                self.cpp_info.components["qtPrintSupport"].system_libs.append("gdi32")
-                self.cpp_info.components["qtPrintSupport"].system_libs.append("user32")
-                self.cpp_info.components["qtPrintSupport"].system_libs.append("comdlg32")
-                self.cpp_info.components["qtPrintSupport"].system_libs.append("winspool")
+                components["qtPrintSupport"].system_libs.append("gdi32")
+                components["qtPrintSupport"].system_libs.append("user32")
+                components["qtPrintSupport"].system_libs.append("comdlg32")
+                components["qtPrintSupport"].system_libs.append("winspool")
 
             if is_apple_os(self):
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/corelib/CMakeLists.txt#L580-L584
-                self.cpp_info.components["qtCore"].frameworks.append("CoreFoundation")
-                self.cpp_info.components["qtCore"].frameworks.append("Foundation")
-                self.cpp_info.components["qtCore"].frameworks.append("IOKit")
+                components["qtCore"].frameworks.append("CoreFoundation")
+                components["qtCore"].frameworks.append("Foundation")
+                components["qtCore"].frameworks.append("IOKit")
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/network/CMakeLists.txt#L205-L214
-                self.cpp_info.components["qtNetwork"].frameworks.append("CFNetwork")
+                components["qtNetwork"].frameworks.append("CFNetwork")
                 # https://github.com/qt/qtbase/blob/v6.6.1/src/network/CMakeLists.txt#L216-L221
                 # qtcore requires "_OBJC_CLASS_$_NSApplication" and more, which are in "Cocoa" framework
-                self.cpp_info.components["qtCore"].frameworks.append("Cocoa")
-                self.cpp_info.components["qtNetwork"].system_libs.append("resolv")
+                components["qtCore"].frameworks.append("Cocoa")
+                components["qtNetwork"].system_libs.append("resolv")
                 if self.options.with_gssapi:
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/network/CMakeLists.txt#L250C56-L253
-                    self.cpp_info.components["qtNetwork"].frameworks.append("GSS")
+                    components["qtNetwork"].frameworks.append("GSS")
                 if self.options.gui and self.options.widgets:
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/printsupport/CMakeLists.txt#L52-L63
-                    self.cpp_info.components["qtPrintSupport"].system_libs.append("cups")
-                    self.cpp_info.components["qtPrintSupport"].frameworks.append("ApplicationServices")
+                    components["qtPrintSupport"].system_libs.append("cups")
+                    components["qtPrintSupport"].frameworks.append("ApplicationServices")
                 if self.settings.os == "Macos":
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/corelib/CMakeLists.txt#L598-L606
-                    self.cpp_info.components["qtCore"].frameworks.append("AppKit")
-                    self.cpp_info.components["qtCore"].frameworks.append("ApplicationServices")
-                    self.cpp_info.components["qtCore"].frameworks.append("CoreServices")
-                    self.cpp_info.components["qtCore"].frameworks.append("CoreServices")
-                    self.cpp_info.components["qtCore"].frameworks.append("Security")
-                    self.cpp_info.components["qtCore"].frameworks.append("DiskArbitration")
+                    components["qtCore"].frameworks.append("AppKit")
+                    components["qtCore"].frameworks.append("ApplicationServices")
+                    components["qtCore"].frameworks.append("CoreServices")
+                    components["qtCore"].frameworks.append("CoreServices")
+                    components["qtCore"].frameworks.append("Security")
+                    components["qtCore"].frameworks.append("DiskArbitration")
                 else:
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/corelib/CMakeLists.txt#L969-L972
-                    self.cpp_info.components["qtCore"].frameworks.append("MobileCoreServices")
+                    components["qtCore"].frameworks.append("MobileCoreServices")
                 if self.settings.os not in ["iOS", "tvOS"]:
-                    self.cpp_info.components["qtNetwork"].frameworks.append("CoreServices")
-                    self.cpp_info.components["qtNetwork"].frameworks.append("SystemConfiguration")
+                    components["qtNetwork"].frameworks.append("CoreServices")
+                    components["qtNetwork"].frameworks.append("SystemConfiguration")
                 else:
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/corelib/CMakeLists.txt#L1074-L1077
-                    self.cpp_info.components["qtCore"].frameworks.append("UIKit")
+                    components["qtCore"].frameworks.append("UIKit")
                 if self.settings.os == "watchOS":
                     # https://github.com/qt/qtbase/blob/v6.6.1/src/corelib/CMakeLists.txt#L1079-L1082
-                    self.cpp_info.components["qtCore"].frameworks.append("WatchKit")
+                    components["qtCore"].frameworks.append("WatchKit")
 
-        self.cpp_info.components["qtCore"].builddirs.append(os.path.join("bin"))
+        components["qtCore"].builddirs.append(os.path.join("bin"))
         _add_build_module("qtCore", self._cmake_executables_file)
         _add_build_module("qtCore", self._cmake_qt6_private_file("Core"))
         if self.settings.os in ["Windows", "iOS"]:
             _add_build_module("qtCore", self._cmake_entry_point_file)
 
-        for m in os.listdir(os.path.join("lib", "cmake")):
+        for m in os.listdir(os.path.join(self.package_folder, "lib", "cmake")):
             component_name = m.replace("Qt6", "qt")
             if component_name == "qt":
                 component_name = "qtCore"
 
-            if component_name in self.cpp_info.components:
+            if component_name in components:
                 module = os.path.join("lib", "cmake", m, f"{m}Macros.cmake")
-                if os.path.isfile(module):
+                if os.path.isfile(os.path.join(self.package_folder, module)):
                     _add_build_module(component_name, module)
 
                 module = os.path.join("lib", "cmake", m, f"{m}ConfigExtras.cmake")
-                if os.path.isfile(module):
+                if os.path.isfile(os.path.join(self.package_folder, module)):
                     _add_build_module(component_name, module)
 
                 for helper_modules in glob.glob(os.path.join(self.package_folder, "lib", "cmake", m, "QtPublic*Helpers.cmake")):
-                    _add_build_module(component_name, helper_modules)
-                self.cpp_info.components[component_name].builddirs.append(os.path.join("lib", "cmake", m))
+                    _add_build_module(component_name, os.path.relpath(helper_modules, self.package_folder))
+                components[component_name].builddirs.append(os.path.join("lib", "cmake", m))
 
-            elif component_name.endswith("Tools") and component_name[:-5] in self.cpp_info.components:
+            elif component_name.endswith("Tools") and component_name[:-5] in components:
                 module = os.path.join("lib", "cmake", f"{m}", f"{m[:-5]}Macros.cmake")
-                if os.path.isfile(module):
+                if os.path.isfile(os.path.join(self.package_folder, module)):
                     _add_build_module(component_name[:-5], module)
-                self.cpp_info.components[component_name[:-5]].builddirs.append(os.path.join("lib", "cmake", m))
+                components[component_name[:-5]].builddirs.append(os.path.join("lib", "cmake", m))
 
         objects_dirs = glob.glob(os.path.join(self.package_folder, "lib", "objects-*/"))
         for object_dir in objects_dirs:
             for m in os.listdir(object_dir):
                 component = "qt" + m[:m.find("_")]
-                if component not in self.cpp_info.components:
+                if component not in components:
                     continue
                 for root, _, files in os.walk(os.path.join(object_dir, m)):
-                    obj_files = [os.path.join(root, file) for file in files]
-                    self.cpp_info.components[component].exelinkflags.extend(obj_files)
-                    self.cpp_info.components[component].sharedlinkflags.extend(obj_files)
+                    components[component].objects.extend(os.path.relpath(os.path.join(root, file), self.package_folder) for file in files)
 
         build_modules_list = []
 
         if self.options.qtdeclarative:
-            build_modules_list.append(os.path.join(self.package_folder, "lib", "cmake", "Qt6Qml", "conan_qt_qt6_policies.cmake"))
+            build_modules_list.append(os.path.join("lib", "cmake", "Qt6Qml", "conan_qt_qt6_policies.cmake"))
 
         def _add_build_modules_for_component(component):
-            for req in self.cpp_info.components[component].requires:
+            for req in components[component].requires:
                 if "::" in req: # not a qt component
                     continue
                 _add_build_modules_for_component(req)
             build_modules_list.extend(build_modules.pop(component, []))
 
-        for c in self.cpp_info.components:
+        for c in components:
             _add_build_modules_for_component(c)
 
-        self.cpp_info.set_property("cmake_build_modules", build_modules_list)
+        return {
+            "components": {name: component.to_dict() for name, component in components.items()},
+            "cmake_build_modules": build_modules_list,
+        }
+
+    def package_info(self):
+        self.cpp_info.set_property("cmake_file_name", "Qt6")
+        self.cpp_info.set_property("pkg_config_name", "qt6")
+
+        self.cpp_info.names["cmake_find_package"] = "Qt6"
+        self.cpp_info.names["cmake_find_package_multi"] = "Qt6"
+
+        # consumers will need the QT_PLUGIN_PATH defined in runenv
+        self.runenv_info.define("QT_PLUGIN_PATH", os.path.join(self.package_folder, "plugins"))
+        self.buildenv_info.define("QT_PLUGIN_PATH", os.path.join(self.package_folder, "plugins"))
+
+        self.buildenv_info.define("QT_HOST_PATH", self.package_folder)
+
+        components_file = os.path.join(self.package_folder, self._components_file)
+        if os.path.isfile(components_file):
+            table = json.loads(load(self, components_file))
+        else:
+            # package created before the components table was saved
+            table = self._components_table()
+
+        for name, fields in table["components"].items():
+            component = self.cpp_info.components[name]
+            for key, value in fields.pop("properties", {}).items():
+                component.set_property(key, value)
+            for generator, value in fields.pop("names", {}).items():
+                component.names[generator] = value
+            for generator, modules in fields.pop("build_modules", {}).items():
+                component.build_modules[generator] = modules
+            objects = [os.path.join(self.package_folder, obj) for obj in fields.pop("objects", [])]
+            for key, value in fields.items():
+                setattr(component, key, value)
+            component.exelinkflags.extend(objects)
+            component.sharedlinkflags.extend(objects)
+
+        self.cpp_info.set_property("cmake_build_modules", [os.path.join(self.package_folder, module) for module in table["cmake_build_modules"]])
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""Generate qtmodules<version>.json, the module table used by the recipe, from Qt's .gitmodules
+
+The table is validated against the options of the recipe here, once, so the recipe only has to load it.
+"""
+
+import argparse
+import configparser
+import importlib.util
+import json
+import sys
+import urllib.request
+from pathlib import Path
+
+GITMODULES_URL = "https://code.qt.io/cgit/qt/qt5.git/plain/.gitmodules?h=v{version}"
+
+# Modules which are not options of the recipe
+IGNORED_MODULES = ("qtbase", "qtqa", "qtrepotools")
+IGNORED_STATUSES = ("obsolete", "ignore", "additionalLibrary")
+
+
+def load_recipe_class(recipe_folder: Path):
+    spec = importlib.util.spec_from_file_location("qt_conanfile", recipe_folder / "conanfile.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.QtConan
+
+
+def depends_closure(module, depends):
+    closure = set()
+    pending = list(depends.get(module, []))
+    while pending:
+        dep = pending.pop()
+        if dep not in closure:
+            closure.add(dep)
+            pending.extend(depends.get(dep, []))
+    return sorted(closure)
+
+
+def create_module_tree(gitmodules: str, submodules, module_statuses) -> dict:
+    config = configparser.ConfigParser()
+    config.read_string(gitmodules)
+    assert config.sections(), "no submodule found in .gitmodules"
+
+    modules = {}
+    for section in config.sections():
+        assert section.startswith("submodule ")
+        assert section.count('"') == 2
+        modulename = section[section.find('"') + 1: section.rfind('"')]
+        modules[modulename] = config[section]
+    depends = {name: section.get("depends", "").split() for name, section in modules.items()}
+
+    tree = {}
+    for modulename, section in modules.items():
+        if modulename in IGNORED_MODULES:
+            continue
+        status = section["status"]
+        if status in IGNORED_STATUSES:
+            continue
+        if status not in module_statuses:
+            raise Exception(f"module {modulename} has status {status} which is not in {module_statuses}")
+        if modulename not in submodules:
+            raise Exception(f"module {modulename} is not an option of the recipe")
+        tree[modulename] = {
+            "status": status,
+            "path": section["path"],
+            "depends": depends[modulename],
+            "depends_closure": depends_closure(modulename, depends),
+        }
+    return tree
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("version", help="Qt version")
+    parser.add_argument("--gitmodules", type=Path, help="local .gitmodules file of qt5.git (default is to download it)")
+    ns = parser.parse_args(args)
+
+    if ns.gitmodules:
+        gitmodules = ns.gitmodules.read_text()
+    else:
+        url = GITMODULES_URL.format(version=ns.version)
+        print(f"Downloading {url}")
+        with urllib.request.urlopen(url) as response:
+            gitmodules = response.read().decode("utf-8")
+
+    recipe_folder = Path(__file__).resolve().parent
+    recipe = load_recipe_class(recipe_folder)
+    tree = create_module_tree(gitmodules, recipe._submodules, recipe._module_statuses)
+
+    output = recipe_folder / f"qtmodules{ns.version}.json"
+    print(f"Creating {output}")
+    with output.open("w", encoding="utf-8") as f:
+        json.dump(tree, f, indent=2)
+        f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
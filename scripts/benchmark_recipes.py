@@ -0,0 +1,534 @@
+"""
+
+Benchmark the evaluation of recipes: the Python cost paid by each recipe every time a graph is resolved
+
+The heaviest recipes are loaded with Conan's own loader, then their methods are run the way Conan runs
+them while computing a graph, for a matrix of profiles and option values:
+
+    import, config_options, configure, requirements, build_requirements, package_id, validate, package_info
+
+Nothing is installed: dependencies are stubs, with the reference required by the recipe and the default
+options of its recipe in this repository. `package_info` runs against a temporary package folder holding
+the files the recipe reads there (see PACKAGE_FILES), created for each case outside of the timings.
+Each case is evaluated `--repeat` times, from a freshly imported recipe, and the fastest time of each
+method is kept. ConanInvalidConfiguration raised by `validate` is a result like any other, any other
+error is a failure of the benchmark.
+
+The status of each case is compared to the statuses committed next to this script, so a recipe change
+breaking the evaluation or changing which configurations are valid shows up in review. Times depend on
+the machine: they are compared to a local file, which is not committed, saved before making a change:
+
+    python scripts/benchmark_recipes.py --save            # before the change: save statuses and times
+    python scripts/benchmark_recipes.py                   # after the change: compare to them
+    python scripts/benchmark_recipes.py boost --save      # only save the cases of boost
+
+This needs Conan 2, as the evaluation relies on its internal model classes.
+
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RECIPES_DIR = ROOT_DIR / "recipes"
+STATUSES_FILE = Path(__file__).resolve().with_name("benchmark_recipes_statuses.json")
+TIMES_FILE = Path(__file__).resolve().with_name("benchmark_recipes_times.json")
+
+# Host (and build) settings of each profile
+PROFILES = {
+    "linux-gcc": {
+        "os": "Linux", "arch": "x86_64", "build_type": "Release",
+        "compiler": "gcc", "compiler.version": "13", "compiler.libcxx": "libstdc++11", "compiler.cppstd": "17",
+    },
+    "windows-msvc": {
+        "os": "Windows", "arch": "x86_64", "build_type": "Release",
+        "compiler": "msvc", "compiler.version": "193", "compiler.runtime": "dynamic", "compiler.cppstd": "17",
+    },
+    "macos-apple-clang": {
+        "os": "Macos", "arch": "armv8", "build_type": "Release",
+        "compiler": "apple-clang", "compiler.version": "15", "compiler.libcxx": "libc++", "compiler.cppstd": "17",
+    },
+}
+
+# Recipes to benchmark, at a fixed version to keep the saved results comparable, with the option values
+# to combine. Options removed by config_options() are skipped.
+BENCHMARKS = {
+    "boost": {"version": "1.86.0", "options": {"shared": [False, True], "header_only": [False, True]}},
+    "qt": {"version": "6.7.1", "options": {"shared": [False, True], "widgets": [True, False]}},
+    "opencv": {"version": "4.10.0", "options": {"shared": [False, True], "world": [False, True]}},
+    "cpython": {"version": "3.12.2", "options": {"shared": [False, True], "with_tkinter": [True, False]}},
+    "ffmpeg": {"version": "7.0.1", "options": {"shared": [False, True], "with_programs": [True, False]}},
+    "google-cloud-cpp": {"version": "2.28.0", "options": {"shared": [False, True]}},
+}
+
+METHODS = ["import", "config_options", "configure", "requirements", "build_requirements", "package_id",
+           "validate", "package_info"]
+
+
+def _recipe_versions(name):
+    """Return the {version: folder} of a recipe, from its config.yml"""
+    config_file = RECIPES_DIR / name / "config.yml"
+    if not config_file.is_file():
+        return {}
+    with config_file.open(encoding="utf-8") as f:
+        return {str(k): str(v["folder"]) for k, v in (yaml.safe_load(f) or {}).get("versions", {}).items()}
+
+
+def _recipe_folder(name, version):
+    """Return the folder of the recipe of `name` for `version`, or of its first version"""
+    versions = _recipe_versions(name)
+    if not versions:
+        return None
+    return RECIPES_DIR / name / versions.get(str(version), next(iter(versions.values())))
+
+
+def _resolve_version(ref):
+    """Return `ref`, with a version range replaced by the highest version of the recipe in its range"""
+    from conan.internal.model.recipe_ref import RecipeReference
+    from conan.internal.model.version import Version
+    from conan.internal.model.version_range import VersionRange
+
+    expression = str(ref.version)
+    if not expression.startswith("["):
+        return ref
+    version_range = VersionRange(expression[1:-1])
+    versions = sorted((Version(it) for it in _recipe_versions(ref.name)), reverse=True)
+    version = next((it for it in versions if version_range.contains(it, None)), None)
+    # Recipes only compare the version of dependencies, any version in the range would do
+    return RecipeReference(ref.name, str(version or expression[1:-1].split(",")[0].lstrip(">=~^ ").split()[0]),
+                           ref.user, ref.channel)
+
+
+def _library_file(conanfile, name, static):
+    """Return the path of library `name` in the package, as found by collect_libs()"""
+    if conanfile.settings.os == "Windows":
+        return f"lib/{name}.lib"  # Import library of a DLL, or static library
+    if static:
+        return f"lib/lib{name}.a"
+    return f"lib/lib{name}.dylib" if conanfile.settings.os == "Macos" else f"lib/lib{name}.so"
+
+
+def _boost_package_files(conanfile):
+    """The libraries expected by package_info(), for the default "system" layout and "boost" namespace"""
+    if conanfile.options.header_only:
+        return []
+    os_ = conanfile.settings.os
+    static_prefix = "lib" if conanfile.settings.compiler == "msvc" else ""
+    files = []
+    for module in conanfile._dependencies["dependencies"]:
+        if any(conanfile.options.get_safe(f"without_{it}", False) for it in conanfile._all_dependent_modules(module)):
+            continue
+        for name in conanfile._dependencies["libs"][module]:
+            if name in ("boost_stacktrace_windbg", "boost_stacktrace_windbg_cached") and os_ != "Windows":
+                continue
+            if name in ("boost_math_c99l", "boost_math_tr1l") and str(conanfile.settings.arch).startswith("ppc"):
+                continue
+            if name in ("boost_stacktrace_addr2line", "boost_stacktrace_backtrace", "boost_stacktrace_basic") \
+                    and os_ == "Windows":
+                continue
+            if name == "boost_stacktrace_from_exception" and not conanfile._stacktrace_from_exception_available:
+                continue
+            if name == "boost_stacktrace_addr2line" and not conanfile._stacktrace_addr2line_available:
+                continue
+            if name == "boost_stacktrace_backtrace" and conanfile.options.get_safe("with_stacktrace_backtrace") == False:
+                continue
+            if not conanfile.options.get_safe("numa") and "_numa" in name:
+                continue
+            static = not conanfile.options.shared or name in conanfile._dependencies["static_only"]
+            files.append(_library_file(conanfile, (static_prefix if static else "") + name, static))
+    return files
+
+
+def _qt_package_files(conanfile):
+    """The CMake folders of the qtbase modules, listed by package_info() without a components table"""
+    modules = ["", "Core", "CoreTools", "Concurrent", "Network", "Sql", "Test", "Xml"]
+    if conanfile.options.gui:
+        modules += ["Gui", "GuiTools", "OpenGL"]
+    if conanfile.options.get_safe("widgets"):
+        modules += ["Widgets", "WidgetsTools", "PrintSupport"]
+    return [f"lib/cmake/Qt6{module}/Qt6{module}Config.cmake" for module in modules] + \
+        ["lib/cmake/Qt6Core/Qt6CoreMacros.cmake"]
+
+
+# Files read by package_info() in the package folder, for the recipes which fail without them
+PACKAGE_FILES = {
+    "boost": _boost_package_files,
+    "qt": _qt_package_files,
+}
+
+
+class _StubDependency:
+    """The parts of a dependency read by recipes while evaluating: reference, options, settings, folders"""
+
+    def __init__(self, ref, options, package_type, settings, build):
+        from conan.internal.model.cpp_info import CppInfo
+
+        self.ref = ref
+        self.options = options
+        self.package_type = package_type
+        self.settings = settings
+        self.context = "build" if build else "host"
+        self.is_build_context = build
+        self.package_folder = str(Path(tempfile.gettempdir()) / "conan-benchmark" / "dependencies" / ref.name)
+        self.cpp_info = CppInfo(set_defaults=True)
+        self.dependencies = _StubDependencies([])
+
+
+class _StubNode:
+    """The graph node of the evaluated recipe, for `self.ref` and `self.context`"""
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.pref = None
+        self.context = "host"
+
+
+class _StubDependencies:
+    """Stands for `self.dependencies`, with the Requirement objects declared by the recipe as keys"""
+
+    def __init__(self, items):
+        self._items = items
+
+    def filter(self, require_filter, remove_system=True):
+        return _StubDependencies([(require, dependency) for require, dependency in self._items
+                                  if all(getattr(require, k) == v for k, v in require_filter.items())])
+
+    @property
+    def host(self):
+        return self.filter({"build": False, "test": False, "skip": False})
+
+    @property
+    def direct_host(self):
+        return self.filter({"build": False, "direct": True, "test": False, "skip": False})
+
+    @property
+    def build(self):
+        return self.filter({"build": True, "direct": True})
+
+    @property
+    def direct_build(self):
+        return self.build
+
+    @property
+    def test(self):
+        return self.filter({"build": False, "test": True, "skip": False})
+
+    def get(self, name, build=None, **kwargs):
+        for require, dependency in self._items:
+            if require.ref.name == name and (build is None or require.build == build) and \
+                    all(getattr(require, k) == v for k, v in kwargs.items()):
+                return dependency
+        raise KeyError(name)
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def __contains__(self, name):
+        return any(require.ref.name == name for require, _ in self._items)
+
+    def items(self):
+        return list(self._items)
+
+    def values(self):
+        return [dependency for _, dependency in self._items]
+
+
+class RecipeBenchmark:
+    """Evaluate the cases of a recipe, keeping the fastest time of each method"""
+
+    def __init__(self, name, version, repeat):
+        self.name = name
+        self.version = version
+        self.repeat = repeat
+        folder = _recipe_folder(name, version)
+        if folder is None:
+            raise ValueError(f"recipe '{name}' not found in {RECIPES_DIR}")
+        self.conanfile_path = str(folder / "conanfile.py")
+        self._dependency_recipes = {}
+
+    @staticmethod
+    def _settings(values):
+        from conan.internal.default_settings import default_settings_yml
+        from conan.internal.model.settings import Settings
+
+        settings = Settings.loads(default_settings_yml)
+        settings.update_values(list(values.items()))
+        return settings
+
+    def _dependency_recipe(self, ref):
+        """Return the default options and the package type of the recipe of a dependency (cached)"""
+        from conan.internal.loader import ConanFileLoader
+        from conan.internal.model.options import Options
+
+        key = (ref.name, str(ref.version))
+        if key not in self._dependency_recipes:
+            folder = _recipe_folder(ref.name, ref.version)
+            options, package_type = Options(), None
+            if folder is not None:
+                try:
+                    conanfile = ConanFileLoader().load_basic(str(folder / "conanfile.py"))
+                    options, package_type = conanfile.options, conanfile.package_type
+                except Exception:  # Only used for their options, errors are reported for the benchmarked recipes
+                    pass
+            self._dependency_recipes[key] = (options, package_type)
+        return self._dependency_recipes[key]
+
+    def _prepare_requirements(self, conanfile):
+        """What Conan does between configure() and requirements()"""
+        from conan.internal.model.options import Options
+        from conan.internal.model.pkg_type import PackageType
+        from conan.internal.model.recipe_ref import RecipeReference
+        from conan.internal.model.requires import BuildRequirements, TestRequirements, ToolRequirements
+
+        # Takes the options of dependencies set by configure() out of self.options, the stubs keep their defaults
+        conanfile.options.get_upstream_options(Options(), RecipeReference(self.name, self.version), False)
+        PackageType.compute_package_type(conanfile)
+        conanfile.build_requires = BuildRequirements(conanfile.requires)
+        conanfile.test_requires = TestRequirements(conanfile.requires)
+        conanfile.tool_requires = ToolRequirements(conanfile.requires)
+
+    def _dependencies(self, conanfile):
+        items = []
+        for require in conanfile.requires.values():
+            ref = _resolve_version(require.ref)
+            options, package_type = self._dependency_recipe(ref)
+            settings = conanfile.settings_build if require.build else conanfile.settings
+            items.append((require, _StubDependency(ref, options, package_type, settings, require.build)))
+        return _StubDependencies(items)
+
+    def _package_id(self, conanfile):
+        from conan.internal.model.conf import Conf
+        from conan.internal.model.info import ConanInfo, PythonRequiresInfo, RequirementInfo, RequirementsInfo
+
+        host, build = {}, {}
+        for require, dependency in conanfile.dependencies.items():
+            (build if require.build else host)[require] = RequirementInfo(dependency.ref, None, "semver_mode")
+        conanfile.info = ConanInfo(settings=conanfile.settings.copy_conaninfo_settings(),
+                                   options=conanfile.options.copy_conaninfo_options(),
+                                   reqs_info=RequirementsInfo(host),
+                                   build_requires_info=RequirementsInfo(build),
+                                   python_requires=PythonRequiresInfo(None, "minor_mode"),
+                                   conf=Conf().copy_conaninfo_conf())
+        if hasattr(conanfile, "package_id"):
+            conanfile.package_id()
+
+    def _populate_package_folder(self, conanfile):
+        """Create the files read by package_info(), empty"""
+        package_files = PACKAGE_FILES.get(self.name)
+        for path in package_files(conanfile) if package_files else []:
+            path = Path(conanfile.package_folder, path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+    def evaluate(self, profile, options, package_folder):
+        """Evaluate a case once, returning ({method: seconds}, status, error message)
+
+        The status is "ok", "invalid" or "error in <method>: <exception type>", without the message of the
+        error, which can change from one evaluation to the other.
+        """
+        from conan.errors import ConanInvalidConfiguration
+        from conan.internal.loader import ConanFileLoader
+        from conan.internal.model.conf import Conf
+        from conan.internal.model.recipe_ref import RecipeReference
+
+        times = {}
+        status = "ok"
+        message = None
+        current = "import"
+
+        def run(method, function, *args):
+            nonlocal current
+            current = method
+            start = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                times[method] = time.perf_counter() - start
+
+        def call(method):
+            if hasattr(conanfile, method):
+                run(method, getattr(conanfile, method))
+
+        try:
+            # A new loader imports the recipe module again
+            conanfile = run("import", ConanFileLoader().load_named, self.conanfile_path, self.name, self.version,
+                            None, None)
+            conanfile.display_name = f"{self.name}/{self.version}"
+            settings = self._settings(PROFILES[profile])
+            conanfile.settings_build = settings.copy()
+            conanfile.settings_target = None
+            settings.constrained(conanfile.settings)
+            conanfile.settings = settings
+            conanfile.conf = Conf()
+            conanfile.conf_build = Conf()
+            conanfile.folders.set_base_package(package_folder)
+            conanfile._conan_node = _StubNode(RecipeReference(self.name, self.version))
+
+            call("config_options")
+            for option, value in options.items():
+                if option in conanfile.options:  # Not removed by config_options()
+                    setattr(conanfile.options, option, value)
+            call("configure")
+            self._prepare_requirements(conanfile)
+            call("requirements")
+            call("build_requirements")
+            conanfile._conan_dependencies = self._dependencies(conanfile)
+            # As in Conan, validate() can read self.info
+            run("package_id", self._package_id, conanfile)
+            try:
+                call("validate")
+            except ConanInvalidConfiguration:
+                status = "invalid"  # Conan stops here too
+            else:
+                current = "package files"
+                self._populate_package_folder(conanfile)
+                call("package_info")
+        except Exception as error:
+            status = f"error in {current}: {type(error).__name__}"
+            message = str(error).splitlines()[0] if str(error) else None
+        return times, status, message
+
+    def cases(self, axes):
+        """Yield (profile, options) for each profile and combination of option values"""
+        names = sorted(axes)
+        for profile in PROFILES:
+            for values in itertools.product(*(axes[name] for name in names)):
+                yield profile, dict(zip(names, values))
+
+    def run(self, profile, options):
+        """Return the fastest time of each method over the repetitions, the status and error message of the case"""
+        best = {}
+        for _ in range(self.repeat):
+            with tempfile.TemporaryDirectory(prefix="conan-benchmark-") as package_folder:
+                times, status, message = self.evaluate(profile, options, package_folder)
+            for method, seconds in times.items():
+                best[method] = min(seconds, best.get(method, seconds))
+        return best, status, message
+
+
+def case_key(name, version, profile, options):
+    values = ",".join(f"{option}={value}" for option, value in sorted(options.items()))
+    return f"{name}/{version} {profile} {values}".rstrip()
+
+
+def compare_statuses(results, statuses):
+    """Return the status changes of `results` against the committed `statuses`, as printable lines"""
+    return [f"{key}: status '{statuses[key]}' -> '{result['status']}'" for key, result in sorted(results.items())
+            if key in statuses and result["status"] != statuses[key]]
+
+
+def compare_times(results, times, tolerance, threshold):
+    """Return the slowdowns of `results` against the local `times`, as printable lines"""
+    regressions = []
+    for key, result in sorted(results.items()):
+        reference = times.get(key)
+        if reference is None:
+            continue
+        for method, seconds in result["times"].items():
+            before = reference.get(method)
+            if before is None:
+                continue
+            if seconds - before > threshold and seconds > before * (1 + tolerance):
+                regressions.append(f"{key}: {method} {before * 1000:.2f} ms -> {seconds * 1000:.2f} ms")
+    return regressions
+
+
+def _load_json(path, default):
+    if not path.is_file():
+        return default
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_json(path, data):
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the evaluation of the methods of the heaviest recipes, and compare to saved results."
+    )
+    parser.add_argument("recipes", nargs="*", help=f"recipes to benchmark (default: {', '.join(BENCHMARKS)}).")
+    parser.add_argument("-n", "--repeat", type=int, default=5,
+                        help="evaluations of each case, the fastest is kept (default: 5).")
+    parser.add_argument("--statuses", default=str(STATUSES_FILE),
+                        help="expected status of each case, committed (default: %(default)s).")
+    parser.add_argument("--times", default=str(TIMES_FILE),
+                        help="times measured on this machine, not committed (default: %(default)s).")
+    parser.add_argument("--save", action="store_true", help="store the statuses and times of the cases.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative slowdown reported as a regression (default: 0.25).")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="slowdowns under this many milliseconds are ignored (default: 0.5).")
+    args = parser.parse_args()
+
+    names = args.recipes or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"no benchmark for {', '.join(unknown)}, known recipes: {', '.join(BENCHMARKS)}")
+
+    try:
+        from conan import __version__ as conan_version
+        from conan.api.output import ConanOutput
+    except ImportError:
+        parser.error("Conan 2 is required to evaluate the recipes")
+    ConanOutput.define_log_level("error")
+
+    results = {}
+    print(f"{'case (ms)':70} " + " ".join(f"{method[:12]:>12}" for method in METHODS) + "  status")
+    for name in names:
+        benchmark = RecipeBenchmark(name, BENCHMARKS[name]["version"], args.repeat)
+        for profile, options in benchmark.cases(BENCHMARKS[name]["options"]):
+            times, status, message = benchmark.run(profile, options)
+            key = case_key(name, benchmark.version, profile, options)
+            results[key] = {"times": times, "status": status}
+            columns = " ".join(f"{times[method] * 1000:12.2f}" if method in times else f"{'-':>12}"
+                               for method in METHODS)
+            print(f"{key:70} {columns}  {status}" + (f" ({message[:100]})" if message else ""))
+
+    # An error means the benchmark does not evaluate the recipe the way Conan does, its times are meaningless
+    errors = [key for key, result in results.items() if result["status"].startswith("error")]
+    if errors:
+        print(f"{len(errors)} cases failed to evaluate: {', '.join(errors)}", file=sys.stderr)
+        return 1
+
+    statuses_file, times_file = Path(args.statuses), Path(args.times)
+    statuses = _load_json(statuses_file, {})
+    # The versions the times were measured with, Conan and Python changes can explain differences
+    versions = {"conan": conan_version, "python": platform.python_version()}
+    times = _load_json(times_file, {"versions": versions, "cases": {}})
+
+    if args.save:
+        statuses.update({key: result["status"] for key, result in results.items()})
+        _save_json(statuses_file, statuses)
+        times["versions"] = versions
+        times["cases"].update({key: result["times"] for key, result in results.items()})
+        _save_json(times_file, times)
+        print(f"{len(results)} cases saved to {statuses_file} and {times_file}")
+        return 0
+
+    regressions = compare_statuses(results, statuses)
+    if not times["cases"]:
+        print(f"No times measured on this machine in {times_file}, save them with --save before making a change")
+    else:
+        if times["versions"] != versions:
+            print(f"Warning: the times were measured with {times['versions']}, not {versions}", file=sys.stderr)
+        regressions += compare_times(results, times["cases"], args.tolerance, args.threshold / 1000)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    print(f"{len(regressions)} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+
+Prefetch the sources of recipes into a content-addressed cache
+
+The `sources` entries of `recipes/<name>/<folder>/conandata.yml` are collected for the requested
+recipes (`<name>` or `<name>/<version>`, every recipe with `--all`) and downloaded concurrently:
+
+ * mirrors listed under `url` are tried in order, until one provides the expected content
+ * the sha256 is computed while streaming, a file is only stored once its digest matches
+ * files are stored as `<cache>/<sha256>`, each source is downloaded once, however many recipes use it
+ * files already in the cache are not downloaded again
+
+The cache uses the layout of a Conan backup sources server: a `<sha256>.json` file next to each
+source lists the references and URLs it was downloaded for. Once served over HTTP (or copied to such a
+server), `source()` can be pointed at it with:
+
+    core.sources:download_urls=["http://<server>/", "origin"]
+
+Sources without a sha256 cannot be addressed by their content and are reported as skipped.
+
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import yaml
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RECIPES_DIR = ROOT_DIR / "recipes"
+CHUNK_SIZE = 1024 * 1024
+
+
+class Source:
+    """A file to download, identified by its sha256, with the mirrors and references it was found for"""
+
+    def __init__(self, sha256):
+        self.sha256 = sha256
+        self.urls = []
+        self.references = {}
+
+    def add(self, reference, urls):
+        self.urls += [url for url in urls if url not in self.urls]
+        self.references.setdefault(reference, [])
+        self.references[reference] += [url for url in urls if url not in self.references[reference]]
+
+
+def _source_entries(data):
+    """Yield every (urls, sha256) of a `sources` version entry, whatever its nesting (lists, per os/arch...)"""
+    if isinstance(data, dict):
+        if "url" in data:
+            urls = data["url"] if isinstance(data["url"], list) else [data["url"]]
+            yield [str(url) for url in urls], data.get("sha256")
+            return
+        for value in data.values():
+            yield from _source_entries(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from _source_entries(value)
+
+
+def _recipe_versions(name):
+    """Return the {version: folder} of a recipe, from its config.yml, or from the conandata.yml files"""
+    recipe_dir = RECIPES_DIR / name
+    config_file = recipe_dir / "config.yml"
+    if config_file.is_file():
+        with config_file.open(encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+        return {str(version): str(info["folder"]) for version, info in config.get("versions", {}).items()}
+    versions = {}
+    for conandata_file in sorted(recipe_dir.glob("*/conandata.yml")):
+        with conandata_file.open(encoding="utf-8") as f:
+            conandata = yaml.safe_load(f) or {}
+        for version in conandata.get("sources", {}):
+            versions.setdefault(str(version), conandata_file.parent.name)
+    return versions
+
+
+def collect_sources(references):
+    """Return the sources to download for `references` (`name` or `name/version`), keyed by sha256,
+    and the references having a source without sha256
+    """
+    wanted = {}
+    for reference in references:
+        name, _, version = reference.partition("/")
+        if not (RECIPES_DIR / name).is_dir():
+            raise ValueError(f"recipe '{name}' not found in {RECIPES_DIR}")
+        if not version:
+            wanted[name] = None  # Every version
+        elif wanted.get(name, set()) is not None:
+            wanted.setdefault(name, set()).add(version)
+
+    sources = {}
+    unchecked = []
+    for name, versions in sorted(wanted.items()):
+        folders = _recipe_versions(name)
+        if versions:
+            missing = versions - set(folders)
+            if missing:
+                raise ValueError(f"unknown versions of {name}: {', '.join(sorted(missing))}")
+            folders = {version: folders[version] for version in versions}
+
+        conandatas = {}
+        for version, folder in sorted(folders.items()):
+            if folder not in conandatas:
+                conandatas[folder] = {}
+                conandata_file = RECIPES_DIR / name / folder / "conandata.yml"
+                if conandata_file.is_file():  # Not for system packages
+                    with conandata_file.open(encoding="utf-8") as f:
+                        sources_data = (yaml.safe_load(f) or {}).get("sources") or {}
+                    # yaml reads versions like 1.10 as numbers
+                    conandatas[folder] = {str(k): v for k, v in sources_data.items()}
+            for urls, sha256 in _source_entries(conandatas[folder].get(version)):
+                if not sha256:
+                    unchecked.append(f"{name}/{version}")
+                    continue
+                sources.setdefault(str(sha256).lower(), Source(str(sha256).lower())).add(f"{name}/{version}", urls)
+    return sources, unchecked
+
+
+class Downloader:
+    """Download sources into the cache, with at most `jobs` transfers and `per_host` transfers per host"""
+
+    def __init__(self, cache_dir, jobs=8, per_host=4, timeout=60):
+        self._cache_dir = Path(cache_dir)
+        self._jobs = jobs
+        self._per_host = per_host
+        self._timeout = timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self._per_host)
+            return self._hosts[host]
+
+    def _fetch(self, url, sha256):
+        """Stream `url` to a temporary file of the cache, returning its path if its sha256 matches"""
+        h = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, prefix=f"{sha256}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, self._host_slot(url):
+                request = urllib.request.Request(url, headers={"User-Agent": "conan-center-index-prefetch"})
+                with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                    for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                        h.update(chunk)
+                        f.write(chunk)
+            if h.hexdigest() != sha256:
+                raise ValueError(f"sha256 mismatch, got {h.hexdigest()}")
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path
+
+    def _write_metadata(self, source):
+        path = self._cache_dir / f"{source.sha256}.json"
+        metadata = {"references": {}}
+        try:
+            with path.open(encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            pass
+        references = metadata.setdefault("references", {})
+        for reference, urls in source.references.items():
+            references[reference] = references.get(reference, []) + [u for u in urls if u not in references.get(reference, [])]
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def download(self, source):
+        """Download a source, returning (True if downloaded, False if cached or None on failure, mirror errors)"""
+        path = self._cache_dir / source.sha256
+        if path.is_file():
+            self._write_metadata(source)
+            return False, []
+        errors = []
+        for url in source.urls:
+            try:
+                tmp_path = self._fetch(url, source.sha256)
+            except Exception as error:  # Try the next mirror
+                errors.append(f"{url}: {error}")
+                continue
+            os.replace(tmp_path, path)
+            self._write_metadata(source)
+            return True, errors
+        return None, errors
+
+    def download_all(self, sources):
+        """Yield (source, downloaded, errors) as the downloads complete"""
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+            futures = {executor.submit(self.download, source): source for source in sources}
+            for future in as_completed(futures):
+                yield (futures[future],) + future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download the sources listed in conandata.yml files into a content-addressed cache."
+    )
+    parser.add_argument("references", nargs="*",
+                        help="recipes to prefetch, as 'name' (every version) or 'name/version'.")
+    parser.add_argument("--all", action="store_true", help="prefetch the sources of every recipe.")
+    parser.add_argument("-o", "--cache-dir", required=True, help="directory where the sources are stored.")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="number of concurrent downloads (default: 8).")
+    parser.add_argument("--per-host", type=int, default=4,
+                        help="maximum number of concurrent downloads from a single host (default: 4).")
+    parser.add_argument("--timeout", type=float, default=60, help="network timeout in seconds (default: 60).")
+    args = parser.parse_args()
+
+    if args.all:
+        references = sorted(p.name for p in RECIPES_DIR.iterdir() if p.is_dir())
+    elif args.references:
+        references = args.references
+    else:
+        parser.error("no recipe given, use --all to prefetch every recipe")
+
+    try:
+        sources, unchecked = collect_sources(references)
+    except ValueError as error:
+        parser.error(str(error))
+
+    print(f"{len(sources)} sources to prefetch into {args.cache_dir}")
+    downloaded = cached = 0
+    failed = []
+    downloader = Downloader(args.cache_dir, jobs=args.jobs, per_host=args.per_host, timeout=args.timeout)
+    for source, result, errors in downloader.download_all(sources.values()):
+        name = ", ".join(sorted(source.references))
+        if result is None:
+            failed.append(name)
+            print(f"FAILED {source.sha256} ({name})", file=sys.stderr)
+            for error in errors:
+                print(f"    {error}", file=sys.stderr)
+            continue
+        if result:
+            downloaded += 1
+            print(f"Downloaded {source.sha256} ({name})")
+        else:
+            cached += 1
+        for error in errors:
+            print(f"    Mirror skipped: {error}")
+
+    for reference in sorted(set(unchecked)):
+        print(f"Skipped a source of {reference}: no sha256 in conandata.yml", file=sys.stderr)
+    print(f"{downloaded} downloaded, {cached} already cached, {len(failed)} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()